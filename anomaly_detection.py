@@ -0,0 +1,126 @@
+"""
+리소스 메트릭 이상 탐지 (NumPy 벡터 연산).
+모든 함수는 마지막 축을 시간 축으로 보는 1차원(시리즈 하나) 또는 2차원(시리즈 × 시점) 배열을 받으므로
+여러 서비스를 한 번에 평가할 수 있습니다. 측정값이 없는 시점은 NaN입니다.
+
+규칙:
+- rolling z-score: gap 시점 앞에서 끝나는 직전 baseline 개 시점의 평균/표준편차 대비 |z| > z_threshold 인 스파이크
+- EWMA: 지수 가중 이동 평균이 직전 기준선 평균보다 ewma_threshold 표준편차 이상 높은 지속적인 상승
+- threshold-duration: 값이 임계값을 넘는 상태가 min_points 시점 이상 연속되는 구간
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+ANOMALY_Z_THRESHOLD = float(os.environ.get('ANOMALY_Z_THRESHOLD', 4.0))
+ANOMALY_EWMA_ALPHA = float(os.environ.get('ANOMALY_EWMA_ALPHA', 0.3))
+ANOMALY_EWMA_THRESHOLD = float(os.environ.get('ANOMALY_EWMA_THRESHOLD', 3.0))
+# 기준선으로 쓰는 직전 시점 수
+ANOMALY_BASELINE_POINTS = int(os.environ.get('ANOMALY_BASELINE_POINTS', 60))
+# 기준선에서 제외하는 최근 시점 수. 이상 구간이 자기 기준선을 끌어올려 스스로를 가리지 않도록 함
+ANOMALY_BASELINE_GAP = int(os.environ.get('ANOMALY_BASELINE_GAP', 15))
+# 표준편차가 0에 가까운 평탄한 시리즈에서 z가 폭주하지 않도록 하는 하한
+MIN_STD = 1e-6
+# EWMA를 블록 단위로 닫힌 식으로 계산할 때의 블록 길이 (d^-B가 float64 범위 안에 머물도록)
+EWMA_BLOCK = 64
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """NaN을 직전 유효값으로 채웁니다 (앞쪽 NaN은 그대로)."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(values.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(values, index, axis=-1)
+    # 첫 유효값 이전은 NaN 유지
+    seen = np.maximum.accumulate(valid, axis=-1)
+    return np.where(seen, filled, np.nan)
+
+
+def rolling_baseline(values: np.ndarray, window: int, gap: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    각 시점 t의 기준선 [t - gap - window, t - gap) 구간(현재 제외) 유효값의 평균과 표준편차.
+    유효값이 window의 1/4(최소 2개) 미만이면 NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    count = np.pad(np.cumsum(valid, axis=-1), pad)
+    total = np.pad(np.cumsum(filled, axis=-1), pad)
+    squares = np.pad(np.cumsum(filled * filled, axis=-1), pad)
+    n = values.shape[-1]
+    end = np.maximum(np.arange(n) - gap, 0)
+    start = np.maximum(end - window, 0)
+    count = count[..., end] - count[..., start]
+    total = total[..., end] - total[..., start]
+    squares = squares[..., end] - squares[..., start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(squares / count - mean * mean, 0.0)
+    std = np.sqrt(variance)
+    insufficient = count < max(2, window // 4)
+    return np.where(insufficient, np.nan, mean), np.where(insufficient, np.nan, std)
+
+
+def ewma(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    y_t = α·x_t + (1-α)·y_(t-1), y_0 = x_0. 블록 안은 닫힌 식(누적합)으로, 블록 사이는 이월값으로 계산하므로
+    파이썬 루프는 시점 수가 아니라 시점 수 / EWMA_BLOCK 번만 돕니다. 중간 NaN은 직전 값으로 채워 계산합니다.
+    """
+    filled = forward_fill(values)
+    leading = np.isnan(filled)
+    # 첫 유효값 이전은 첫 유효값으로 두어 y가 그 값에서 시작하도록 함 (결과에서는 NaN)
+    first = np.take_along_axis(filled, np.argmax(~leading, axis=-1)[..., None], axis=-1)
+    x = np.where(leading, first, filled)
+    decay = 1.0 - alpha
+    result = np.empty_like(x)
+    carry = x[..., 0]
+    powers = decay ** np.arange(EWMA_BLOCK)
+    for start in range(0, x.shape[-1], EWMA_BLOCK):
+        block = x[..., start:start + EWMA_BLOCK]
+        p = powers[:block.shape[-1]]
+        # y_k = d^(k+1)·carry + d^k · Σ_(j≤k) α·x_j·d^(-j)
+        block_result = np.expand_dims(carry, -1) * decay * p + p * np.cumsum(alpha * block / p, axis=-1)
+        result[..., start:start + block.shape[-1]] = block_result
+        carry = block_result[..., -1]
+    return np.where(leading, np.nan, result)
+
+
+def runs(mask: np.ndarray, min_length: int = 1) -> List[Tuple[int, int]]:
+    """1차원 bool 배열에서 길이 min_length 이상인 True 구간의 (시작, 끝(미포함)) 목록."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= min_length
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def detect(values: np.ndarray, baseline: int = None, z_threshold: float = None,
+           alpha: float = None, ewma_threshold: float = None, gap: int = None) -> Dict[str, np.ndarray]:
+    """
+    z-score 스파이크와 EWMA 상승 마스크를 계산합니다.
+    반환: zscore, ewma, spike(bool), shift(bool) — 모두 입력과 같은 모양.
+    """
+    baseline = baseline or ANOMALY_BASELINE_POINTS
+    z_threshold = z_threshold or ANOMALY_Z_THRESHOLD
+    alpha = alpha or ANOMALY_EWMA_ALPHA
+    ewma_threshold = ewma_threshold or ANOMALY_EWMA_THRESHOLD
+    gap = ANOMALY_BASELINE_GAP if gap is None else gap
+    values = np.asarray(values, dtype=np.float64)
+    mean, std = rolling_baseline(values, baseline, gap)
+    scale = np.maximum(std, MIN_STD)
+    with np.errstate(invalid='ignore'):
+        zscore = (values - mean) / scale
+        smoothed = ewma(values, alpha)
+        shift_score = (smoothed - mean) / scale
+        spike = np.abs(zscore) > z_threshold
+        shift = shift_score > ewma_threshold
+    return {'zscore': zscore, 'ewma': smoothed, 'spike': spike & ~np.isnan(zscore), 'shift': shift & ~np.isnan(shift_score)}
+
+
+def threshold_mask(values: np.ndarray, threshold: float) -> np.ndarray:
+    with np.errstate(invalid='ignore'):
+        return np.asarray(values, dtype=np.float64) > threshold
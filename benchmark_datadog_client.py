@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+datadog_client 처리량 벤치마크.
+datadog_mock_server를 별도 프로세스로 띄우고(같은 프로세스면 GIL을 나눠 써서 서버가 측정을 왜곡함),
+같은 로그 검색/메트릭 질의를 (1) 요청마다 새 연결 + 순차, (2) keep-alive + 순차,
+(3) keep-alive + 동시 시간 조각/질의로 실행해 요청 수, 이벤트 처리량, 재시도/429 수,
+토큰 버킷 대기 시간, 새로 연 연결 수를 출력합니다.
+
+사용 예:
+    python benchmark_datadog_client.py --log_store_dir log_data --metric_store_dir metric_data
+    python benchmark_datadog_client.py --latency_ms 20 --error_rate 0.05 --rate_limit 50 --rate_period 1
+    python benchmark_datadog_client.py --base_url http://127.0.0.1:8126   # 이미 떠 있는 모의 서버 사용
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import datadog_mock_server
+from datadog_client import DatadogClient, LOG_TZ
+
+SCENARIOS = (
+    # (이름, keep-alive, 로그 시간 조각 수(None이면 workers), 동시 메트릭 질의 여부)
+    ('close+serial', False, 1, False),
+    ('keepalive+serial', True, 1, False),
+    ('keepalive+concurrent', True, None, True),
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    """모의 서버 프로세스를 띄우고 포트가 열릴 때까지 기다립니다."""
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datadog_mock_server.py')
+    process = subprocess.Popen([sys.executable, script, '--port', str(port),
+                                '--log_store_dir', args.log_store_dir, '--metric_store_dir', args.metric_store_dir,
+                                '--rate_limit', str(args.rate_limit), '--rate_period', str(args.rate_period),
+                                '--latency_ms', str(args.latency_ms), '--error_rate', str(args.error_rate)],
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("모의 서버가 시작되지 않았습니다")
+
+
+def run_scenario(base_url, keep_alive, slices, concurrent, args):
+    client = DatadogClient('benchmark', base_url=base_url, pool_size=args.workers, max_workers=args.workers)
+    if not keep_alive:
+        client.headers['Connection'] = 'close'
+    from_ms = int(datetime.fromisoformat(args.start).replace(tzinfo=LOG_TZ).timestamp() * 1000)
+    to_ms = from_ms + args.hours * 60 * 60 * 1000 - 1
+    query = f"service:{args.service}" if args.service else '*'
+    queries = [(f"avg:{metric}{{service:{service},env:{env}}} by {{host}}", from_ms, to_ms)
+               for service in args.metric_services for env in args.metric_envs
+               for metric in datadog_mock_server.METRICS]
+
+    started = time.perf_counter()
+    events = sum(1 for _ in client.search_logs(query, from_ms, to_ms, slices or args.workers, args.page_limit))
+    if concurrent:
+        responses = client.query_metrics_many(queries)
+    else:
+        responses = [client.query_metrics(*item) for item in queries]
+    elapsed = time.perf_counter() - started
+    client.close()
+    return dict(client.stats, events=events, seconds=elapsed, connections=client.pool.opened,
+                series=sum(len(response.get('series') or ()) for response in responses))
+
+
+def run(args):
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        process, base_url = start_server(args)
+    try:
+        print(f"mock={base_url} latency_ms={args.latency_ms} error_rate={args.error_rate} "
+              f"rate_limit={args.rate_limit}/{args.rate_period}s workers={args.workers} page_limit={args.page_limit}")
+        # 첫 질의의 저장소 스캔 비용이 측정에 섞이지 않도록 모의 서버의 결과 캐시를 미리 채움
+        run_scenario(base_url, True, 1, False, args)
+        run_scenario(base_url, True, None, True, args)
+
+        print(f"{'scenario':>22} {'events':>8} {'series':>7} {'seconds':>8} {'req':>5} {'req/s':>7} "
+              f"{'events/s':>9} {'retries':>8} {'429':>5} {'wait s':>7} {'conns':>6}")
+        for name, keep_alive, slices, concurrent in SCENARIOS:
+            result = run_scenario(base_url, keep_alive, slices, concurrent, args)
+            print(f"{name:>22} {result['events']:>8} {result['series']:>7} {result['seconds']:>8.3f} "
+                  f"{result['requests']:>5} {result['requests'] / result['seconds']:>7.1f} "
+                  f"{result['events'] / result['seconds']:>9.0f} {result['retries']:>8} {result['rate_limited']:>5} "
+                  f"{result['throttled_seconds']:>7.2f} {result['connections']:>6}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base_url", default=None, help="이미 실행 중인 모의 서버 주소 (없으면 새로 띄움)")
+    parser.add_argument("--log_store_dir", default="log_data", help="로그 저장소 디렉토리 (generate_fake_logs.py)")
+    parser.add_argument("--metric_store_dir", default="metric_data", help="메트릭 저장소 디렉토리 (generate_fake_metrics.py)")
+    parser.add_argument("--start", default="2024-03-01", help="조회 시작 날짜 (YYYY-MM-DD)")
+    parser.add_argument("--hours", type=int, default=24, help="조회 구간 길이(시간)")
+    parser.add_argument("--service", default=None, help="로그 검색 서비스 조건 (없으면 전체)")
+    parser.add_argument("--metric_services", nargs='+', default=["fsp-pay-gateway"], help="메트릭 질의 서비스")
+    parser.add_argument("--metric_envs", nargs='+', default=["prd-bo"], help="메트릭 질의 환경")
+    parser.add_argument("--page_limit", type=int, default=200, help="로그 검색 페이지 크기 (API 최대 1000)")
+    parser.add_argument("--workers", type=int, default=8, help="연결 풀 크기 = 동시 요청 수")
+    parser.add_argument("--latency_ms", type=float, default=5.0, help="모의 서버 요청당 지연(ms)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="모의 서버 무작위 503 비율")
+    parser.add_argument("--rate_limit", type=int, default=1000, help="모의 서버 엔드포인트별 창당 요청 수")
+    parser.add_argument("--rate_period", type=int, default=10, help="모의 서버 속도 제한 창(초)")
+    run(parser.parse_args())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+청킹 Lambda의 JSON 코덱 마이크로 벤치마크.
+past_issues.json 형식의 합성 레코드로 파일을 만들고, 사용 가능한 코덱별로
+파싱/직렬화 처리량(MB/s, ms/MB)과 코덱 간 출력 동일 여부를 출력합니다.
+orjson 코덱도 파싱은 표준 라이브러리로 하므로 parse 열은 두 코덱이 같고(이득 없음), 차이는 직렬화 열에서만 납니다.
+레코드에는 지수 표기 범위의 실수도 섞어, 표준 인코더로 돌아가는 경로까지 동일 여부를 확인합니다.
+
+사용 예:
+    python benchmark_json_codec.py --records 10000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+
+import lambda_function
+from lambda_function import StdlibJsonCodec, select_json_codec
+
+SERVICES = [f"{p}-{t}-{s}" for p in ("fsp", "nsp", "osp") for t in ("pay", "api", "noti") for s in ("gateway", "bo", "fo")]
+ERRORS = [
+    "java.io.IOException: Connection reset by peer",
+    "java.net.SocketTimeoutException: Read timed out",
+    "java.sql.SQLException: ORA-01000: maximum open cursors exceeded",
+    "java.lang.OutOfMemoryError: Java heap space",
+]
+RESOLUTIONS = [
+    "네트워크 타임아웃 설정 조정 및 재시도 로직 추가",
+    "커넥션 풀 설정 최적화 및 안정성 개선",
+    "JVM 힙 메모리 설정 증가 및 메모리 누수 패턴 분석",
+]
+
+
+def generate_records(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            "service": rng.choice(SERVICES),
+            "error_message": rng.choice(ERRORS),
+            "timestamp": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                         f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            "resolution": rng.choice(RESOLUTIONS),
+            "trace_id": f"{rng.getrandbits(128):032x}",
+            "latency_ms": rng.randint(1, 30000),
+            "cpu_usage": round(rng.uniform(0, 100), 2),
+            # 일부 레코드만 1e-05처럼 지수 표기되는 값을 가짐
+            "error_rate": rng.random() * (1e-6 if rng.random() < 0.01 else 1),
+        }
+        for _ in range(count)
+    ]
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(record_counts, repeat):
+    codecs = [StdlibJsonCodec()]
+    fast = select_json_codec('auto')
+    if fast.name != 'stdlib':
+        codecs.append(fast)
+    else:
+        print("orjson이 설치되어 있지 않아 stdlib 코덱만 측정합니다")
+
+    print(f"{'records':>9} {'MB':>8} {'codec':>7} {'parse ms/MB':>12} {'parse MB/s':>11} "
+          f"{'dump ms/MB':>11} {'dump MB/s':>10} {'per-rec ms/MB':>14} {'identical':>10}")
+    for count in record_counts:
+        records = generate_records(count)
+        text = StdlibJsonCodec().dumps(records)
+        data = text.encode('utf-8')
+        size_mb = len(data) / (1024 * 1024)
+        reference = None
+
+        for codec in codecs:
+            parse_time, parsed = best_of(repeat, lambda: codec.loads(data))
+            dump_time, dumped = best_of(repeat, lambda: codec.dumps(parsed))
+            # 청커는 레코드마다 한 번씩 직렬화하므로 그 경로도 측정
+            per_record_time, _ = best_of(repeat, lambda: [codec.dumps(r) for r in parsed])
+            if reference is None:
+                reference = dumped
+            print(f"{count:>9} {size_mb:>8.1f} {codec.name:>7} "
+                  f"{parse_time * 1000 / size_mb:>12.2f} {size_mb / parse_time:>11.1f} "
+                  f"{dump_time * 1000 / size_mb:>11.2f} {size_mb / dump_time:>10.1f} "
+                  f"{per_record_time * 1000 / size_mb:>14.2f} {str(dumped == reference):>10}")
+            del parsed, dumped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, nargs='+', default=[10000, 100000, 1000000], help="합성 파일별 레코드 수")
+    parser.add_argument("--repeat", type=int, default=3, help="측정 반복 횟수 (최솟값 사용)")
+    args = parser.parse_args()
+    # 벤치마크 출력이 Lambda 디버그 로그에 묻히지 않도록 함
+    lambda_function.logger.setLevel('WARNING')
+    run(args.records, args.repeat)
@@ -0,0 +1,98 @@
+"""
+오류 로그 수 시계열과 리소스 메트릭 시계열의 상관 분석 (NumPy 벡터 연산).
+두 시계열은 같은 격자(같은 시작 시각과 간격) 위에 있어야 하며, 측정값이 없는 칸은 NaN입니다.
+
+- 시차 상관: lag k에서 corr(errors[t + k], resource[t]). k > 0이면 리소스 급증이 오류 급증보다 k칸 먼저 일어난 것입니다.
+- 정렬 구간: 가장 강한 시차로 맞춘 두 시계열의 z-score가 함께 z_threshold를 넘는 연속 구간을
+  z-score 곱의 합(기여도)이 큰 순으로 반환합니다.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from anomaly_detection import runs
+
+# 양쪽으로 확인할 최대 시차 (격자 칸 수)
+CORRELATION_MAX_LAG = int(os.environ.get('CORRELATION_MAX_LAG', 10))
+# 정렬 구간으로 볼 z-score 하한
+CORRELATION_Z_THRESHOLD = float(os.environ.get('CORRELATION_Z_THRESHOLD', 2.0))
+# 상관계수를 계산할 최소 유효 쌍 수
+MIN_PAIRS = 3
+
+
+def standardize(values: np.ndarray) -> np.ndarray:
+    """유효값의 평균/표준편차로 z-score를 계산합니다. 분산이 0이면 모두 NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return np.full(values.shape, np.nan)
+    std = values[valid].std()
+    if std == 0:
+        return np.full(values.shape, np.nan)
+    return (values - values[valid].mean()) / std
+
+
+def shift(values: np.ndarray, lag: int) -> np.ndarray:
+    """result[t] = values[t + lag] (범위 밖은 NaN)."""
+    result = np.full(values.shape, np.nan)
+    if lag >= 0:
+        result[:values.size - lag] = values[lag:]
+    else:
+        result[-lag:] = values[:values.size + lag]
+    return result
+
+
+def lagged_correlation(errors: np.ndarray, resource: np.ndarray, max_lag: int = None) -> Dict[str, np.ndarray]:
+    """
+    -max_lag..max_lag 모든 시차의 피어슨 상관계수를 한 번에 계산합니다.
+    반환: lags, correlation(유효 쌍이 MIN_PAIRS 미만이거나 분산이 0이면 NaN), pairs(유효 쌍 수).
+    """
+    max_lag = CORRELATION_MAX_LAG if max_lag is None else max_lag
+    x = np.asarray(errors, dtype=np.float64)
+    y = np.asarray(resource, dtype=np.float64)
+    max_lag = max(0, min(max_lag, x.size - 1))
+    # windows[j, t] = x[t + j - max_lag]
+    windows = sliding_window_view(np.pad(x, max_lag, constant_values=np.nan), x.size)
+    valid = ~np.isnan(windows) & ~np.isnan(y)
+    pairs = valid.sum(axis=1)
+    a = np.where(valid, windows, 0.0)
+    b = np.where(valid, y, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_a = a.sum(axis=1) / pairs
+        mean_b = b.sum(axis=1) / pairs
+        da = np.where(valid, a - mean_a[:, None], 0.0)
+        db = np.where(valid, b - mean_b[:, None], 0.0)
+        correlation = (da * db).sum(axis=1) / np.sqrt((da * da).sum(axis=1) * (db * db).sum(axis=1))
+    correlation[pairs < MIN_PAIRS] = np.nan
+    return {'lags': np.arange(-max_lag, max_lag + 1), 'correlation': correlation, 'pairs': pairs}
+
+
+def best_lag(result: Dict[str, np.ndarray]) -> Optional[int]:
+    """상관계수가 가장 큰 시차. 같으면 절댓값이 작은 시차. 모두 NaN이면 None."""
+    correlation = result['correlation']
+    if np.isnan(correlation).all():
+        return None
+    top = np.nanmax(correlation)
+    candidates = result['lags'][correlation == top]
+    return int(candidates[np.argmin(np.abs(candidates))])
+
+
+def aligned_intervals(errors: np.ndarray, resource: np.ndarray, lag: int,
+                      z_threshold: float = None, limit: int = None) -> List[Dict[str, float]]:
+    """
+    resource를 lag만큼 맞춘 뒤 두 z-score가 모두 z_threshold를 넘는 연속 구간.
+    각 구간은 start/end(격자 칸, end 미포함, errors 기준)와 score(z-score 곱의 합)를 가지며 score 내림차순입니다.
+    """
+    z_threshold = CORRELATION_Z_THRESHOLD if z_threshold is None else z_threshold
+    z_errors = standardize(errors)
+    # aligned[t] = resource[t - lag]: 오류 시점 t와 짝이 되는 리소스 시점
+    z_resource = shift(standardize(resource), -lag)
+    with np.errstate(invalid='ignore'):
+        mask = (z_errors > z_threshold) & (z_resource > z_threshold)
+    product = np.where(mask, z_errors * z_resource, 0.0)
+    intervals = [{'start': start, 'end': end, 'score': float(product[start:end].sum())} for start, end in runs(mask)]
+    intervals.sort(key=lambda interval: -interval['score'])
+    return intervals[:limit] if limit else intervals
@@ -0,0 +1,396 @@
+"""
+log_analysis_function / resource_analysis_function이 함께 쓰는 Datadog API 클라이언트 (표준 라이브러리만 사용).
+
+- 연결 풀: 호스트당 keep-alive 연결을 재사용해 요청마다 TCP/TLS 핸드셰이크를 하지 않습니다.
+  서버가 닫은 유휴 연결은 새 연결로 한 번 다시 보냅니다.
+- 속도 제한: 응답의 X-RateLimit-Limit/Period/Remaining/Reset 헤더로 엔드포인트별 토큰 버킷을 갱신하고,
+  요청 전에 토큰을 받아 429가 나기 전에 스스로 늦춥니다.
+- 재시도: 429/5xx/연결 오류는 full jitter 지수 백오프로 다시 보냅니다 (429는 X-RateLimit-Reset 또는 Retry-After 이상 대기).
+- 동시 페이지 조회: 로그 검색은 시간 범위를 조각으로 나눠 조각마다 커서 페이지네이션을 병렬로 돌리고,
+  메트릭 질의 여러 개는 스레드 풀에서 동시에 보냅니다.
+"""
+
+import os
+import ssl
+import json
+import time
+import queue
+import random
+import threading
+import http.client
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, urlencode
+
+from log_store import LOG_UTC_OFFSET_HOURS
+
+# API 키가 없으면 클라이언트를 만들지 않고 로컬 저장소만 사용
+DD_API_KEY = os.environ.get('DD_API_KEY', '')
+DD_APP_KEY = os.environ.get('DD_APP_KEY', '')
+DD_SITE = os.environ.get('DD_SITE', 'datadoghq.com')
+# 프록시나 로컬 모의 서버(datadog_mock_server.py)를 쓸 때 지정
+DATADOG_BASE_URL = os.environ.get('DATADOG_BASE_URL', '')
+# 유지할 keep-alive 연결 수와 동시 요청 스레드 수
+DATADOG_POOL_SIZE = int(os.environ.get('DATADOG_POOL_SIZE', 8))
+DATADOG_MAX_WORKERS = int(os.environ.get('DATADOG_MAX_WORKERS', 8))
+DATADOG_TIMEOUT_SECONDS = float(os.environ.get('DATADOG_TIMEOUT_SECONDS', 10))
+# 재시도 횟수와 백오프 (base · 2^attempt 상한 안에서 균등 난수)
+DATADOG_MAX_RETRIES = int(os.environ.get('DATADOG_MAX_RETRIES', 5))
+DATADOG_BACKOFF_BASE_SECONDS = float(os.environ.get('DATADOG_BACKOFF_BASE_SECONDS', 0.2))
+DATADOG_BACKOFF_MAX_SECONDS = float(os.environ.get('DATADOG_BACKOFF_MAX_SECONDS', 10))
+# 로그 검색 페이지 크기 (API 최대 1000)와 동시에 조회할 시간 조각 수
+DATADOG_PAGE_LIMIT = int(os.environ.get('DATADOG_PAGE_LIMIT', 1000))
+DATADOG_LOG_SLICES = int(os.environ.get('DATADOG_LOG_SLICES', 4))
+# 로그 이벤트에서 trace ID를 담은 속성 이름 (APM 연동 로그는 dd.trace_id)
+DATADOG_TRACE_ATTRIBUTE = os.environ.get('DATADOG_TRACE_ATTRIBUTE', 'trace_id')
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LOGS_SEARCH_PATH = '/api/v2/logs/events/search'
+METRICS_QUERY_PATH = '/api/v1/query'
+LOG_TZ = timezone(timedelta(hours=LOG_UTC_OFFSET_HOURS))
+
+
+class DatadogError(Exception):
+    """재시도로 해결되지 않은 API 오류."""
+
+    def __init__(self, status: Optional[int], message: str):
+        super().__init__(f"Datadog API 오류 ({status}): {message}")
+        self.status = status
+
+
+class ConnectionPool:
+    """한 호스트에 대한 keep-alive 연결 풀. 동시 사용 연결 수는 size로 제한합니다."""
+
+    def __init__(self, base_url: str, size: int = None, timeout: float = None):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = DATADOG_TIMEOUT_SECONDS if timeout is None else timeout
+        self.ssl_context = ssl.create_default_context() if self.https else None
+        self.slots = threading.BoundedSemaphore(size or DATADOG_POOL_SIZE)
+        # 가장 최근에 반납한 연결부터 재사용 (서버가 닫았을 가능성이 가장 낮음)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.opened += 1
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes = None,
+                headers: Dict[str, str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """(상태 코드, 소문자 헤더, 본문)을 반환합니다. 연결 오류는 호출자(재시도 루프)로 올립니다."""
+        with self.slots:
+            try:
+                conn, reused = self.idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            try:
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    response = conn.getresponse()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    # 유휴 중에 서버가 닫은 연결: 새 연결로 한 번만 다시 보냄
+                    conn.close()
+                    conn = self._connect()
+                    conn.request(method, path, body=body, headers=headers or {})
+                    response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self.idle.put(conn)
+            return response.status, {key.lower(): value for key, value in response.getheaders()}, data
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class TokenBucket:
+    """
+    엔드포인트 하나의 토큰 버킷. 속도는 응답 헤더(limit/period)로 정해지며, 헤더를 받기 전에는 제한하지 않습니다.
+    remaining이 0이면 reset초 동안 막습니다.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rate: Optional[float] = None
+        self.capacity = 0.0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """토큰 하나를 받을 때까지 기다리고, 기다린 시간(초)을 반환합니다."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.rate is None:
+                    return waited
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, headers: Dict[str, str]):
+        """X-RateLimit-* 헤더로 속도와 남은 토큰 수를 맞춥니다. 헤더가 없거나 잘못되면 무시합니다."""
+        try:
+            limit = float(headers['x-ratelimit-limit'])
+            period = float(headers['x-ratelimit-period'])
+            remaining = float(headers['x-ratelimit-remaining'])
+            reset = float(headers.get('x-ratelimit-reset', period))
+        except (KeyError, ValueError):
+            return
+        if limit <= 0 or period <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            first = self.rate is None
+            self.rate = limit / period
+            self.capacity = limit
+            # 다른 클라이언트(다른 컨테이너)와 한도를 나눠 쓰므로 서버가 알려준 남은 수를 넘지 않음
+            self.tokens = remaining if first else min(self.tokens, remaining)
+            if remaining <= 0:
+                self.block(reset, now)
+
+    def block(self, seconds: float, now: float = None):
+        now = time.monotonic() if now is None else now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """full jitter: [0, min(cap, base · 2^attempt)) 균등 난수."""
+    base = DATADOG_BACKOFF_BASE_SECONDS if base is None else base
+    cap = DATADOG_BACKOFF_MAX_SECONDS if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after(headers: Dict[str, str]) -> float:
+    """429 응답이 알려준 대기 시간(초). 없으면 0."""
+    for name in ('retry-after', 'x-ratelimit-reset'):
+        try:
+            return max(0.0, float(headers[name]))
+        except (KeyError, ValueError):
+            continue
+    return 0.0
+
+
+def to_iso(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def split_window(from_ms: int, to_ms: int, slices: int) -> List[Tuple[int, int]]:
+    """[from_ms, to_ms]를 겹치지 않는 닫힌 구간 slices개로 나눕니다 (구간이 짧으면 더 적게)."""
+    slices = max(1, min(slices, to_ms - from_ms + 1))
+    bounds = [from_ms + (to_ms + 1 - from_ms) * i // slices for i in range(slices + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(slices)]
+
+
+def trace_log_query(trace_ids: Sequence[str], service: str = None, env: str = None) -> str:
+    """trace들의 로그 검색 질의: @trace_id:(a OR b) service:x env:y"""
+    terms = [f"@{DATADOG_TRACE_ATTRIBUTE}:({' OR '.join(trace_ids)})"]
+    if service:
+        terms.append(f"service:{service}")
+    if env:
+        terms.append(f"env:{env}")
+    return ' '.join(terms)
+
+
+def log_event_to_record(event: Dict[str, Any]) -> Tuple[Optional[int], dict]:
+    """
+    Logs API 이벤트를 로컬 저장소 레코드 형식으로 바꿉니다.
+    (epoch ms, 레코드)를 반환하며 timestamp는 저장소와 같은 LOG_UTC_OFFSET_HOURS 기준 문자열입니다.
+    """
+    attributes = event.get('attributes') or {}
+    record = dict(attributes.get('attributes') or {})
+    ts = None
+    if attributes.get('timestamp'):
+        parsed = datetime.fromisoformat(attributes['timestamp'].replace('Z', '+00:00'))
+        ts = int(parsed.timestamp() * 1000)
+        record['timestamp'] = parsed.astimezone(LOG_TZ).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    if attributes.get('service'):
+        record['service'] = attributes['service']
+    if 'environment' not in record:
+        env = next((tag[4:] for tag in attributes.get('tags') or () if tag.startswith('env:')), None)
+        if env:
+            record['environment'] = env
+    if attributes.get('message') is not None and 'message' not in record:
+        record['message'] = attributes['message']
+    if 'trace_id' not in record and record.get(DATADOG_TRACE_ATTRIBUTE) is not None:
+        record['trace_id'] = str(record[DATADOG_TRACE_ATTRIBUTE])
+    return ts, record
+
+
+def series_points(response: Dict[str, Any]) -> Iterator[Tuple[str, List[list]]]:
+    """Metrics API 응답의 (호스트, [[ms, 값], ...]) 시리즈. 호스트는 scope의 host: 태그입니다."""
+    for series in response.get('series') or ():
+        scope = series.get('scope') or ''
+        host = next((tag[5:] for tag in scope.split(',') if tag.startswith('host:')), scope)
+        yield host, series.get('pointlist') or []
+
+
+class DatadogClient:
+    """연결 풀, 엔드포인트별 토큰 버킷, 재시도를 공유하는 스레드 안전 클라이언트."""
+
+    def __init__(self, api_key: str, app_key: str = '', base_url: str = None, pool_size: int = None,
+                 max_workers: int = None, timeout: float = None, max_retries: int = None):
+        self.base_url = base_url or DATADOG_BASE_URL or f"https://api.{DD_SITE}"
+        self.pool = ConnectionPool(self.base_url, pool_size, timeout)
+        self.max_retries = DATADOG_MAX_RETRIES if max_retries is None else max_retries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or DATADOG_MAX_WORKERS,
+                                           thread_name_prefix='datadog')
+        self.headers = {'DD-API-KEY': api_key, 'Accept': 'application/json',
+                        'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if app_key:
+            self.headers['DD-APPLICATION-KEY'] = app_key
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'throttled_seconds': 0.0}
+
+    def _bucket(self, path: str) -> TokenBucket:
+        with self.lock:
+            bucket = self.buckets.get(path)
+            if bucket is None:
+                bucket = self.buckets[path] = TokenBucket()
+            return bucket
+
+    def request(self, method: str, path: str, params: Dict[str, Any] = None, body: Any = None) -> Dict[str, Any]:
+        """JSON 요청을 보내 응답 JSON을 반환합니다. 재시도 후에도 실패하면 DatadogError."""
+        bucket = self._bucket(path)
+        target = f"{path}?{urlencode(params)}" if params else path
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            with self.lock:
+                self.stats['requests'] += 1
+                self.stats['throttled_seconds'] += waited
+            try:
+                status, headers, data = self.pool.request(method, target, payload, self.headers)
+            except (http.client.HTTPException, OSError) as e:
+                status, headers, data, error = None, {}, b'', str(e)
+            else:
+                bucket.update(headers)
+                if 200 <= status < 300:
+                    return json.loads(data) if data else {}
+                error = data[:200].decode('utf-8', 'replace')
+                if status == 429:
+                    with self.lock:
+                        self.stats['rate_limited'] += 1
+            if (status is not None and status not in RETRY_STATUSES) or attempt >= self.max_retries:
+                raise DatadogError(status, error)
+            delay = backoff_delay(attempt)
+            if status == 429:
+                # 다른 스레드도 같은 엔드포인트에 보내지 않도록 버킷 자체를 막음
+                wait = retry_after(headers)
+                bucket.block(wait)
+                delay = max(delay, wait)
+            with self.lock:
+                self.stats['retries'] += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def iter_log_pages(self, query: str, from_ms: int, to_ms: int, limit: int = None) -> Iterator[List[dict]]:
+        """한 구간의 로그 검색 결과를 커서를 따라 페이지 단위로 반환합니다 (오래된 순)."""
+        body = {'filter': {'query': query, 'from': to_iso(from_ms), 'to': to_iso(to_ms)},
+                'sort': 'timestamp', 'page': {'limit': limit or DATADOG_PAGE_LIMIT}}
+        while True:
+            response = self.request('POST', LOGS_SEARCH_PATH, body=body)
+            yield response.get('data') or []
+            cursor = ((response.get('meta') or {}).get('page') or {}).get('after')
+            if not cursor:
+                return
+            body['page']['cursor'] = cursor
+
+    def search_logs(self, query: str, from_ms: int, to_ms: int, slices: int = None, limit: int = None) -> Iterator[dict]:
+        """
+        [from_ms, to_ms]를 시간 조각으로 나눠 조각별 페이지네이션을 동시에 돌리고, 받은 이벤트를 도착 순으로 반환합니다.
+        조각 사이 순서는 보장하지 않습니다. 큐 크기로 소비 속도에 맞춰 조회를 늦추며,
+        호출자가 도중에 멈추면(generator close) 남은 조각은 다음 페이지를 요청하지 않습니다.
+        """
+        windows = split_window(int(from_ms), int(to_ms), slices or DATADOG_LOG_SLICES)
+        pages: queue.Queue = queue.Queue(maxsize=len(windows) * 2)
+        stopped = threading.Event()
+        done = object()
+
+        def fetch(window):
+            try:
+                for page in self.iter_log_pages(query, *window, limit):
+                    while not stopped.is_set():
+                        try:
+                            pages.put(page, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stopped.is_set():
+                        return
+            except Exception as e:
+                pages.put(e)
+            finally:
+                pages.put(done)
+
+        futures = [self.executor.submit(fetch, window) for window in windows]
+        remaining = len(futures)
+        try:
+            while remaining:
+                page = pages.get()
+                if page is done:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stopped.set()
+            # 막혀 있는 put이 빠져나가도록 큐를 비움
+            while remaining:
+                try:
+                    if pages.get(timeout=0.1) is done:
+                        remaining -= 1
+                except queue.Empty:
+                    if all(future.done() for future in futures):
+                        break
+
+    def query_metrics(self, query: str, from_ms: int, to_ms: int) -> Dict[str, Any]:
+        return self.request('GET', METRICS_QUERY_PATH,
+                            params={'query': query, 'from': int(from_ms) // 1000, 'to': -(-int(to_ms) // 1000)})
+
+    def query_metrics_many(self, queries: Sequence[Tuple[str, int, int]]) -> List[Dict[str, Any]]:
+        """(질의, from_ms, to_ms) 목록을 동시에 보내 같은 순서로 응답을 반환합니다."""
+        return list(self.executor.map(lambda item: self.query_metrics(*item), queries))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+
+def create_datadog_client() -> Optional[DatadogClient]:
+    """환경 변수 설정으로 클라이언트를 만듭니다. DD_API_KEY가 없으면 None (로컬 저장소만 사용)."""
+    if not DD_API_KEY:
+        return None
+    return DatadogClient(DD_API_KEY, DD_APP_KEY)
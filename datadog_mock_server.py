@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+"""
+datadog_client 처리량/재시도 시험용 로컬 Datadog API 모의 서버 (HTTP/1.1 keep-alive).
+로그는 로컬 로그 저장소(generate_fake_logs.py), 메트릭은 로컬 메트릭 저장소(generate_fake_metrics.py)에서 읽어
+Logs API(POST /api/v2/logs/events/search)와 Metrics API(GET /api/v1/query) 형식으로 돌려줍니다.
+
+- 엔드포인트별 고정 창 속도 제한과 X-RateLimit-Limit/Period/Remaining/Reset 헤더, 한도 초과 시 429
+- 지연(--latency_ms)과 무작위 503(--error_rate) 주입, 유휴 연결 종료(--idle_timeout)로 재연결 경로 시험
+- 로그 질의는 "@trace_id:(<id> OR <id>) service:<이름> env:<환경>" 형식의 key:value 조건만 해석합니다.
+  trace_id가 없으면 from/to가 걸친 일자 파티션을 tail로 훑습니다.
+
+사용 예:
+    python datadog_mock_server.py --port 8126 --log_store_dir log_data --metric_store_dir metric_data
+    DATADOG_BASE_URL=http://127.0.0.1:8126 DD_API_KEY=local python benchmark_datadog_client.py
+"""
+
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from log_store import LogStore, to_epoch_millis
+from metric_store import MetricStore
+from datadog_client import LOGS_SEARCH_PATH, METRICS_QUERY_PATH, to_iso
+
+LOG_TERM = re.compile(r'@?([\w.]+):(\([^)]*\)|\S+)')
+# 모의 메트릭 이름 → (저장소 메트릭, 저장소 값(%) → 응답 값 변환)
+METRICS = {
+    'system.cpu.idle': ('cpu', lambda values: 100 - values),
+    'system.mem.pct_usable': ('memory', lambda values: 1 - values / 100),
+}
+# 시리즈당 최대 포인트 수 (넘으면 평균으로 롤업)
+MAX_POINTS = 300
+# .rollup(avg, 초)로 간격을 지정했을 때의 최대 포인트 수 (넘으면 Datadog처럼 간격을 늘림)
+MAX_ROLLUP_POINTS = 1500
+METRIC_ROLLUP = re.compile(r'\.rollup\(\s*\w+\s*,\s*(\d+)\s*\)')
+# 페이지네이션용으로 보관할 검색 결과 수
+RESULT_CACHE_SIZE = 64
+
+
+def parse_log_query(query):
+    """'key:value' 또는 'key:(a OR b)' 조건 → key → 값 목록. 앞의 @(속성 표시)는 떼어냅니다."""
+    return {key: [value for value in values.strip('()').split(' OR ') if value]
+            for key, values in LOG_TERM.findall(query or '')}
+
+
+def parse_metric_query(query):
+    """'avg:<메트릭>{service:x,env:y} by {host}[.rollup(avg, 초)]' → (메트릭, 태그 dict, 롤업 초 또는 None)."""
+    head, _, rest = query.partition('{')
+    metric = head.split(':')[-1].strip()
+    tags = dict(tag.split(':', 1) for tag in rest.partition('}')[0].split(',') if ':' in tag)
+    rollup = METRIC_ROLLUP.search(query)
+    return metric, tags, int(rollup.group(1)) if rollup else None
+
+
+def record_to_event(index, ts, record):
+    """저장소 레코드 → Logs API 이벤트 (service/message/env 태그 외 필드는 attributes.attributes)."""
+    custom = {key: value for key, value in record.items() if key not in ('timestamp', 'service', 'message')}
+    return {
+        'id': f"AQAAA{index:016x}",
+        'type': 'log',
+        'attributes': {
+            'timestamp': to_iso(ts),
+            'service': record.get('service'),
+            'status': 'error' if (record.get('status_code') or 0) >= 500 else 'info',
+            'message': record.get('message'),
+            'tags': [f"env:{record['environment']}"] if record.get('environment') else [],
+            'attributes': custom,
+        },
+    }
+
+
+class RateLimiter:
+    """엔드포인트별 고정 창 카운터."""
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def check(self, name):
+        """(허용 여부, 응답 헤더)."""
+        with self.lock:
+            now = time.time()
+            start = now - now % self.period
+            window = self.windows.get(name)
+            if window is None or window[0] != start:
+                window = self.windows[name] = [start, 0]
+            window[1] += 1
+            allowed = window[1] <= self.limit
+            remaining = max(0, self.limit - window[1])
+        return allowed, {
+            'X-RateLimit-Name': name,
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Period': str(self.period),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(max(1, int(-(-(start + self.period - now) // 1)))),
+        }
+
+
+class MockDatadog:
+    """요청 처리 상태 (저장소, 속도 제한, 결과 캐시, 통계)."""
+
+    def __init__(self, log_store_dir, metric_store_dir, rate_limit, rate_period, latency_ms, error_rate, seed=0):
+        self.log_store = LogStore(log_store_dir)
+        self.metric_store = MetricStore(metric_store_dir)
+        self.limiter = RateLimiter(rate_limit, rate_period)
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'injected_errors': 0, 'connections': 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def inject_error(self):
+        with self.lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def find_logs(self, query, from_ms, to_ms):
+        """조건에 맞는 (ts, 레코드)를 시각 순으로 반환하며, 같은 질의의 다음 페이지를 위해 보관합니다."""
+        key = (query, from_ms, to_ms)
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+        terms = parse_log_query(query)
+        service, env = (terms.get('service') or [None])[0], (terms.get('env') or [None])[0]
+        if terms.get('trace_id'):
+            found = list(self.log_store.iter_search(terms['trace_id'], from_ms, to_ms, service, env))
+        else:
+            found = []
+            for record, partition, _, _ in self.log_store.tail({}, from_ms):
+                if partition > to_ms:
+                    break
+                ts = to_epoch_millis(record.get('timestamp'))
+                if ts is None or not from_ms <= ts <= to_ms:
+                    continue
+                if (service and record.get('service') != service) or (env and record.get('environment') != env):
+                    continue
+                found.append((ts, record))
+        found.sort(key=lambda item: item[0])
+        with self.lock:
+            self.results[key] = found
+            if len(self.results) > RESULT_CACHE_SIZE:
+                self.results.popitem(last=False)
+        return found
+
+    def search_logs(self, body):
+        page_filter = body.get('filter') or {}
+        page = body.get('page') or {}
+        from_ms = to_epoch_millis(page_filter.get('from').replace('Z', '+00:00'))
+        to_ms = to_epoch_millis(page_filter.get('to').replace('Z', '+00:00'))
+        limit = max(1, min(int(page.get('limit', 10)), 1000))
+        offset = int(base64.urlsafe_b64decode(page['cursor']).decode()) if page.get('cursor') else 0
+        found = self.find_logs(page_filter.get('query'), from_ms, to_ms)
+        data = [record_to_event(offset + i, ts, record) for i, (ts, record) in enumerate(found[offset:offset + limit])]
+        meta = {'status': 'done', 'elapsed': 1}
+        if offset + limit < len(found):
+            meta['page'] = {'after': base64.urlsafe_b64encode(str(offset + limit).encode()).decode()}
+        return {'data': data, 'meta': meta}
+
+    def query_metrics(self, params):
+        metric, tags, rollup = parse_metric_query(params['query'][0])
+        from_ms, to_ms = int(params['from'][0]) * 1000, int(params['to'][0]) * 1000
+        if metric not in METRICS:
+            return {'status': 'ok', 'series': [], 'query': params['query'][0]}
+        name, transform = METRICS[metric]
+        series = self.metric_store.open_series(tags.get('service'), tags.get('env'), name)
+        result = []
+        if series is not None:
+            ts, values, hosts = self.metric_store.read(tags.get('service'), tags.get('env'), name, from_ms, to_ms)
+            if rollup:
+                step = max(rollup * 1000, -(-(to_ms - from_ms + 1) // MAX_ROLLUP_POINTS // (rollup * 1000)) * rollup * 1000)
+            else:
+                step = max(1000, -(-(to_ms - from_ms + 1) // MAX_POINTS))
+            for code in np.unique(hosts):
+                mask = hosts == code
+                buckets = ts[mask] // step * step
+                starts, inverse = np.unique(buckets, return_inverse=True)
+                means = np.bincount(inverse, weights=values[mask]) / np.bincount(inverse)
+                result.append({
+                    'metric': metric,
+                    'scope': f"host:{series.hosts[code]},service:{tags.get('service')},env:{tags.get('env')}",
+                    'interval': step // 1000,
+                    'pointlist': [[int(start), float(value)] for start, value in zip(starts, transform(means))],
+                })
+        return {'status': 'ok', 'series': result, 'from_date': from_ms, 'to_date': to_ms, 'query': params['query'][0]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockDatadog/1.0'
+    # 헤더와 본문을 따로 쓰므로 keep-alive 연결에서 Nagle + delayed ACK 지연이 생기지 않게 함
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.mock.count('connections')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_api(self, name, handler):
+        mock = self.server.mock
+        mock.count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if not self.headers.get('DD-API-KEY'):
+            return self.send_json(403, {'errors': ['Forbidden']})
+        allowed, headers = mock.limiter.check(name)
+        if not allowed:
+            mock.count('rate_limited')
+            return self.send_json(429, {'errors': ['Too many requests']}, headers)
+        if mock.latency:
+            time.sleep(mock.latency)
+        if mock.inject_error():
+            mock.count('injected_errors')
+            return self.send_json(503, {'errors': ['Service unavailable']}, headers)
+        try:
+            payload = handler(body)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            return self.send_json(400, {'errors': [str(e)]}, headers)
+        self.send_json(200, payload, headers)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == LOGS_SEARCH_PATH:
+            return self.handle_api('logs-search', lambda body: self.server.mock.search_logs(json.loads(body or b'{}')))
+        self.send_json(404, {'errors': ['Not found']})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == METRICS_QUERY_PATH:
+            return self.handle_api('query', lambda body: self.server.mock.query_metrics(parse_qs(parts.query)))
+        self.send_json(404, {'errors': ['Not found']})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 기본 backlog(5)는 동시 연결이 몰리면 SYN이 버려져 1초 재전송 지연이 생김
+    request_queue_size = 128
+
+
+def create_server(host='127.0.0.1', port=0, log_store_dir='log_data', metric_store_dir='metric_data',
+                  rate_limit=300, rate_period=10, latency_ms=0.0, error_rate=0.0, idle_timeout=None, verbose=False):
+    """모의 서버를 만듭니다 (port=0이면 임의 포트). serve_forever는 호출자가 실행합니다."""
+    handler = type('MockHandler', (Handler,), {'timeout': idle_timeout})
+    server = MockServer((host, port), handler)
+    server.mock = MockDatadog(log_store_dir, metric_store_dir, rate_limit, rate_period, latency_ms, error_rate)
+    server.verbose = verbose
+    return server
+
+
+def start_in_thread(**kwargs):
+    """백그라운드 스레드에서 서버를 띄우고 (server, base_url)을 반환합니다 (벤치마크/시험용)."""
+    server = create_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1", help="바인드 주소")
+    parser.add_argument("--port", type=int, default=8126, help="포트")
+    parser.add_argument("--log_store_dir", default="log_data", help="로그 저장소 디렉토리 (generate_fake_logs.py)")
+    parser.add_argument("--metric_store_dir", default="metric_data", help="메트릭 저장소 디렉토리 (generate_fake_metrics.py)")
+    parser.add_argument("--rate_limit", type=int, default=300, help="엔드포인트별 창당 허용 요청 수")
+    parser.add_argument("--rate_period", type=int, default=10, help="속도 제한 창 길이(초)")
+    parser.add_argument("--latency_ms", type=float, default=0.0, help="요청마다 추가할 지연(ms)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="무작위 503 응답 비율 (0~1)")
+    parser.add_argument("--idle_timeout", type=float, default=None, help="유휴 keep-alive 연결을 닫을 시간(초)")
+    parser.add_argument("--verbose", action="store_true", help="요청 로그 출력")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.log_store_dir, args.metric_store_dir, args.rate_limit,
+                           args.rate_period, args.latency_ms, args.error_rate, args.idle_timeout, args.verbose)
+    print(f"mock Datadog API: http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.mock.stats))
+        server.server_close()
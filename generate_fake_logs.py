@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+log_analysis_function이 조회하는 로컬 로그 저장소(log_store.LogStore)에 합성 로그를 적재합니다.
+main.py 샘플 요청의 trace_id 로그도 함께 넣어 데모 요청이 실제 레코드를 찾도록 합니다.
+
+사용 예:
+    python generate_fake_logs.py --lines 1000000
+    python generate_fake_logs.py --store_dir /tmp/log_data --lines 10000000 --start 2023-12-13 --days 465
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from log_store import LogStore, LOG_UTC_OFFSET_HOURS
+
+# 로그 시각은 저장소와 같은 시간대로 기록
+LOG_TZ = timezone(timedelta(hours=LOG_UTC_OFFSET_HOURS))
+
+SERVICES = [f"{p}-{t}-{s}" for p in ("fsp", "nsp", "osp", "msp") for t in ("pay", "api", "noti", "order") for s in ("gateway", "bo", "fo")]
+ENVIRONMENTS = ["prd-bo", "prd-fo", "stg-bo", "dev-bo"]
+PATHS = ["/DSP/API/Communication", "/api/v1/orders", "/api/v1/payments", "/api/v1/users", "/health"]
+
+# 예외 메시지와 스택 프레임
+EXCEPTIONS = [
+    ("java.io.IOException: Connection reset by peer", [
+        "at java.net.SocketInputStream.read(SocketInputStream.java:210)",
+        "at java.net.SocketInputStream.read(SocketInputStream.java:141)",
+        "at java.io.BufferedInputStream.fill(BufferedInputStream.java:246)",
+        "at org.apache.http.impl.io.SessionInputBufferImpl.streamRead(SessionInputBufferImpl.java:139)",
+    ]),
+    ("java.net.SocketTimeoutException: Read timed out", [
+        "at java.net.SocketInputStream.socketRead0(Native Method)",
+        "at java.net.SocketInputStream.read(SocketInputStream.java:150)",
+        "at org.apache.http.impl.conn.LoggingInputStream.read(LoggingInputStream.java:84)",
+    ]),
+    ("java.sql.SQLException: ORA-01000: maximum open cursors exceeded", [
+        "at oracle.jdbc.driver.T4CTTIoer.processError(T4CTTIoer.java:450)",
+        "at oracle.jdbc.driver.T4CPreparedStatement.doOall8(T4CPreparedStatement.java:204)",
+        "at com.zaxxer.hikari.pool.ProxyPreparedStatement.executeQuery(ProxyPreparedStatement.java:52)",
+    ]),
+    ("java.lang.OutOfMemoryError: Java heap space", [
+        "at java.util.Arrays.copyOf(Arrays.java:3332)",
+        "at java.lang.AbstractStringBuilder.ensureCapacityInternal(AbstractStringBuilder.java:124)",
+    ]),
+]
+INFO_MESSAGES = ["Request received", "Request completed", "Calling downstream service", "Cache miss"]
+
+# main.py 샘플 요청의 trace
+SAMPLE_TRACE_ID = "67db8cf2000000003f2339dd4b4e1398"
+
+
+def sample_trace_logs():
+    return [
+        {
+            "timestamp": "2025-03-11 13:47:21.621",
+            "service": "fsp-pay-gateway",
+            "environment": "prd-bo",
+            "trace_id": SAMPLE_TRACE_ID,
+            "message": "Request processing failed",
+            "error_details": "Communication with downstream service failed"
+        },
+        {
+            "timestamp": "2025-03-11 13:47:22.804",
+            "service": "fsp-pay-gateway",
+            "environment": "prd-bo",
+            "trace_id": SAMPLE_TRACE_ID,
+            "message": "java.io.IOException: Connection reset by peer",
+            "stack_trace": "\n".join(EXCEPTIONS[0][1]),
+            "path": "/fsp-pay-gateway/DSP/API/Communication",
+            "status_code": 500,
+            "request_id": "req-12345"
+        },
+    ]
+
+
+def generate_logs(lines, start, days, seed=42):
+    """trace당 2~8줄의 합성 로그를 대략 시간 순서로 생성합니다."""
+    rng = random.Random(seed)
+    span_ms = days * 24 * 60 * 60 * 1000
+    start_ms = int(start.timestamp() * 1000)
+    produced = 0
+    while produced < lines:
+        trace_id = f"{rng.getrandbits(128):032x}"
+        service = rng.choice(SERVICES)
+        env = rng.choice(ENVIRONMENTS)
+        path = f"/{service}{rng.choice(PATHS)}"
+        ts = start_ms + produced * span_ms // lines
+        for _ in range(min(rng.randint(2, 8), lines - produced)):
+            ts += rng.randint(1, 500)
+            record = {
+                "timestamp": datetime.fromtimestamp(ts / 1000, LOG_TZ).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                "service": service,
+                "environment": env,
+                "trace_id": trace_id,
+                "path": path,
+                "request_id": f"req-{rng.getrandbits(32):08x}",
+            }
+            if rng.random() < 0.3:
+                message, frames = rng.choice(EXCEPTIONS)
+                record.update(message=message, stack_trace="\n".join(frames), status_code=rng.choice([500, 502, 503, 504]))
+            else:
+                record.update(message=rng.choice(INFO_MESSAGES), status_code=rng.choice([200, 200, 200, 201, 404]))
+            yield record
+            produced += 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store_dir", default="log_data", help="로그 저장소 디렉토리 (log_analysis_function의 LOG_STORE_DIR)")
+    parser.add_argument("--lines", type=int, default=100000, help="생성할 로그 줄 수")
+    parser.add_argument("--start", default="2023-12-13", help="첫 로그 날짜 (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=465, help="로그를 분포시킬 기간(일)")
+    args = parser.parse_args()
+
+    store = LogStore(args.store_dir)
+    started = time.perf_counter()
+    count = store.append_many(generate_logs(args.lines, datetime.fromisoformat(args.start).replace(tzinfo=LOG_TZ), args.days))
+    count += store.append_many(sample_trace_logs())
+    store.close()
+    elapsed = time.perf_counter() - started
+    print(f"{count}줄 적재 완료: {args.store_dir} ({elapsed:.1f}초, {count / elapsed:.0f}줄/초)")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+resource_analysis_function이 조회하는 로컬 메트릭 저장소(metric_store.MetricStore)에 합성 CPU/메모리 메트릭을 적재합니다.
+main.py 샘플 요청의 서비스(fsp-pay-gateway / prd-bo)에는 2025-03-11 13:40 전후의 CPU/메모리 급증을 넣어 둡니다.
+
+사용 예:
+    python generate_fake_metrics.py
+    python generate_fake_metrics.py --store_dir /tmp/metric_data --services 12 --interval 10 --days 465
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from metric_store import MetricStore
+from generate_fake_logs import SERVICES, ENVIRONMENTS, LOG_TZ
+
+# main.py 샘플 요청의 서비스와 장애 시각
+SAMPLE_SERVICE = "fsp-pay-gateway"
+SAMPLE_ENV = "prd-bo"
+INCIDENT_START = datetime(2025, 3, 11, 13, 40, tzinfo=LOG_TZ)
+INCIDENT_MINUTES = 20
+
+
+def generate_series(rng, ts, metric, incident=False):
+    """일 주기 + 잡음 + 드문 스파이크를 가진 사용률(%) 시계열."""
+    day_phase = (ts % 86_400_000) / 86_400_000 * 2 * np.pi
+    if metric == 'cpu':
+        base = rng.uniform(35, 50)
+        values = base + 8 * np.sin(day_phase - np.pi / 2) + rng.normal(0, 3, ts.size)
+        spikes = rng.random(ts.size) < 0.0005
+        values[spikes] += rng.uniform(20, 40, spikes.sum())
+    else:
+        base = rng.uniform(55, 70)
+        # GC 주기의 톱니 모양
+        values = base + 6 * ((ts // 60_000) % 90) / 90 + rng.normal(0, 1.5, ts.size)
+    if incident:
+        start_ms = int(INCIDENT_START.timestamp() * 1000)
+        window = (ts >= start_ms) & (ts < start_ms + INCIDENT_MINUTES * 60_000)
+        values[window] = rng.uniform(90, 99, window.sum()) if metric == 'cpu' else np.linspace(85, 97, window.sum())
+    return np.clip(values, 0, 100)
+
+
+def generate_metrics(store, services, envs, hosts, start, days, interval_s, seed=42):
+    rng = np.random.default_rng(seed)
+    start_ms = int(start.timestamp() * 1000)
+    ts = start_ms + np.arange(0, days * 86_400, interval_s, dtype=np.int64) * 1000
+    points = 0
+    for service in services:
+        for env in envs:
+            for metric in ('cpu', 'memory'):
+                incident = service == SAMPLE_SERVICE and env == SAMPLE_ENV
+                host_names = [f"{service}-{env}-{h}" for h in range(hosts)]
+                columns = [generate_series(rng, ts, metric, incident) for _ in host_names]
+                store.append(service, env, metric,
+                             np.tile(ts, hosts), np.concatenate(columns), np.repeat(host_names, ts.size))
+                points += ts.size * hosts
+    return points
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store_dir", default="metric_data", help="메트릭 저장소 디렉토리 (resource_analysis_function의 METRIC_STORE_DIR)")
+    parser.add_argument("--services", type=int, default=4, help="생성할 서비스 수 (샘플 서비스 포함)")
+    parser.add_argument("--envs", type=int, default=2, help="서비스당 환경 수")
+    parser.add_argument("--hosts", type=int, default=3, help="서비스/환경당 호스트 수")
+    parser.add_argument("--start", default="2023-12-13", help="첫 측정 날짜 (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=465, help="측정 기간(일)")
+    parser.add_argument("--interval", type=int, default=60, help="측정 간격(초)")
+    args = parser.parse_args()
+
+    services = [SAMPLE_SERVICE] + [s for s in SERVICES if s != SAMPLE_SERVICE][:args.services - 1]
+    envs = [SAMPLE_ENV] + [e for e in ENVIRONMENTS if e != SAMPLE_ENV][:args.envs - 1]
+    started = time.perf_counter()
+    points = generate_metrics(MetricStore(args.store_dir), services, envs, args.hosts,
+                              datetime.fromisoformat(args.start).replace(tzinfo=LOG_TZ), args.days, args.interval)
+    elapsed = time.perf_counter() - started
+    print(f"{points}개 측정값 적재 완료: {args.store_dir} ({elapsed:.1f}초)")
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""
+Bedrock Knowledge Base custom transformation 계약을 로컬에서 재현하는 수집(ingestion) 시뮬레이터.
+디렉토리의 파일을 intermediate 배치 파일로 만들고, inputFiles/contentBatches/fileMetadata 이벤트로
+lambda_function.lambda_handler를 호출한 뒤 처리량, 최대 메모리, 청크 통계를 출력합니다.
+AWS 계정 없이 메모리 또는 파일시스템 기반 S3 대체 구현을 사용합니다.
+
+사용 예:
+    python ingestion_simulator.py --data_dir knowledge_dataset
+    python ingestion_simulator.py --data_dir knowledge_dataset --repeat 50 --runs 2 --s3_root /tmp/local-s3
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+import lambda_function
+
+INTERMEDIATE_BUCKET = "local-intermediate"
+DATA_BUCKET = "local-data"
+
+
+def etag_of(data: bytes) -> str:
+    """단일 파트 업로드와 같은 형식의 ETag (따옴표 포함 MD5)."""
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+class LocalS3Body:
+    """get_object 응답의 Body (read / iter_chunks만 지원)."""
+
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self.stream.read(amt)
+
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self.stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class LocalS3:
+    """
+    청킹 Lambda가 사용하는 S3 API만 구현한 로컬 대체 클라이언트.
+    root가 주어지면 객체를 {root}/{bucket}/{key} 파일로, 없으면 메모리에 저장합니다.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else None
+        self.objects = {}
+        self.uploads = {}
+        self.request_counts = {}
+        # Lambda가 스레드 풀에서 동시에 호출하므로 카운터 갱신을 보호
+        self.lock = threading.Lock()
+
+    def _count(self, operation):
+        with self.lock:
+            self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+
+    def _path(self, bucket, key):
+        return self.root / bucket / key
+
+    def _load(self, bucket, key, operation):
+        if self.root:
+            path = self._path(bucket, key)
+            if path.is_file():
+                return path.read_bytes()
+        elif (bucket, key) in self.objects:
+            return self.objects[(bucket, key)]
+        raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': f'{bucket}/{key}'}}, operation)
+
+    def _store(self, bucket, key, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if self.root:
+            path = self._path(bucket, key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        else:
+            self.objects[(bucket, key)] = data
+        return data
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._count('PutObject')
+        return {'ETag': etag_of(self._store(Bucket, Key, Body))}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._count('GetObject')
+        data = self._load(Bucket, Key, 'GetObject')
+        return {'Body': LocalS3Body(data), 'ContentLength': len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._count('HeadObject')
+        data = self._load(Bucket, Key, 'HeadObject')
+        return {'ETag': etag_of(data), 'ContentLength': len(data)}
+
+    def copy_object(self, Bucket, Key, CopySource, CopySourceIfMatch=None, **kwargs):
+        self._count('CopyObject')
+        data = self._load(CopySource['Bucket'], CopySource['Key'], 'CopyObject')
+        if CopySourceIfMatch is not None and CopySourceIfMatch.strip('"') != etag_of(data).strip('"'):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed', 'Message': CopySourceIfMatch}}, 'CopyObject')
+        return {'CopyObjectResult': {'ETag': etag_of(self._store(Bucket, Key, data))}}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._count('CreateMultipartUpload')
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._count('UploadPart')
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': etag_of(Body)}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._count('CompleteMultipartUpload')
+        parts = self.uploads.pop(UploadId)
+        data = self._store(Bucket, Key, b''.join(parts[p['PartNumber']] for p in MultipartUpload['Parts']))
+        return {'ETag': etag_of(data)}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._count('AbortMultipartUpload')
+        self.uploads.pop(UploadId, None)
+        return {}
+
+
+def content_type_for(path: Path):
+    return 'JSON' if path.suffix.lower() == '.json' else 'TEXT'
+
+
+def stage_input_files(s3, data_dir, job_id, repeat):
+    """
+    Bedrock이 하는 것처럼 원본 파일마다 intermediate 배치 파일을 쓰고 inputFiles 목록을 만듭니다.
+    repeat만큼 같은 파일을 다른 원본 경로로 복제해 부하를 키울 수 있습니다.
+    """
+    input_files = []
+    input_bytes = 0
+    for path in sorted(Path(data_dir).rglob('*')):
+        if not path.is_file() or path.name.startswith('.'):
+            continue
+        body = path.read_text(encoding='utf-8')
+        for copy in range(repeat):
+            source_key = f"{data_dir}/{copy}/{path.name}" if repeat > 1 else f"{data_dir}/{path.name}"
+            batch_key = f"{job_id}/{source_key}/batch-0.json"
+            batch = json.dumps({
+                'fileContents': [{
+                    'contentBody': body,
+                    'contentType': content_type_for(path),
+                    'contentMetadata': {},
+                }]
+            }, ensure_ascii=False).encode('utf-8')
+            s3.put_object(Bucket=INTERMEDIATE_BUCKET, Key=batch_key, Body=batch)
+            input_bytes += len(batch)
+            input_files.append({
+                'originalFileLocation': {
+                    'type': 'S3',
+                    's3_location': {'uri': f"s3://{DATA_BUCKET}/{source_key}"},
+                },
+                'fileMetadata': {},
+                'contentBatches': [{'key': batch_key}],
+            })
+    return input_files, input_bytes
+
+
+def build_event(input_files, job_id):
+    return {
+        'version': '1.0',
+        'knowledgeBaseId': 'local-kb',
+        'dataSourceId': 'local-ds',
+        'ingestionJobId': job_id,
+        'bucketName': INTERMEDIATE_BUCKET,
+        'priorTask': 'CHUNKING',
+        'inputFiles': input_files,
+    }
+
+
+def collect_chunk_stats(s3, result):
+    """출력 배치를 읽어 레코드 수와 청크 통계를 계산합니다."""
+    stats = lambda_function.ChunkStats()
+    records = 0
+    output_bytes = 0
+    for output_file in result['outputFiles']:
+        for batch in output_file['contentBatches']:
+            data = s3.get_object(Bucket=INTERMEDIATE_BUCKET, Key=batch['key'])['Body'].read()
+            output_bytes += len(data)
+            for content in json.loads(data)['fileContents']:
+                stats.add(content['contentBody'])
+                body = lambda_function.parse_json_safely(content['contentBody'])
+                records += len(body) if isinstance(body, list) else 1
+    return records, output_bytes, stats.summary()
+
+
+def simulate(data_dir, repeat=1, runs=1, s3_root=None, trace_memory=True):
+    s3 = LocalS3(s3_root)
+    # Lambda가 컨테이너 단위로 재사용하는 클라이언트 자리에 로컬 S3를 주입
+    lambda_function._s3_client = s3
+    reports = []
+
+    for run in range(1, runs + 1):
+        job_id = f"local-job-{run}"
+        input_files, input_bytes = stage_input_files(s3, data_dir, job_id, repeat)
+        event = build_event(input_files, job_id)
+        s3.request_counts = {}
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = lambda_function.lambda_handler(event, None)
+        elapsed = time.perf_counter() - started
+        peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        request_counts = dict(s3.request_counts)
+
+        records, output_bytes, chunk_stats = collect_chunk_stats(s3, result)
+        batches = sum(len(f['contentBatches']) for f in input_files)
+        written = sum(len(f['contentBatches']) for f in result['outputFiles'])
+        reports.append({
+            'run': run,
+            'input_files': len(input_files),
+            'batches': batches,
+            'failed_batches': batches - written,
+            'input_mb': round(input_bytes / (1024 * 1024), 3),
+            'output_mb': round(output_bytes / (1024 * 1024), 3),
+            'records': records,
+            'seconds': round(elapsed, 3),
+            'records_per_sec': round(records / elapsed, 1) if elapsed else None,
+            'mb_per_sec': round(input_bytes / (1024 * 1024) / elapsed, 2) if elapsed else None,
+            'peak_traced_mb': round(peak_bytes / (1024 * 1024), 2) if peak_bytes is not None else None,
+            's3_requests': request_counts,
+            'chunks': chunk_stats,
+        })
+    return reports
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", default="knowledge_dataset", help="수집할 원본 파일 디렉토리")
+    parser.add_argument("--repeat", type=int, default=1, help="원본 파일별 복제 수 (부하 조절)")
+    parser.add_argument("--runs", type=int, default=1, help="수집 작업 반복 횟수 (2 이상이면 스킵 캐시 효과 확인)")
+    parser.add_argument("--s3_root", default=None, help="지정하면 S3 객체를 이 디렉토리에 파일로 저장")
+    parser.add_argument("--no_trace_memory", action="store_true", help="tracemalloc 측정 비활성화 (오버헤드 제거)")
+    parser.add_argument("--no_skip_cache", action="store_true", help="콘텐츠 해시 스킵 캐시 비활성화 (복제본도 매번 청킹)")
+    parser.add_argument("--chunk_strategy", default=None, help="청킹 전략 재정의 (item, packed)")
+    parser.add_argument("--token_budget", type=int, default=None, help="packed 전략의 토큰 예산 재정의")
+    parser.add_argument("--group_by", default=None, help="packed 전략의 그룹 키 재정의 (예: service)")
+    parser.add_argument("--log_level", default="WARNING", help="Lambda 로거 레벨")
+    args = parser.parse_args()
+
+    # 환경 변수 대신 모듈 설정을 직접 재정의
+    lambda_function.logger.setLevel(args.log_level)
+    if args.no_skip_cache:
+        lambda_function.SKIP_CACHE_ENABLED = False
+    if args.chunk_strategy:
+        lambda_function.CHUNK_STRATEGY = args.chunk_strategy
+    if args.token_budget:
+        lambda_function.CHUNK_TOKEN_BUDGET = args.token_budget
+    if args.group_by:
+        lambda_function.CHUNK_GROUP_BY = args.group_by
+    if args.s3_root:
+        os.makedirs(args.s3_root, exist_ok=True)
+    for report in simulate(args.data_dir, args.repeat, args.runs, args.s3_root, not args.no_trace_memory):
+        print(json.dumps(report, ensure_ascii=False, indent=2))
@@ -853,9 +853,12 @@ class KnowledgeBasesForAmazonBedrock:
                 f"delete, and recreate the index"
             )
 
-    def create_lambda(self):
+    def create_lambda(self, memory_size: int = 256, timeout: int = 60):
         """
         Create Lambda function for custom chunking
+        Args:
+            memory_size: Lambda memory in MB (size it from the max_rss_mb values in the per-batch metrics)
+            timeout: Lambda timeout in seconds (size it from the handler_ms values in the timing logs)
         """
         # Create Lambda role
         lambda_iam_role = self.create_lambda_role()
@@ -881,14 +884,20 @@ class KnowledgeBasesForAmazonBedrock:
             lambda_function = self.lambda_client.create_function(
                 FunctionName=self.lambda_function_name,
                 Runtime='python3.12',
-                Timeout=60,
-                MemorySize=256,  # 메모리 증가
+                Timeout=timeout,
+                MemorySize=memory_size,
                 Role=lambda_iam_role['Role']['Arn'],
                 Code={'ZipFile': zip_content},
                 Handler='lambda_function.lambda_handler',
                 Environment={
                     'Variables': {
-                        'LOG_LEVEL': 'DEBUG'
+                        'LOG_LEVEL': 'DEBUG',
+                        # 과거 이슈처럼 작은 레코드 배열은 서비스별로 묶어 임베딩 수를 줄임
+                        'CHUNK_STRATEGY': 'packed',
+                        'CHUNK_TOKEN_BUDGET': '512',
+                        'CHUNK_GROUP_BY': 'service',
+                        # 배치별 단계 시간/바이트/메모리 계측 (로그 한 줄, 오버헤드 작음)
+                        'INSTRUMENTATION': 'basic'
                     }
                 }
             )
@@ -979,7 +988,8 @@ class KnowledgeBasesForAmazonBedrock:
                         "s3:GetObject",
                         "s3:ListBucket", 
                         "s3:PutObject",
-                        "s3:DeleteObject"
+                        "s3:DeleteObject",
+                        "s3:AbortMultipartUpload"
                     ],
                     "Resource": [
                         f"arn:aws:s3:::{self.intermediate_bucket_name}",
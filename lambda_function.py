@@ -1,19 +1,188 @@
+import time
+# 콜드 스타트 초기화(모듈 로드) 시간 측정 시작점
+_INIT_STARTED = time.perf_counter()
+
+import os
+import re
 import json
+import codecs
+import hashlib
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 import boto3
 import logging
-from typing import List, Dict, Any, Union
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Union, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows 등에서 로컬 시뮬레이터를 실행하는 경우
+    resource = None
 
 # 로깅 설정
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 
+# 스트리밍 모드: 입력을 점진적으로 파싱하고 출력을 멀티파트로 나눠 써서 최대 메모리를 일정하게 유지
+STREAMING_ENABLED = os.environ.get('STREAMING_ENABLED', 'true').lower() == 'true'
+# 동시에 처리할 배치 수 (1이면 순차 처리)
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 8))
+# 배열 청킹 전략: item(항목당 청크 1개) 또는 packed(토큰 예산 안에서 연속 항목을 묶음)
+CHUNK_STRATEGY = os.environ.get('CHUNK_STRATEGY', 'item').lower()
+# packed 전략에서 청크 하나에 담을 최대 토큰 수 (추정치)
+CHUNK_TOKEN_BUDGET = int(os.environ.get('CHUNK_TOKEN_BUDGET', 512))
+# packed 전략에서 같은 값끼리만 묶을 항목 키 (예: service), 비어 있으면 순서대로 묶음
+CHUNK_GROUP_BY = os.environ.get('CHUNK_GROUP_BY') or None
+# 내용이 바뀌지 않은 배치는 이전 실행의 출력을 재사용 (intermediate 버킷에 매니페스트 저장)
+SKIP_CACHE_ENABLED = os.environ.get('SKIP_CACHE_ENABLED', 'true').lower() == 'true'
+MANIFEST_PREFIX = os.environ.get('MANIFEST_PREFIX', 'chunking-manifest/')
+# 청크 출력 형식이 바뀌면 올려서 이전 매니페스트가 재사용되지 않도록 함
+CHUNKER_VERSION = 3
+# 청크별로 service / 예외 클래스 / 시각을 contentMetadata에 추출하여 검색 시 필터링할 수 있게 함
+METADATA_EXTRACTION_ENABLED = os.environ.get('METADATA_EXTRACTION_ENABLED', 'true').lower() == 'true'
+# 시간대 정보가 없는 timestamp의 UTC 오프셋 (데이터셋 시각은 KST 기준)
+TIMESTAMP_UTC_OFFSET_HOURS = float(os.environ.get('TIMESTAMP_UTC_OFFSET_HOURS', 9))
+# JSON 코덱: auto(orjson이 설치되어 있으면 사용), orjson, stdlib
+JSON_CODEC = os.environ.get('JSON_CODEC', 'auto').lower()
+# 이 크기 이하의 contentBody 배열은 코덱으로 한 번에 파싱하고, 더 크면 항목 단위로 스트리밍 파싱
+STREAM_PARSE_THRESHOLD = int(os.environ.get('STREAM_PARSE_THRESHOLD', 8 * 1024 * 1024))
+# 배치별 계측: off, basic(단계별 시간/바이트/청크 수/최대 RSS), tracemalloc(basic + 추적 메모리 최대치)
+INSTRUMENTATION = os.environ.get('INSTRUMENTATION', 'off').lower()
+# S3에서 한 번에 읽어오는 바이트 수
+READ_CHUNK_SIZE = int(os.environ.get('READ_CHUNK_SIZE', 64 * 1024))
+# 멀티파트 업로드 파트 크기 (S3 최소 파트 크기는 5MB)
+WRITE_PART_SIZE = max(int(os.environ.get('WRITE_PART_SIZE', 8 * 1024 * 1024)), 5 * 1024 * 1024)
+
+class StdlibJsonCodec:
+    """표준 라이브러리 json 코덱. 인코더를 재사용해 호출마다 JSONEncoder를 만드는 비용을 없앱니다."""
+
+    name = 'stdlib'
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self.encoder.encode(obj)
+
+class OrjsonCodec(StdlibJsonCodec):
+    """
+    orjson 직렬화 코덱. 출력은 StdlibJsonCodec과 바이트 단위로 동일합니다.
+    orjson은 지수 표기 범위의 실수(1e-05 / 0.00001, 1e+16 / 1e16)를 다르게 쓰고 NaN/Infinity를 null로 바꾸므로,
+    값을 훑어 그런 실수가 있으면 표준 인코더로 직렬화합니다. 문자열이 아닌 키, 64비트를 넘는 정수,
+    dict/list 등의 하위 타입처럼 orjson이 거부하는 값도 표준 인코더로 처리합니다.
+    파싱은 표준 라이브러리를 그대로 씁니다. orjson은 64비트를 넘는 정수를 오류 없이 float로 읽는데,
+    결과만 보고는 이를 가려낼 수 없고 입력을 미리 훑으면 orjson으로 얻는 이득이 사라지기 때문입니다.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        super().__init__()
+        import orjson
+        self.orjson = orjson
+        # 하위 타입은 orjson이 거부하도록 해, 아래 검사가 보는 타입과 orjson이 직접 쓰는 타입을 일치시킴
+        self.options = orjson.OPT_PASSTHROUGH_SUBCLASS
+
+    def dumps(self, obj: Any) -> str:
+        if has_nonportable_float(obj):
+            return self.encoder.encode(obj)
+        try:
+            return self.orjson.dumps(obj, option=self.options).decode('utf-8')
+        except TypeError:
+            return self.encoder.encode(obj)
+
+def has_nonportable_float(obj: Any) -> bool:
+    """
+    orjson과 표준 라이브러리가 다르게 쓰는 실수가 있는지 확인합니다.
+    repr이 지수 표기로 바뀌는 값(절댓값 1e-4 미만 또는 1e16 이상)과 NaN/Infinity가 해당합니다.
+    """
+    if type(obj) is float:
+        return not (1e-4 <= abs(obj) < 1e16 or obj == 0.0)
+    if type(obj) is dict:
+        stack = [obj.values()]
+    elif type(obj) is list or type(obj) is tuple:
+        stack = [obj]
+    else:
+        return False
+    while stack:
+        for value in stack.pop():
+            kind = type(value)
+            if kind is float:
+                # NaN은 모든 비교가 거짓이므로 여기서 함께 걸러짐
+                if not (1e-4 <= abs(value) < 1e16 or value == 0.0):
+                    return True
+            elif kind is dict:
+                stack.append(value.values())
+            elif kind is list or kind is tuple:
+                stack.append(value)
+    return False
+
+def select_json_codec(name: str = 'auto'):
+    """이름에 맞는 JSON 코덱을 반환합니다. orjson이 설치되어 있지 않으면 표준 라이브러리를 사용합니다."""
+    if name in ('auto', 'orjson'):
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            if name == 'orjson':
+                logger.warning("orjson이 설치되어 있지 않아 표준 json 코덱을 사용합니다")
+    return StdlibJsonCodec()
+
+codec = select_json_codec(JSON_CODEC)
+
+# 컨테이너 단위로 재사용하는 상태 (warm 호출에서는 다시 만들지 않음)
+_s3_client = None
+_client_lock = threading.Lock()
+_warm_state = {'invocations': 0, 'client_init_ms': 0.0}
+
+def get_s3_client():
+    """S3 클라이언트를 컨테이너당 한 번만 만들어 재사용합니다."""
+    global _s3_client
+    if _s3_client is None:
+        with _client_lock:
+            if _s3_client is None:
+                started = time.perf_counter()
+                # 동시 처리 수만큼 커넥션 풀 확보 (기본값 10)
+                _s3_client = boto3.client('s3', config=Config(max_pool_connections=max(BATCH_CONCURRENCY, 10)))
+                _warm_state['client_init_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return _s3_client
+
+def log_invocation_timing(started: float):
+    """콜드 스타트 여부와 초기화/핸들러 시간을 한 줄로 남깁니다."""
+    _warm_state['invocations'] += 1
+    timing = {
+        'cold_start': _warm_state['invocations'] == 1,
+        'invocation': _warm_state['invocations'],
+        'init_ms': INIT_DURATION_MS,
+        'client_init_ms': _warm_state['client_init_ms'],
+        'handler_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(f"호출 시간 - {json.dumps(timing)}")
+
 def lambda_handler(event, context):
     """
     Bedrock Knowledge Base에서 Custom Chunking을 위한 Lambda 함수
     다양한 형식의 JSON 데이터를 처리합니다.
     """
+    started = time.perf_counter()
+    if INSTRUMENTATION == 'tracemalloc':
+        # 추적 메모리 최대치는 호출 단위로 측정 (동시 처리 중인 배치들이 함께 집계됨)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        return transform_event(event, get_s3_client())
+    finally:
+        log_invocation_timing(started)
+
+def transform_event(event, s3):
+    """Custom transformation 이벤트의 모든 배치를 청킹하고 outputFiles 응답을 만듭니다."""
     logger.debug(f'입력 이벤트: {json.dumps(event, default=str)[:500]}...')
-    s3 = boto3.client('s3')
 
     # 입력 이벤트에서 필요한 정보 추출
     input_files = event.get('inputFiles')
@@ -23,48 +192,45 @@ def lambda_handler(event, context):
         logger.error("필수 입력 파라미터 누락: inputFiles 또는 bucketName")
         return {"outputFiles": []}  # 오류 시 빈 결과 반환
     
-    output_files = []
-    
+    # 파일별 배치 키 수집
+    batch_keys_per_file = []
     for input_file in input_files:
-        content_batches = input_file.get('contentBatches', [])
-        file_metadata = input_file.get('fileMetadata', {})
-        original_file_location = input_file.get('originalFileLocation', {})
-        
-        processed_batches = []
-        
-        for batch in content_batches:
+        batch_keys = []
+        for batch in input_file.get('contentBatches', []):
             input_key = batch.get('key')
             
             if not input_key:
                 logger.error("content batch에 key가 없음")
                 continue
-            
-            try:
-                # S3에서 파일 읽기
-                file_content = read_s3_file(s3, input_bucket, input_key)
-                
-                # 파일 내용 처리 (청킹)
-                chunked_content = process_content(file_content)
-                
-                # 출력 키 생성
-                output_key = f"output/{input_key}"
-                
-                # 처리된 내용을 S3에 쓰기
-                write_to_s3(s3, input_bucket, output_key, chunked_content)
-                
+            batch_keys.append(input_key)
+        batch_keys_per_file.append(batch_keys)
+    
+    # 모든 파일의 배치를 함께 처리하여 S3 I/O를 겹침 (결과는 입력 순서대로 반환)
+    all_keys = [key for batch_keys in batch_keys_per_file for key in batch_keys]
+    skip_cache = ChunkSkipCache(s3, input_bucket) if SKIP_CACHE_ENABLED else None
+    output_keys = iter(run_batches(s3, input_bucket, all_keys, skip_cache))
+    
+    if skip_cache is not None:
+        logger.info(f"스킵 캐시 - 히트: {skip_cache.hits}, 미스: {skip_cache.misses}")
+    
+    output_files = []
+    
+    for input_file, batch_keys in zip(input_files, batch_keys_per_file):
+        processed_batches = []
+        
+        for _ in batch_keys:
+            output_key = next(output_keys)
+            # 실패한 배치는 건너뜀
+            if output_key:
                 # 처리된 배치 정보 추가
                 processed_batches.append({
                     'key': output_key
                 })
-            
-            except Exception as e:
-                logger.error(f"파일 처리 중 오류 발생: {str(e)}")
-                # 오류가 발생해도 계속 진행
         
         # 출력 파일 정보 준비
         output_file = {
-            'originalFileLocation': original_file_location,
-            'fileMetadata': file_metadata,
+            'originalFileLocation': input_file.get('originalFileLocation', {}),
+            'fileMetadata': input_file.get('fileMetadata', {}),
             'contentBatches': processed_batches
         }
         output_files.append(output_file)
@@ -74,41 +240,522 @@ def lambda_handler(event, context):
     
     return result
 
-def read_s3_file(s3_client, bucket, key):
+def run_batches(s3_client, bucket, input_keys: List[str],
+                skip_cache: 'ChunkSkipCache' = None) -> List[Union[str, None]]:
+    """
+    배치들을 최대 BATCH_CONCURRENCY개까지 동시에 처리합니다.
+    반환 목록은 input_keys와 같은 순서이며, 실패한 배치 자리에는 None이 들어갑니다.
+    """
+    if BATCH_CONCURRENCY <= 1 or len(input_keys) <= 1:
+        return [process_batch_safely(s3_client, bucket, key, skip_cache) for key in input_keys]
+    
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(input_keys))) as executor:
+        return list(executor.map(lambda key: process_batch_safely(s3_client, bucket, key, skip_cache), input_keys))
+
+def process_batch_safely(s3_client, bucket, input_key, skip_cache: 'ChunkSkipCache' = None):
+    """배치 하나를 처리하고, 오류가 나면 로그만 남기고 None을 반환합니다."""
+    try:
+        # 배치 파일 읽기 → 청킹 → 쓰기
+        return process_batch(s3_client, bucket, input_key, skip_cache)
+    except Exception as e:
+        logger.error(f"파일 처리 중 오류 발생: {str(e)}")
+        # 오류가 발생해도 계속 진행
+        return None
+
+def process_batch(s3_client, bucket, input_key, skip_cache: 'ChunkSkipCache' = None):
+    """
+    배치 파일 하나를 청킹하여 output/ 아래에 쓰고 출력 키를 반환합니다.
+    skip_cache가 주어지고 같은 내용의 배치를 이전에 처리했다면 청킹 없이 이전 출력을 재사용합니다.
+    """
+    # 출력 키 생성
+    output_key = f"output/{input_key}"
+    stats = ChunkStats()
+    metrics = BatchMetrics(input_key, stats) if INSTRUMENTATION != 'off' else NULL_METRICS
+    
+    try:
+        content_hash = None
+        if skip_cache is not None:
+            with metrics.phase('cache'):
+                content_hash = skip_cache.content_hash(input_key)
+                if skip_cache.reuse(content_hash, output_key):
+                    metrics.cache_hit = True
+                    return output_key
+        
+        if STREAMING_ENABLED:
+            # 입력을 스트리밍으로 파싱하면서 청크를 바로 출력에 씀
+            file_contents = metrics.timed_iter('parse', iter_s3_file_contents(s3_client, bucket, input_key, metrics))
+            contents = metrics.timed_iter('chunk', iter_processed_contents(file_contents, stats))
+            output_etag = write_contents_to_s3(s3_client, bucket, output_key, contents, metrics)
+        else:
+            # S3에서 파일 읽기
+            file_content = read_s3_file(s3_client, bucket, input_key, metrics)
+            
+            # 파일 내용 처리 (청킹)
+            with metrics.phase('chunk'):
+                chunked_content = process_content(file_content, stats)
+            
+            # 처리된 내용을 S3에 쓰기
+            output_etag = write_to_s3(s3_client, bucket, output_key, chunked_content, metrics)
+        
+        logger.info(f"청크 통계 - 키: {input_key}, {json.dumps(stats.summary())}")
+        
+        if skip_cache is not None:
+            with metrics.phase('cache'):
+                skip_cache.record(content_hash, input_key, output_key, output_etag)
+        metrics.succeeded = True
+        return output_key
+    finally:
+        metrics.emit()
+
+class BatchMetrics:
+    """
+    배치 하나의 계측 정보. 단계(read/parse/chunk/write/cache)별 시간은 중첩된 제너레이터 안에서도
+    겹치지 않도록 현재 단계만 시간을 적립합니다 (안쪽 단계에 들어가면 바깥 단계는 일시 정지).
+    emit()은 배치당 구조화된 로그 한 줄을 남깁니다.
+    """
+
+    def __init__(self, input_key, stats: 'ChunkStats' = None):
+        self.input_key = input_key
+        self.stats = stats
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hit = False
+        self.succeeded = False
+        self._stack = []
+        self._mark = None
+
+    @contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self._add(self._stack[-1], now - self._mark)
+        self._stack.append(name)
+        self._mark = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add(self._stack.pop(), now - self._mark)
+            self._mark = now
+
+    def timed_iter(self, name, iterable: Iterable, count_bytes=False) -> Iterator:
+        """iterable에서 다음 항목을 꺼내는 시간을 name 단계로 적립합니다."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            if count_bytes:
+                self.bytes_in += len(item)
+            yield item
+
+    def _add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def emit(self):
+        record = {
+            'metric': 'chunking_batch',
+            'key': self.input_key,
+            'status': 'ok' if self.succeeded or self.cache_hit else 'error',
+            'cache_hit': self.cache_hit,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'phase_ms': {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'chunks': self.stats.count if self.stats else 0,
+        }
+        if resource is not None:
+            # Linux에서 ru_maxrss 단위는 KB
+            record['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        if tracemalloc.is_tracing():
+            record['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        logger.info(json.dumps(record))
+
+class _NullMetrics:
+    """계측이 꺼져 있을 때 쓰는 아무것도 하지 않는 BatchMetrics."""
+
+    cache_hit = False
+    succeeded = False
+    bytes_in = 0
+    bytes_out = 0
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def timed_iter(self, name, iterable, count_bytes=False):
+        return iterable
+
+    def emit(self):
+        pass
+
+    def __setattr__(self, name, value):
+        # 공유 인스턴스이므로 상태를 기록하지 않음
+        pass
+
+NULL_METRICS = _NullMetrics()
+
+class ChunkSkipCache:
+    """
+    intermediate 버킷에 둔 콘텐츠 해시 매니페스트로 변경되지 않은 배치의 재청킹을 건너뜁니다.
+    매니페스트는 해시마다 작은 객체 하나({MANIFEST_PREFIX}{설정 지문}/{해시}.json)로 저장하므로
+    여러 Lambda 호출이 동시에 갱신해도 서로 덮어쓰지 않습니다.
+    콘텐츠 해시는 입력 객체의 ETag와 크기로, 본문을 내려받지 않고 head_object 한 번으로 구합니다.
+    매니페스트에는 출력 객체의 ETag도 저장해, 그 뒤 다른 내용으로 덮어쓴 출력은 재사용하지 않습니다.
+    """
+
+    def __init__(self, s3_client, bucket, prefix=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = f"{prefix or MANIFEST_PREFIX}{config_fingerprint()}/"
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def content_hash(self, key) -> Union[str, None]:
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            logger.debug(f"콘텐츠 해시 조회 실패 - 키: {key}, 오류: {str(e)}")
+            return None
+        etag = response.get('ETag', '').strip('"')
+        if not etag:
+            return None
+        return hashlib.sha256(f"{etag}:{response.get('ContentLength', 0)}".encode('utf-8')).hexdigest()
+
+    def reuse(self, content_hash, output_key) -> bool:
+        """이전 출력이 있으면 output_key 위치에 두고 True를 반환합니다."""
+        hit = content_hash is not None and self._reuse(content_hash, output_key)
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def _reuse(self, content_hash, output_key) -> bool:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._entry_key(content_hash))
+            entry = json.loads(response['Body'].read())
+            previous_key, output_etag = entry['output_key'], entry.get('output_etag')
+            if not output_etag:
+                logger.debug(f"스킵 캐시 미스 - 출력 키: {output_key}, 사유: 매니페스트에 출력 ETag 없음")
+                return False
+            if previous_key == output_key:
+                # 같은 위치의 출력이 기록 당시 그대로일 때만 아무것도 쓰지 않음
+                # (A→B→A 순서로 바뀌면 출력에는 B의 청크가 남아 있으므로 다시 청킹)
+                current_etag = self.s3_client.head_object(Bucket=self.bucket, Key=output_key).get('ETag', '')
+                if current_etag.strip('"') != output_etag:
+                    logger.debug(f"스킵 캐시 미스 - 출력 키: {output_key}, 사유: 출력이 기록 이후 변경됨")
+                    return False
+            else:
+                # 다른 위치의 이전 출력은 기록 당시 그대로일 때만 서버 측 복사로 재사용
+                self.s3_client.copy_object(
+                    Bucket=self.bucket, Key=output_key,
+                    CopySource={'Bucket': self.bucket, 'Key': previous_key},
+                    CopySourceIfMatch=f'"{output_etag}"'
+                )
+            return True
+        except Exception as e:
+            # 매니페스트가 없거나 이전 출력이 지워졌거나 바뀐 경우(PreconditionFailed) 다시 청킹
+            logger.debug(f"스킵 캐시 미스 - 출력 키: {output_key}, 사유: {str(e)}")
+            return False
+
+    def record(self, content_hash, input_key, output_key, output_etag):
+        # 출력 ETag를 모르면 재사용 시 검증할 수 없으므로 기록하지 않음
+        if content_hash is None or not output_etag:
+            return
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=self._entry_key(content_hash),
+                Body=json.dumps({'input_key': input_key, 'output_key': output_key,
+                                 'output_etag': output_etag.strip('"')}),
+                ContentType='application/json'
+            )
+        except Exception as e:
+            logger.error(f"매니페스트 쓰기 오류 - 키: {input_key}, 오류: {str(e)}")
+
+    def _entry_key(self, content_hash):
+        return f"{self.prefix}{content_hash}.json"
+
+def config_fingerprint() -> str:
+    """청크 출력에 영향을 주는 설정의 지문. 설정이 바뀌면 매니페스트도 새로 쌓입니다."""
+    config = {
+        'version': CHUNKER_VERSION,
+        'strategy': CHUNK_STRATEGY,
+        'token_budget': CHUNK_TOKEN_BUDGET,
+        'group_by': CHUNK_GROUP_BY,
+        'metadata': METADATA_EXTRACTION_ENABLED,
+        'utc_offset': TIMESTAMP_UTC_OFFSET_HOURS,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def read_s3_file(s3_client, bucket, key, metrics: 'BatchMetrics' = None):
     """S3에서 파일을 읽어 JSON으로 파싱합니다."""
+    metrics = metrics or NULL_METRICS
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        return json.loads(content)
+        with metrics.phase('read'):
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            content = response['Body'].read()
+            metrics.bytes_in += len(content)
+        with metrics.phase('parse'):
+            return codec.loads(content)
     except Exception as e:
         logger.error(f"S3 파일 읽기 오류 - 버킷: {bucket}, 키: {key}, 오류: {str(e)}")
         raise
 
-def write_to_s3(s3_client, bucket, key, content):
-    """JSON 내용을 S3에 씁니다."""
+def write_to_s3(s3_client, bucket, key, content, metrics: 'BatchMetrics' = None) -> Union[str, None]:
+    """JSON 내용을 S3에 쓰고 객체의 ETag를 반환합니다."""
+    metrics = metrics or NULL_METRICS
     try:
-        s3_client.put_object(
-            Bucket=bucket, 
-            Key=key, 
-            Body=json.dumps(content, ensure_ascii=False),
-            ContentType='application/json'
-        )
+        with metrics.phase('write'):
+            body = codec.dumps(content).encode('utf-8')
+            metrics.bytes_out += len(body)
+            response = s3_client.put_object(
+                Bucket=bucket, 
+                Key=key, 
+                Body=body,
+                ContentType='application/json'
+            )
+        return response.get('ETag')
     except Exception as e:
         logger.error(f"S3 파일 쓰기 오류 - 버킷: {bucket}, 키: {key}, 오류: {str(e)}")
         raise
 
-def process_content(file_content: dict) -> dict:
+def iter_s3_file_contents(s3_client, bucket, key, metrics: 'BatchMetrics' = None) -> Iterator[dict]:
+    """S3 파일을 조금씩 읽으면서 fileContents 배열의 항목을 하나씩 반환합니다."""
+    metrics = metrics or NULL_METRICS
+    try:
+        with metrics.phase('read'):
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+        body_chunks = metrics.timed_iter('read', response['Body'].iter_chunks(chunk_size=READ_CHUNK_SIZE), count_bytes=True)
+        yield from iter_json_array_items(body_chunks, key='fileContents')
+    except Exception as e:
+        logger.error(f"S3 파일 스트리밍 읽기 오류 - 버킷: {bucket}, 키: {key}, 오류: {str(e)}")
+        raise
+
+def write_contents_to_s3(s3_client, bucket, key, contents: Iterable[dict],
+                         metrics: 'BatchMetrics' = None) -> Union[str, None]:
+    """
+    fileContents 항목을 순서대로 직렬화하여 S3에 쓰고 객체의 ETag를 반환합니다.
+    결과는 write_to_s3(codec.dumps({'fileContents': [...]}))와 바이트 단위로 동일합니다.
+    """
+    metrics = metrics or NULL_METRICS
+    writer = S3StreamWriter(s3_client, bucket, key)
+    try:
+        with metrics.phase('write'):
+            writer.write('{"fileContents":[')
+            for i, content in enumerate(contents):
+                if i:
+                    writer.write(',')
+                writer.write(codec.dumps(content))
+            writer.write(']}')
+            etag = writer.close()
+        metrics.bytes_out += writer.bytes_written
+        return etag
+    except Exception as e:
+        writer.abort()
+        logger.error(f"S3 스트리밍 쓰기 오류 - 버킷: {bucket}, 키: {key}, 오류: {str(e)}")
+        raise
+
+class S3StreamWriter:
+    """
+    S3 객체를 파트 단위로 나눠 쓰는 writer.
+    전체 크기가 파트 크기보다 작으면 put_object 한 번으로, 크면 멀티파트 업로드로 씁니다.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size or WRITE_PART_SIZE
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.bytes_written = 0
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.bytes_written += len(data)
+        self.buffer += data
+        if len(self.buffer) >= self.part_size:
+            self._flush_part()
+
+    def _flush_part(self):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType='application/json'
+            )
+            self.upload_id = response['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=bytes(self.buffer)
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = bytearray()
+
+    def close(self) -> Union[str, None]:
+        """남은 버퍼를 쓰고 완성된 객체의 ETag를 반환합니다."""
+        if self.upload_id is None:
+            # 작은 파일은 단일 요청으로 처리
+            response = self.s3_client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer),
+                ContentType='application/json'
+            )
+            return response.get('ETag')
+        if self.buffer:
+            self._flush_part()
+        response = self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+        return response.get('ETag')
+
+    def abort(self):
+        if self.upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+                )
+            except Exception as e:
+                logger.error(f"멀티파트 업로드 취소 오류 - 키: {self.key}, 오류: {str(e)}")
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class JsonStreamReader:
+    """
+    텍스트/바이트 조각의 이터레이블에서 JSON 값을 점진적으로 읽는 리더.
+    배열은 항목 단위로 디코딩하므로 메모리에는 읽기 버퍼와 현재 항목만 올라갑니다.
+    최대 메모리는 파일 크기가 아니라 가장 큰 단일 항목(contentBody 하나)의 크기에 비례합니다.
+    """
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_size=1) -> bool:
+        """버퍼의 남은 부분이 min_size 이상이 될 때까지 읽습니다. 더 읽을 게 없으면 False."""
+        if self.eof:
+            return False
+        parts = [self.buffer[self.pos:]]
+        size = len(parts[0])
+        while size < min_size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                parts.append(self.utf8.decode(b'', final=True))
+                self.eof = True
+                break
+            text = self.utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            parts.append(text)
+            size += len(text)
+        self.buffer = ''.join(parts)
+        self.pos = 0
+        return size > 0
+
+    def _skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"JSON 스트림 파싱 오류: '{char}' 필요, 위치 {self.pos}에서 '{self.peek()}' 발견")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        """다음 JSON 값 하나를 디코딩합니다. 값이 버퍼 경계에 걸리면 버퍼를 두 배씩 늘려 다시 시도합니다."""
+        self._skip_whitespace()
+        while True:
+            remaining = len(self.buffer) - self.pos
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # 숫자 등은 버퍼 끝에서 잘린 채로 디코딩될 수 있으므로 더 읽어서 확인
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    if end > READ_CHUNK_SIZE and end * 2 > len(self.buffer):
+                        # 소비한 원문을 바로 버려 큰 항목의 원문과 디코딩 결과가 함께 남지 않도록 함
+                        self.buffer = self.buffer[end:]
+                        self.pos = 0
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(max(remaining * 2, READ_CHUNK_SIZE))
+
+    def iter_array(self) -> Iterator[Any]:
+        """현재 위치의 JSON 배열 항목을 하나씩 반환합니다."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"JSON 스트림 파싱 오류: ',' 또는 ']' 필요, '{char}' 발견")
+
+def iter_json_array_items(chunks: Iterable[Union[str, bytes]], key: str = None) -> Iterator[Any]:
+    """
+    JSON 배열의 항목을 스트리밍으로 반환합니다.
+    key가 주어지면 최상위 객체에서 해당 키의 배열을 찾아 반환하고 나머지 값은 건너뜁니다.
+    """
+    reader = JsonStreamReader(chunks)
+    if key is None:
+        yield from reader.iter_array()
+        return
+    
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.decode_value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            yield from reader.iter_array()
+        else:
+            reader.decode_value()
+        char = reader.peek()
+        reader.pos += 1
+        if char == '}':
+            return
+        if char != ',':
+            raise ValueError(f"JSON 스트림 파싱 오류: ',' 또는 '}}' 필요, '{char}' 발견")
+
+def process_content(file_content: dict, stats: 'ChunkStats' = None) -> dict:
     """
     파일 내용을 처리하여 청크로 분할합니다.
     다양한 JSON 형식(배열, 객체)을 처리할 수 있습니다.
     """
-    chunked_content = {
-        'fileContents': []
-    }
-    
     # fileContents 필드가 없으면 빈 배열 기본값 사용
     file_contents = file_content.get('fileContents', [])
     
+    return {
+        'fileContents': list(iter_processed_contents(file_contents, stats))
+    }
+
+def iter_processed_contents(file_contents: Iterable[dict], stats: 'ChunkStats' = None) -> Iterator[dict]:
+    """
+    fileContents 항목을 순서대로 청킹하여 출력 항목을 하나씩 반환합니다.
+    항목 하나의 청크는 그 항목의 파싱이 끝난 뒤 반환하므로, 실패한 항목은 원본 하나로만 출력됩니다.
+    stats가 주어지면 출력 청크의 개수와 크기를 집계합니다.
+    """
     for content in file_contents:
         content_body = content.get('contentBody', '')
         content_type = content.get('contentType', '')
@@ -119,70 +766,249 @@ def process_content(file_content: dict) -> dict:
             continue
             
         try:
-            # JSON 문자열을 객체로 파싱
-            json_data = parse_json_safely(content_body)
-            
-            # 데이터 형식 감지 및 처리
-            chunks = chunk_json_data(json_data)
-            
-            # 각 청크를 fileContents에 추가
-            for chunk in chunks:
-                chunked_content['fileContents'].append({
+            # 데이터 형식 감지 및 처리 (배열은 항목 단위로 파싱)
+            # 항목 하나가 끝까지 파싱된 뒤에 내보내, 중간에 실패해도 일부 청크와 원본이 함께 출력되지 않도록 함
+            outputs = []
+            for chunk in iter_content_chunks(content_body):
+                if METADATA_EXTRACTION_ENABLED:
+                    chunk_metadata = {**content_metadata, **extract_chunk_metadata(chunk)}
+                else:
+                    chunk_metadata = content_metadata
+                outputs.append({
                     'contentType': content_type,
-                    'contentMetadata': content_metadata,
-                    'contentBody': json.dumps(chunk, ensure_ascii=False)
+                    'contentMetadata': chunk_metadata,
+                    'contentBody': codec.dumps(chunk)
                 })
                 
         except Exception as e:
             logger.error(f"콘텐츠 처리 중 오류: {str(e)}")
+            if stats is not None:
+                stats.add(content_body if isinstance(content_body, str) else codec.dumps(content_body))
             # 원본 내용을 그대로 추가
-            chunked_content['fileContents'].append({
+            yield {
                 'contentType': content_type,
                 'contentMetadata': content_metadata,
                 'contentBody': content_body
-            })
+            }
+            continue
+        
+        for output in outputs:
+            if stats is not None:
+                stats.add(output['contentBody'])
+            yield output
+
+def iter_content_chunks(content_body: Any) -> Iterator[Any]:
+    """
+    contentBody를 청크로 분할합니다.
+    STREAM_PARSE_THRESHOLD보다 큰 JSON 배열 문자열은 전체를 파싱하지 않고 항목 단위로 읽어 청킹합니다.
+    """
+    if (isinstance(content_body, str) and len(content_body) > STREAM_PARSE_THRESHOLD
+            and content_body.lstrip().startswith('[')):
+        emitted = False
+        try:
+            for chunk in chunk_json_data(iter_json_array_items([content_body])):
+                emitted = True
+                yield chunk
+            return
+        except (json.JSONDecodeError, ValueError):
+            # 이미 내보낸 청크가 있으면 상위에서 그 청크를 버리고 원본으로 대체하도록 오류를 전달
+            if emitted:
+                raise
     
-    return chunked_content
+    # JSON 문자열을 객체로 파싱
+    json_data = parse_json_safely(content_body)
+    yield from chunk_json_data(json_data)
 
 def parse_json_safely(json_str: str) -> Union[Dict, List, str]:
     """JSON 문자열을 안전하게 파싱합니다."""
     try:
-        return json.loads(json_str) if isinstance(json_str, str) else json_str
+        return codec.loads(json_str) if isinstance(json_str, str) else json_str
     except Exception:
         # 이미 객체인 경우 그대로 반환
         return json_str
 
-def chunk_json_data(data: Any) -> List[Any]:
+def chunk_json_data(data: Any, strategy: str = None, token_budget: int = None,
+                    group_by: str = None) -> Iterator[Any]:
     """
     JSON 데이터를 청크로 분할합니다.
-    배열인 경우 각 항목을 청크로 처리하고,
+    배열(또는 배열 항목의 이터레이터)인 경우 각 항목을 청크로 처리하고,
     객체인 경우 각 키-값 쌍을 청크로 처리합니다.
+    배열은 packed 전략이면 토큰 예산 안에서 여러 항목을 하나의 청크(배열)로 묶습니다.
+    청크는 제너레이터로 하나씩 반환됩니다.
     """
-    chunks = []
+    strategy = strategy or CHUNK_STRATEGY
+    emitted = False
+    
+    # 배열 형식 처리 (예: 오류 로그 목록)
+    if isinstance(data, list) or isinstance(data, Iterator):
+        if strategy == 'packed':
+            items = pack_records(data, token_budget or CHUNK_TOKEN_BUDGET, group_by or CHUNK_GROUP_BY)
+        else:
+            items = data
+        for item in items:
+            emitted = True
+            yield item
+        if not emitted:
+            # 빈 배열이면 원본 데이터 반환
+            yield []
+        return
     
     try:
-        # 배열 형식 처리 (예: 오류 로그 목록)
-        if isinstance(data, list):
-            for item in data:
-                chunks.append(item)
-        
         # 객체 형식 처리 (예: 서비스별 담당자 정보)
-        elif isinstance(data, dict):
+        if isinstance(data, dict):
             for key, value in data.items():
                 # 객체에 서비스 ID를 추가하여 별도 청크로 생성
                 if isinstance(value, dict):
                     service_chunk = {'service_id': key, **value}
-                    chunks.append(service_chunk)
                 else:
-                    chunks.append({key: value})
+                    service_chunk = {key: value}
+                emitted = True
+                yield service_chunk
         
         # 그 외 데이터 형식은 그대로 하나의 청크로 처리
         else:
-            chunks.append(data)
+            emitted = True
+            yield data
             
     except Exception as e:
         logger.error(f"JSON 데이터 청킹 중 오류: {str(e)}")
         # 오류 발생 시 원본 데이터를 그대로 사용
-        chunks.append(data)
+        emitted = True
+        yield data
     
-    return chunks if chunks else [data]  # 청크가 없으면 원본 데이터 반환
\ No newline at end of file
+    if not emitted:
+        yield data  # 청크가 없으면 원본 데이터 반환
+
+def pack_records(records: Iterable[Any], token_budget: int, group_by: str = None) -> Iterator[List[Any]]:
+    """
+    연속된 레코드를 토큰 예산을 넘지 않는 배열 청크로 묶습니다.
+    group_by가 주어지면 해당 키 값이 같은 레코드끼리만 묶으며, 그룹별로 열린 청크 하나만 유지하므로
+    메모리는 (그룹 수 × 토큰 예산)으로 제한됩니다. 예산보다 큰 레코드는 단독 청크가 됩니다.
+    """
+    # 그룹 키 → [레코드 목록, 누적 토큰 수] (dict는 삽입 순서를 유지하므로 마지막 flush도 처음 등장 순서를 따름)
+    open_packs = {}
+    
+    for record in records:
+        group = record.get(group_by) if group_by and isinstance(record, dict) else None
+        if isinstance(group, (list, dict)):
+            # 목록/객체 값은 dict 키로 쓸 수 없으므로 직렬화한 문자열로 묶음 (같은 문자열 값과 섞이지 않게 구분)
+            group = ('json', codec.dumps(group))
+        # 배열 구분자(', ')까지 포함한 추정치
+        tokens = estimate_tokens(codec.dumps(record)) + 1
+        
+        pack = open_packs.get(group)
+        if pack and pack[1] + tokens > token_budget:
+            yield pack[0]
+            pack = None
+        if pack is None:
+            pack = open_packs[group] = [[], 1]  # 1: 배열 괄호
+        pack[0].append(record)
+        pack[1] += tokens
+    
+    for records_in_pack, _ in open_packs.values():
+        yield records_in_pack
+
+# 패키지 경로를 포함한 예외 클래스명 (예: java.io.IOException: Connection reset by peer)
+_EXCEPTION_CLASS = re.compile(r'^\s*((?:[A-Za-z_$][\w$]*\.)*[A-Z][\w$]*(?:Exception|Error|Throwable|Fault))\b')
+
+def extract_chunk_metadata(chunk: Any) -> dict:
+    """
+    청크에서 검색 필터용 메타데이터를 추출합니다. 레코드 하나 또는 packed 청크(레코드 배열) 모두 처리합니다.
+    - service: 청크의 모든 레코드가 같은 서비스일 때 서비스명 (service 또는 service_id 필드)
+    - exception_classes: error_message/message에서 추출한 예외 클래스 목록 (중복 제거)
+    - timestamp_min / timestamp_max: timestamp 필드의 epoch 밀리초 범위
+    찾은 값이 없는 키는 포함하지 않습니다.
+    """
+    records = chunk if isinstance(chunk, list) else [chunk]
+    services = set()
+    exception_classes = []
+    timestamps = []
+    
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        service = record.get('service') or record.get('service_id')
+        if isinstance(service, str):
+            services.add(service)
+        exception_class = extract_exception_class(record.get('error_message') or record.get('message'))
+        if exception_class and exception_class not in exception_classes:
+            exception_classes.append(exception_class)
+        timestamp = to_epoch_millis(record.get('timestamp'))
+        if timestamp is not None:
+            timestamps.append(timestamp)
+    
+    metadata = {}
+    if len(services) == 1:
+        metadata['service'] = services.pop()
+    if exception_classes:
+        metadata['exception_classes'] = exception_classes
+    if timestamps:
+        metadata['timestamp_min'] = min(timestamps)
+        metadata['timestamp_max'] = max(timestamps)
+    return metadata
+
+def extract_exception_class(message: Any) -> Union[str, None]:
+    """오류 메시지 앞부분의 예외 클래스명을 반환합니다. 없으면 None."""
+    if not isinstance(message, str):
+        return None
+    match = _EXCEPTION_CLASS.match(message)
+    return match.group(1) if match else None
+
+def to_epoch_millis(value: Any) -> Union[int, None]:
+    """timestamp 값(문자열 또는 epoch 초/밀리초)을 epoch 밀리초로 변환합니다. 해석할 수 없으면 None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # 10^12 미만이면 초 단위로 간주
+        return int(value if value >= 1e12 else value * 1000)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone(timedelta(hours=TIMESTAMP_UTC_OFFSET_HOURS)))
+    return int(parsed.timestamp() * 1000)
+
+def estimate_tokens(text: str) -> int:
+    """
+    임베딩 모델 토크나이저 없이 토큰 수를 추정합니다.
+    ASCII는 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰으로 계산합니다.
+    """
+    non_ascii = len(text.encode('utf-8')) - len(text)
+    # UTF-8에서 한글은 3바이트이므로 추가 바이트 수의 절반이 비ASCII 문자 수
+    non_ascii_chars = non_ascii // 2
+    return (len(text) - non_ascii_chars + 3) // 4 + non_ascii_chars
+
+class ChunkStats:
+    """배치 하나에서 만들어진 청크의 개수와 크기(바이트, 추정 토큰) 통계를 집계합니다."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_bytes = 0
+        self.total_tokens = 0
+        self.min_tokens = None
+        self.max_tokens = 0
+
+    def add(self, chunk_body: str):
+        tokens = estimate_tokens(chunk_body)
+        self.count += 1
+        self.total_bytes += len(chunk_body.encode('utf-8'))
+        self.total_tokens += tokens
+        self.min_tokens = tokens if self.min_tokens is None else min(self.min_tokens, tokens)
+        self.max_tokens = max(self.max_tokens, tokens)
+
+    def summary(self) -> dict:
+        return {
+            'chunk_count': self.count,
+            'total_bytes': self.total_bytes,
+            'avg_bytes': round(self.total_bytes / self.count, 1) if self.count else 0,
+            'total_tokens': self.total_tokens,
+            'avg_tokens': round(self.total_tokens / self.count, 1) if self.count else 0,
+            'min_tokens': self.min_tokens or 0,
+            'max_tokens': self.max_tokens,
+        }
+
+# 모듈 로드(콜드 스타트 초기화)에 걸린 시간
+INIT_DURATION_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 1)
@@ -0,0 +1,88 @@
+"""
+로그 저장소 요약 열(LogStore.iter_columns) 위의 group-by 집계.
+세그먼트마다 status_code / path / 예외 클래스 / 시간 칸별 건수를 np.bincount로 세고, 세그먼트별 사전 코드를
+문자열로 바꿔 합칩니다. 레코드 JSON은 읽지 않으며 파이썬 루프는 세그먼트 수 × 세그먼트 안의 서로 다른 값 수만큼만 돕니다.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+# status_code는 -1(없음) ~ 999
+STATUS_SLOTS = 1001
+NO_TS = np.iinfo(np.int64).max
+
+
+class LogAggregator:
+    """[start_ms, start_ms + cells·step_ms) 구간의 로그 건수/오류 수를 값별, 시간 칸별로 누적합니다."""
+
+    def __init__(self, start_ms: int, step_ms: int, cells: int):
+        self.start_ms = start_ms
+        self.step_ms = step_ms
+        self.total = 0
+        self.errors = 0
+        self.first_error = None
+        self.last_error = None
+        self.status_counts = np.zeros(STATUS_SLOTS, dtype=np.int64)
+        self.status_errors = np.zeros(STATUS_SLOTS, dtype=np.int64)
+        self.timeline_counts = np.zeros(cells, dtype=np.int64)
+        self.timeline_errors = np.zeros(cells, dtype=np.int64)
+        # 필드 → 값 → [건수, 오류 수, 첫 오류 ms, 마지막 오류 ms]
+        self.groups: Dict[str, Dict[str, list]] = {'path': {}, 'exception': {}}
+
+    def add(self, columns: Dict[str, np.ndarray]):
+        ts, error = columns['ts'], columns['error']
+        if not ts.size:
+            return
+        self.total += int(ts.size)
+        error_ts = ts[error]
+        self.errors += int(error_ts.size)
+        if error_ts.size:
+            low, high = int(error_ts.min()), int(error_ts.max())
+            self.first_error = low if self.first_error is None else min(self.first_error, low)
+            self.last_error = high if self.last_error is None else max(self.last_error, high)
+
+        status = columns['status'].astype(np.int64) + 1
+        self.status_counts += np.bincount(status, minlength=STATUS_SLOTS)
+        self.status_errors += np.bincount(status[error], minlength=STATUS_SLOTS)
+
+        cells = self.timeline_counts.size
+        cell = (ts - self.start_ms) // self.step_ms
+        inside = (cell >= 0) & (cell < cells)
+        self.timeline_counts += np.bincount(cell[inside], minlength=cells)[:cells]
+        self.timeline_errors += np.bincount(cell[inside & error], minlength=cells)[:cells]
+
+        for field, groups in self.groups.items():
+            codes = columns[field].astype(np.int64)
+            values = columns[f"{field}_values"]
+            counts = np.bincount(codes, minlength=values.size)
+            error_counts = np.bincount(codes[error], minlength=values.size)
+            first = np.full(values.size, NO_TS, dtype=np.int64)
+            last = np.full(values.size, -1, dtype=np.int64)
+            np.minimum.at(first, codes[error], error_ts)
+            np.maximum.at(last, codes[error], error_ts)
+            # 코드 0은 값 없음
+            for code in np.flatnonzero(counts[1:]) + 1:
+                group = groups.setdefault(str(values[code]), [0, 0, None, None])
+                group[0] += int(counts[code])
+                if error_counts[code]:
+                    group[1] += int(error_counts[code])
+                    group[2] = int(first[code]) if group[2] is None else min(group[2], int(first[code]))
+                    group[3] = int(last[code]) if group[3] is None else max(group[3], int(last[code]))
+
+    def status_rows(self) -> List[list]:
+        """[status_code(없으면 None), 건수, 오류 수] — 건수 내림차순."""
+        present = np.flatnonzero(self.status_counts)
+        order = present[np.argsort(-self.status_counts[present], kind='stable')]
+        return [[int(slot) - 1 if slot else None, int(self.status_counts[slot]), int(self.status_errors[slot])]
+                for slot in order]
+
+    def group_rows(self, field: str) -> List[list]:
+        """[값, 건수, 오류 수, 첫 오류 ms, 마지막 오류 ms] — 오류 수, 건수 내림차순."""
+        return sorted(([name] + group for name, group in self.groups[field].items()),
+                      key=lambda row: (-row[2], -row[1], row[0]))
+
+    def timeline_rows(self) -> List[list]:
+        """[칸 시작 ms, 건수, 오류 수] — 로그가 있는 칸만."""
+        return [[self.start_ms + int(cell) * self.step_ms, int(self.timeline_counts[cell]), int(self.timeline_errors[cell])]
+                for cell in np.flatnonzero(self.timeline_counts)]
@@ -1,4 +1,66 @@
-from datetime import datetime
+import time
+# 콜드 스타트 초기화(모듈 로드) 시간 측정 시작점
+_INIT_STARTED = time.perf_counter()
+
+import os
+from datetime import datetime, timedelta, timezone
+
+try:
+    from log_store import LogStore, to_epoch_millis, encode_cursor, decode_cursor, extract_exception_class, is_error_record
+    from log_collapse import collapse_logs, LogCollapser
+    from log_sampling import StratifiedReservoir, evenly_spaced, LOG_SAMPLE_MAX_SIZE
+    from log_aggregation import LogAggregator
+    from tool_response import encode_response, parse_list, parse_int, parse_options
+    from result_cache import cached, create_result_cache
+    from datadog_client import DatadogError, create_datadog_client, trace_log_query, log_event_to_record
+    LOG_BACKEND_IMPORT_ERROR = None
+except ImportError as e:
+    # Agent.create(tool_code=...)는 이 파일 하나만 압축해 배포하므로 형제 모듈이나 numpy가 없을 수 있음.
+    # 그때는 저장소 없이 기존 샘플 응답으로 동작
+    LOG_BACKEND_IMPORT_ERROR = e
+    LogStore = encode_response = None
+
+    class DatadogError(Exception):
+        pass
+
+    def cached(cache):
+        return lambda func: func
+
+    def parse_int(value):
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            return None
+
+    def parse_options(value):
+        return {}
+
+# 응답 시각을 표기할 UTC 오프셋 (로그 저장소의 LOG_UTC_OFFSET_HOURS와 같은 값, 기본 KST)
+LOG_UTC_OFFSET_HOURS = float(os.environ.get('LOG_UTC_OFFSET_HOURS', 9))
+LOG_TZ = timezone(timedelta(hours=LOG_UTC_OFFSET_HOURS))
+# 로컬 로그 저장소 위치 (generate_fake_logs.py로 생성)
+LOG_STORE_DIR = os.environ.get('LOG_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'log_data'))
+# 반복되는 오류를 지문별 대표 레코드로 접어서 반환할지 여부
+LOG_COLLAPSE_ENABLED = os.environ.get('LOG_COLLAPSE_ENABLED', 'true').lower() == 'true'
+# tail 호출 한 번에 반환할 최대 신규 레코드 수 (넘으면 has_more와 함께 그 지점의 커서를 반환)
+LOG_TAIL_MAX_RECORDS = int(os.environ.get('LOG_TAIL_MAX_RECORDS', 200))
+# 집계 타임라인 칸 간격 후보와 최대 칸 수 (구간이 길면 1분 → 5분 → ... → 1일로 거칠게)
+LOG_AGGREGATE_STEPS_MS = (60 * 1000, 5 * 60 * 1000, 15 * 60 * 1000, 60 * 60 * 1000, 6 * 60 * 60 * 1000, 24 * 60 * 60 * 1000)
+LOG_AGGREGATE_MAX_BUCKETS = int(os.environ.get('LOG_AGGREGATE_MAX_BUCKETS', 120))
+# path/예외 클래스 표에 남길 최대 행 수 (오류 수 순)
+LOG_AGGREGATE_TOP = int(os.environ.get('LOG_AGGREGATE_TOP', 10))
+if LOG_BACKEND_IMPORT_ERROR is None:
+    # 봉인된 세그먼트 인덱스를 호출 간에 재사용하도록 컨테이너당 한 번 생성 (저장소가 배포되지 않았으면 None)
+    log_store = LogStore(LOG_STORE_DIR) if os.path.isdir(LOG_STORE_DIR) else None
+    # 같은 trace/서비스/시간 범위 재질의용 결과 캐시 (RESULT_CACHE_* 환경 변수)
+    result_cache = create_result_cache()
+    # DD_API_KEY가 있으면 trace 검색을 Datadog Logs API로 (연결 풀을 호출 간에 재사용하도록 컨테이너당 한 번 생성)
+    datadog = create_datadog_client()
+else:
+    print(f"[init] 로그 저장소 모듈을 불러오지 못해 샘플 응답으로 동작합니다: {LOG_BACKEND_IMPORT_ERROR}")
+    log_store = result_cache = datadog = None
+if LOG_BACKEND_IMPORT_ERROR is None and log_store is None:
+    print(f"[init] 로그 저장소 디렉토리가 없습니다: {LOG_STORE_DIR}")
 
 def get_named_parameter(event, name):
     if 'parameters' in event:
@@ -7,17 +69,43 @@ def get_named_parameter(event, name):
     else:
         return None
     
+def get_named_parameters(event):
+    """파라미터 목록을 한 번에 이름 → 값 dict로 변환합니다. options에 묶인 선택 파라미터도 풀어 넣습니다."""
+    parameters = {item['name']: item['value'] for item in event.get('parameters', [])}
+    # 함수당 파라미터 수 한도 때문에 선택 파라미터는 options 하나로 묶여 옴 (따로 온 값이 우선)
+    return dict(parse_options(parameters.pop('options', None)), **parameters)
+    
 def populate_function_response(event, response_body):
+    if encode_response is None:
+        return {'response': {'actionGroup': event['actionGroup'], 'function': event['function'],
+                    'functionResponse': {'responseBody': {'TEXT': {'body': str(response_body)}}}}}
+    # 공백 없는 JSON으로 인코딩하고 fields 투영과 바이트 예산 적용
+    body, info = encode_response(response_body, get_named_parameters(event).get('fields'))
+    print(f"[response] bytes={info['bytes']} truncated={info['truncated']} projected={info['projected']}")
     return {'response': {'actionGroup': event['actionGroup'], 'function': event['function'],
-                'functionResponse': {'responseBody': {'TEXT': {'body': str(response_body)}}}}}
+                'functionResponse': {'responseBody': {'TEXT': {'body': body}}}}}
 
-def search_logs_by_trace(trace_id, from_ts, to_ts, service, env):
-    # 실제로는 Datadog API를 호출하여 로그를 검색하겠지만,
-    # 데모 목적으로 샘플 데이터 반환
+def format_ts(ts_ms):
+    # Lambda 호스트 시간대(UTC)가 아니라 로그 timestamp와 같은 LOG_TZ 기준으로 표기
+    return datetime.fromtimestamp(ts_ms/1000, LOG_TZ).strftime('%Y-%m-%d %H:%M:%S') if ts_ms is not None else None
+
+def format_ts_millis(ts_ms):
+    # 로그 timestamp와 같은 밀리초 형식
+    return datetime.fromtimestamp(ts_ms/1000, LOG_TZ).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def window_error(from_ts, to_ts):
+    return f"오류: from_ts/to_ts는 정수(밀리초 타임스탬프)여야 합니다 (입력값: from_ts={from_ts}, to_ts={to_ts})"
+
+def store_unavailable_error():
+    reason = LOG_BACKEND_IMPORT_ERROR or f"{LOG_STORE_DIR} 없음"
+    return f"오류: 로그 저장소를 사용할 수 없습니다 ({reason}). 로그 저장소와 모듈을 함께 배포했는지 확인하세요"
+
+def sample_trace_logs(trace_id, from_ts, to_ts, service, env):
+    # 로그 저장소도 Datadog 클라이언트도 없는 배포에서는 데모 목적의 샘플 데이터 반환
     
     # 타임스탬프를 읽기 쉬운 형식으로 변환
-    from_date = datetime.fromtimestamp(int(from_ts)/1000).strftime('%Y-%m-%d %H:%M:%S')
-    to_date = datetime.fromtimestamp(int(to_ts)/1000).strftime('%Y-%m-%d %H:%M:%S')
+    from_date = format_ts(from_ts)
+    to_date = format_ts(to_ts)
     
     # 샘플 로그 데이터
     return {
@@ -52,21 +140,328 @@ def search_logs_by_trace(trace_id, from_ts, to_ts, service, env):
         }
     }
 
+def iter_trace_logs(trace_ids, from_ts, to_ts, service, env):
+    """
+    trace들의 (epoch ms, 레코드) 스트림. Datadog 클라이언트가 있으면 Logs API를 시간 조각별로 동시에 페이지 조회하고
+    (도착 순), 없으면 로컬 저장소 인덱스에서 읽습니다. 어느 쪽이든 레코드 형식은 같습니다.
+    """
+    if datadog is None:
+        yield from log_store.iter_search(trace_ids, from_ts, to_ts, service, env)
+        return
+    for event in datadog.search_logs(trace_log_query(trace_ids, service, env), int(from_ts), int(to_ts)):
+        ts, record = log_event_to_record(event)
+        if ts is not None and record.get('trace_id') in trace_ids:
+            yield ts, record
+
+def search_trace_logs(trace_ids, from_ts, to_ts, service, env):
+    """trace_id → timestamp 순 레코드 목록 (없는 trace는 빈 목록, LogStore.search_many와 같은 형식)."""
+    if datadog is None:
+        return log_store.search_many(trace_ids, from_ts, to_ts, service, env)
+    matches = {trace_id: [] for trace_id in trace_ids}
+    for ts, record in iter_trace_logs(matches, from_ts, to_ts, service, env):
+        matches[record['trace_id']].append((ts, record))
+    return {trace_id: [record for _, record in sorted(found, key=lambda item: item[0])]
+            for trace_id, found in matches.items()}
+
+@cached(result_cache)
+def search_logs_by_trace(trace_id, from_ts, to_ts, service, env, max_logs=None):
+    """
+    trace의 로그를 스트리밍으로 받아 max_logs(기본 LOG_SAMPLE_SIZE, 1~LOG_SAMPLE_MAX_SIZE)개 이하로 반환합니다.
+    오류 레코드는 지문별로 묶어 고유 지문을 모두 세고, 그 외 레코드는 시간 버킷별 표본으로만 보관합니다.
+    응답에는 오류 지문(건수 순)을 먼저 담고 남은 자리를 표본으로 채우며, 넘쳐서 뺀 지문 수를 보고합니다.
+    """
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    if log_store is None and datadog is None:
+        return sample_trace_logs(trace_id, from_ms, to_ms, service, env)
+    capacity = None
+    if max_logs is not None and str(max_logs).strip():
+        capacity = parse_int(max_logs)
+        if capacity is None:
+            return f"오류: max_logs는 정수여야 합니다 (입력값: {max_logs})"
+        capacity = min(max(capacity, 1), LOG_SAMPLE_MAX_SIZE)
+    reservoir = StratifiedReservoir(capacity)
+    capacity = reservoir.capacity
+    # 오류는 지문별 대표 레코드와 count/first_seen/last_seen만 보관 (메모리는 오류 지문 수에 비례)
+    errors = LogCollapser()
+    log_count = 0
+    try:
+        # 로컬 로그 저장소의 trace_id 인덱스(from_ts/to_ts 밖의 세그먼트는 읽지 않음) 또는 Datadog Logs API로 검색
+        for ts, record in iter_trace_logs([trace_id], from_ms, to_ms, service, env):
+            log_count += 1
+            if is_error_record(record, extract_exception_class(record)):
+                key = errors.add(record, ts)
+                if LOG_COLLAPSE_ENABLED:
+                    continue
+                # 접지 않을 때도 오류 레코드가 어느 지문에 속하는지 남김
+                record = dict(record, fingerprint=key)
+            reservoir.add(ts, record)
+    except DatadogError as e:
+        return f"오류: 로그 검색에 실패했습니다 ({e}). 잠시 후 다시 시도하세요"
+    
+    groups = errors.results()
+    # 지문이 capacity보다 많으면 건수가 많은 지문만 남김 (순서는 first_seen 순 유지)
+    kept_keys = {group['fingerprint'] for group in sorted(groups, key=lambda group: group['count'], reverse=True)[:capacity]}
+    kept = [group for group in groups if group['fingerprint'] in kept_keys]
+    if LOG_COLLAPSE_ENABLED:
+        samples = evenly_spaced(reservoir.items(), capacity - len(kept))
+        logs = sorted(kept + [record for _, record in samples],
+                      key=lambda record: to_epoch_millis(record.get('timestamp')) or 0)
+    else:
+        samples = evenly_spaced(reservoir.items(), capacity)
+        logs = [record for _, record in samples]
+    
+    # 타임스탬프를 읽기 쉬운 형식으로 변환
+    from_date = format_ts(from_ms)
+    to_date = format_ts(to_ms)
+    
+    result = {
+        "logs": logs,
+        "search_metadata": {
+            "trace_id": trace_id,
+            "service": service,
+            "environment": env,
+            "from": from_date,
+            "to": to_date,
+            "log_count": log_count,
+            "error_log_count": errors.total,
+            "fingerprint_count": len(groups),
+            "dropped_fingerprint_count": len(groups) - len(kept),
+            "sampled": len(samples) < reservoir.total
+        }
+    }
+    if not LOG_COLLAPSE_ENABLED:
+        result["fingerprints"] = [{"fingerprint": group['fingerprint'], "count": group['count'],
+                                   "first_seen": group['first_seen'], "last_seen": group['last_seen']}
+                                  for group in kept]
+    if len(samples) < reservoir.total:
+        histogram = reservoir.histogram()
+        sample_ts = [ts for ts, _ in samples]
+        result["sampling"] = {
+            "total_log_count": reservoir.total,
+            "sample_size": len(samples),
+            "time_buckets": [{
+                "from": format_ts_millis(bucket['from_ms']),
+                "to": format_ts_millis(bucket['to_ms']),
+                "count": bucket['count'],
+                "sampled": sum(1 for ts in sample_ts if bucket['from_ms'] <= ts < bucket['to_ms'])
+            } for bucket in histogram]
+        }
+    return result
+
+@cached(result_cache)
+def search_logs_by_traces(trace_ids, from_ts, to_ts, service, env):
+    """
+    여러 trace를 로그 저장소 한 번 순회로 검색합니다 (알림 폭주 시 같은 장애의 trace 묶음).
+    지문 접기를 켜면 trace들이 공유하는 지문의 대표 레코드는 fingerprints에 한 번만 담고,
+    traces에는 trace별 지문 참조와 건수만 남깁니다.
+    """
+    if log_store is None and datadog is None:
+        return store_unavailable_error()
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    trace_list = list(dict.fromkeys(parse_list(trace_ids)))
+    try:
+        found = search_trace_logs(trace_list, from_ms, to_ms, service, env)
+    except DatadogError as e:
+        return f"오류: 로그 검색에 실패했습니다 ({e}). 잠시 후 다시 시도하세요"
+    
+    from_date = format_ts(from_ms)
+    to_date = format_ts(to_ms)
+    metadata = {
+        "trace_count": len(trace_list),
+        "service": service,
+        "environment": env,
+        "from": from_date,
+        "to": to_date,
+        "log_count": sum(len(logs) for logs in found.values()),
+        "missing_traces": [trace_id for trace_id in trace_list if not found[trace_id]]
+    }
+    if not LOG_COLLAPSE_ENABLED:
+        return {"traces": [{"trace_id": trace_id, "log_count": len(found[trace_id]), "logs": found[trace_id]}
+                           for trace_id in trace_list if found[trace_id]],
+                "search_metadata": metadata}
+    
+    shared = LogCollapser()
+    traces = []
+    trace_counts = {}
+    for trace_id in trace_list:
+        if not found[trace_id]:
+            continue
+        # 지문은 레코드마다 한 번만 계산해 전체/trace별 집계에 함께 사용
+        per_trace = LogCollapser()
+        for record in found[trace_id]:
+            per_trace.add_keyed(shared.add(record), record)
+        for key in per_trace.groups:
+            trace_counts[key] = trace_counts.get(key, 0) + 1
+        traces.append({
+            "trace_id": trace_id,
+            "log_count": per_trace.total,
+            "fingerprints": [{"fingerprint": group['fingerprint'], "count": group['count'],
+                              "first_seen": group['first_seen'], "last_seen": group['last_seen']}
+                             for group in per_trace.results()]
+        })
+    fingerprints = [dict(group, trace_count=trace_counts[group['fingerprint']]) for group in shared.results()]
+    metadata["fingerprint_count"] = len(fingerprints)
+    
+    return {
+        "fingerprints": fingerprints,
+        "traces": traces,
+        "search_metadata": metadata
+    }
+
+def tail_logs(service, env, from_ts=None, cursor=None, trace_id=None):
+    """
+    라이브 tail: cursor가 없으면 from_ts 이후의 로그를, 있으면 그 커서 이후 새로 추가된 로그만 반환합니다.
+    응답의 cursor를 다음 호출에 넘기면 이어서 읽습니다. 매번 새 데이터를 봐야 하므로 결과 캐시를 쓰지 않습니다.
+    """
+    if log_store is None:
+        return store_unavailable_error()
+    if cursor:
+        try:
+            positions, from_ms = decode_cursor(cursor.strip())
+        except ValueError:
+            return "오류: cursor가 올바르지 않습니다. cursor 없이 from_ts로 다시 시작하세요"
+    elif from_ts:
+        positions, from_ms = {}, parse_int(from_ts)
+        if from_ms is None:
+            return f"오류: from_ts는 정수(밀리초 타임스탬프)여야 합니다 (입력값: {from_ts})"
+    else:
+        return "오류: 첫 호출에는 from_ts가 필요합니다"
+    
+    logs = []
+    has_more = False
+    for record, partition, number, end in log_store.tail(positions, from_ms):
+        positions[partition] = (number, end)
+        if service and record.get('service') != service:
+            continue
+        if env and record.get('environment') != env:
+            continue
+        if trace_id and record.get('trace_id') != trace_id:
+            continue
+        if (to_epoch_millis(record.get('timestamp')) or 0) < from_ms:
+            continue
+        logs.append(record)
+        if len(logs) >= LOG_TAIL_MAX_RECORDS:
+            # 나머지는 다음 호출에서 이 위치부터 이어 읽음
+            has_more = True
+            break
+    new_log_count = len(logs)
+    logs.sort(key=lambda record: to_epoch_millis(record.get('timestamp')) or 0)
+    if LOG_COLLAPSE_ENABLED:
+        logs = collapse_logs(logs)
+    
+    return {
+        "logs": logs,
+        "cursor": encode_cursor(positions, from_ms),
+        "tail_metadata": {
+            "service": service,
+            "environment": env,
+            "trace_id": trace_id,
+            "from": format_ts(from_ms),
+            "new_log_count": new_log_count,
+            "fingerprint_count": len(logs) if LOG_COLLAPSE_ENABLED else None,
+            "has_more": has_more
+        }
+    }
+
+def aggregation_step(from_ms, to_ms):
+    """타임라인 칸 수가 LOG_AGGREGATE_MAX_BUCKETS 이하가 되는 가장 세밀한 간격."""
+    for step in LOG_AGGREGATE_STEPS_MS:
+        if (to_ms - from_ms) // step < LOG_AGGREGATE_MAX_BUCKETS:
+            return step
+    # 1일 간격으로도 넘치면 여러 날씩 묶음
+    day = LOG_AGGREGATE_STEPS_MS[-1]
+    return day * -(-(to_ms - from_ms) // (day * (LOG_AGGREGATE_MAX_BUCKETS - 1)))
+
+def group_table(aggregator, field):
+    rows = aggregator.group_rows(field)
+    return {
+        "columns": [field, "count", "errors", "first_error", "last_error"],
+        "rows": [[name, count, errors, format_ts(first), format_ts(last)]
+                 for name, count, errors, first, last in rows[:LOG_AGGREGATE_TOP]],
+        "omitted": max(0, len(rows) - LOG_AGGREGATE_TOP)
+    }
+
+@cached(result_cache)
+def aggregate_logs(service, env, from_ts, to_ts):
+    """
+    서비스/환경의 구간 로그를 status_code, path, 예외 클래스, 시간 칸별로 세어 표로 반환합니다.
+    로그 저장소의 요약 열만 읽어 NumPy로 집계하므로 레코드 수와 무관하게 응답 크기가 작습니다.
+    """
+    if log_store is None:
+        return store_unavailable_error()
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    step = aggregation_step(from_ms, to_ms)
+    # 6시간/1일 칸도 UTC가 아니라 LOG_TZ 자정 기준으로 나눔
+    offset_ms = int(LOG_UTC_OFFSET_HOURS * 60 * 60 * 1000)
+    start = (from_ms + offset_ms) // step * step - offset_ms
+    aggregator = LogAggregator(start, step, max(1, -(-(to_ms + 1 - start) // step)))
+    for columns in log_store.iter_columns(from_ms, to_ms, service, env):
+        aggregator.add(columns)
+    
+    return {
+        "service": service,
+        "environment": env,
+        "time_period": {
+            "from": format_ts(from_ms),
+            "to": format_ts(to_ms)
+        },
+        "log_count": aggregator.total,
+        "error_count": aggregator.errors,
+        "first_error": format_ts(aggregator.first_error),
+        "last_error": format_ts(aggregator.last_error),
+        "by_status_code": {
+            "columns": ["status_code", "count", "errors"],
+            "rows": aggregator.status_rows()
+        },
+        "by_path": group_table(aggregator, 'path'),
+        "by_exception": group_table(aggregator, 'exception'),
+        "timeline": {
+            "step_seconds": step // 1000,
+            "columns": ["time", "count", "errors"],
+            "rows": [[format_ts(ts), count, errors] for ts, count, errors in aggregator.timeline_rows()]
+        }
+    }
+
+# 함수 이름 → (구현 함수, 파라미터 이름 순서). 컨테이너당 한 번만 구성
+FUNCTIONS = {
+    'search_logs_by_trace': (search_logs_by_trace, ('trace_id', 'from_ts', 'to_ts', 'service', 'env', 'max_logs')),
+    'search_logs_by_traces': (search_logs_by_traces, ('trace_ids', 'from_ts', 'to_ts', 'service', 'env')),
+    'tail_logs': (tail_logs, ('service', 'env', 'from_ts', 'cursor', 'trace_id')),
+    'aggregate_logs': (aggregate_logs, ('service', 'env', 'from_ts', 'to_ts')),
+}
+
+# 컨테이너 단위로 유지되는 호출 횟수 (1이면 콜드 스타트)
+_invocations = 0
+
+def log_invocation_timing(started):
+    global _invocations
+    _invocations += 1
+    handler_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"[timing] cold_start={_invocations == 1} invocation={_invocations} init_ms={INIT_DURATION_MS} handler_ms={handler_ms}")
+
 def lambda_handler(event, context):
+    started = time.perf_counter()
     print(event)
     function = event['function']
     
-    if function == 'search_logs_by_trace':
-        trace_id = get_named_parameter(event, 'trace_id')
-        from_ts = get_named_parameter(event, 'from_ts')
-        to_ts = get_named_parameter(event, 'to_ts')
-        service = get_named_parameter(event, 'service')
-        env = get_named_parameter(event, 'env')
+    if function in FUNCTIONS:
+        func, param_names = FUNCTIONS[function]
+        parameters = get_named_parameters(event)
         
-        result = search_logs_by_trace(trace_id, from_ts, to_ts, service, env)
+        result = func(*(parameters.get(name) for name in param_names))
     else:
         result = f"오류: 함수 '{function}'를 인식할 수 없습니다"
 
     response = populate_function_response(event, result)
     print(response)
+    log_invocation_timing(started)
     return response
+
+# 모듈 로드(콜드 스타트 초기화)에 걸린 시간
+INIT_DURATION_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 1)
@@ -0,0 +1,110 @@
+"""
+로그 레코드 지문(fingerprint) 계산과 중복 접기(collapse).
+오류 레코드는 예외 클래스 + 정규화한 상위 N개 스택 프레임으로, 그 외 레코드는 숫자/ID를 지운 메시지로
+지문을 만들고, 지문마다 대표 레코드 하나에 count / first_seen / last_seen을 붙여 반환합니다.
+같은 예외가 수천 번 반복되는 trace도 에이전트에게는 지문 수만큼의 레코드만 전달됩니다.
+"""
+
+import os
+import re
+import hashlib
+from typing import Dict, Iterable, List
+
+from log_store import to_epoch_millis, extract_exception_class
+
+# 지문에 포함할 상위 스택 프레임 수
+FINGERPRINT_TOP_FRAMES = int(os.environ.get('LOG_FINGERPRINT_TOP_FRAMES', 5))
+
+# 프레임 정규화: 줄 번호, 람다/프록시 등 생성된 클래스 번호, 16진 주소
+_LINE_NUMBER = re.compile(r':\d+\)')
+_GENERATED_SUFFIX = re.compile(r'\$\$?(?:Lambda|Proxy|EnhancerBySpringCGLIB|FastClassBySpringCGLIB)?\$?[\w]*?\d[\w/]*')
+_HEX = re.compile(r'0x[0-9a-fA-F]+')
+# 메시지 정규화: 16진 ID/UUID와 숫자
+_MESSAGE_ID = re.compile(r'\b[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*\b|\d+')
+
+
+def normalize_frame(frame: str) -> str:
+    frame = frame.strip()
+    if frame.startswith('at '):
+        frame = frame[3:]
+    frame = _LINE_NUMBER.sub(')', frame)
+    frame = _HEX.sub('0x', frame)
+    return _GENERATED_SUFFIX.sub('$', frame)
+
+
+def top_frames(stack_trace: str, limit: int) -> List[str]:
+    frames = []
+    for line in stack_trace.splitlines():
+        line = line.strip()
+        # "Caused by", "... 12 more" 같은 줄은 프레임이 아님
+        if not line.startswith('at '):
+            continue
+        frames.append(normalize_frame(line))
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def fingerprint(record: dict, top_n: int = None) -> str:
+    """레코드 지문 (16자리 16진 문자열)."""
+    top_n = FINGERPRINT_TOP_FRAMES if top_n is None else top_n
+    exception_class = extract_exception_class(record)
+    stack_trace = record.get('stack_trace')
+    if exception_class or isinstance(stack_trace, str):
+        parts = [record.get('service') or '', exception_class or '']
+        if isinstance(stack_trace, str):
+            parts.extend(top_frames(stack_trace, top_n))
+    else:
+        message = record.get('message') or record.get('error_details') or ''
+        parts = [record.get('service') or '', '', _MESSAGE_ID.sub('#', str(message))]
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class LogCollapser:
+    """레코드를 하나씩 받아 지문별 대표 레코드와 집계를 유지합니다. 메모리는 지문 수에 비례합니다."""
+
+    def __init__(self, top_n: int = None):
+        self.top_n = top_n
+        self.groups: Dict[str, dict] = {}
+        self.total = 0
+
+    def add(self, record: dict, ts: int = None) -> str:
+        return self.add_keyed(fingerprint(record, self.top_n), record, ts)
+
+    def add_keyed(self, key: str, record: dict, ts: int = None) -> str:
+        """
+        지문을 이미 계산한 레코드를 더합니다 (여러 collapser가 같은 지문을 공유할 때).
+        ts(epoch ms)를 주면 timestamp를 다시 해석하지 않습니다.
+        """
+        self.total += 1
+        ts = to_epoch_millis(record.get('timestamp')) if ts is None else ts
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = {'record': record, 'count': 1,
+                                'first_ts': ts, 'first_seen': record.get('timestamp'),
+                                'last_ts': ts, 'last_seen': record.get('timestamp')}
+            return key
+        group['count'] += 1
+        if ts is not None:
+            if group['first_ts'] is None or ts < group['first_ts']:
+                # 가장 이른 레코드를 대표로 사용
+                group.update(record=record, first_ts=ts, first_seen=record.get('timestamp'))
+            if group['last_ts'] is None or ts > group['last_ts']:
+                group.update(last_ts=ts, last_seen=record.get('timestamp'))
+        return key
+
+    def add_all(self, records: Iterable[dict]):
+        for record in records:
+            self.add(record)
+        return self
+
+    def results(self) -> List[dict]:
+        """지문별 대표 레코드를 first_seen 순으로 반환합니다."""
+        groups = sorted(self.groups.items(), key=lambda item: (item[1]['first_ts'] is None, item[1]['first_ts'] or 0))
+        return [dict(group['record'], fingerprint=key, count=group['count'],
+                     first_seen=group['first_seen'], last_seen=group['last_seen'])
+                for key, group in groups]
+
+
+def collapse_logs(records: Iterable[dict], top_n: int = None) -> List[dict]:
+    return LogCollapser(top_n).add_all(records).results()
@@ -0,0 +1,129 @@
+"""
+레코드가 수십만 줄인 trace(재시도 폭주, 배치 작업 등)를 응답 크기 안에 담기 위한 유한 표본 추출.
+
+- 일치하는 레코드를 스트리밍으로 받아, capacity 이하일 때는 전부 보관하고 넘으면 시간 버킷별 저수지(reservoir) 표본으로 바꿉니다.
+- 시간 버킷은 1ms 폭에서 시작해 버킷 수가 strata를 넘을 때마다 폭을 두 배로 넓히고 이웃 버킷 표본을 합치므로,
+  trace 길이를 미리 몰라도 표본이 전체 시간 축에 고르게 퍼져 장애의 모양(언제 몰렸는지)이 남습니다.
+- 버킷별 실제 건수는 따로 세므로 응답에는 표본과 함께 참 건수가 보고됩니다. 메모리는 capacity + 버킷 수에 비례합니다.
+"""
+
+import os
+import random
+from typing import Any, Dict, List, Tuple
+
+# 응답에 담을 최대 표본 레코드 수와 시간 버킷 수
+LOG_SAMPLE_SIZE = int(os.environ.get('LOG_SAMPLE_SIZE', 100))
+# 호출자가 max_logs로 요청할 수 있는 표본 수의 상한
+LOG_SAMPLE_MAX_SIZE = int(os.environ.get('LOG_SAMPLE_MAX_SIZE', 1000))
+LOG_SAMPLE_BUCKETS = int(os.environ.get('LOG_SAMPLE_BUCKETS', 10))
+# 같은 질의에 같은 표본을 돌려주도록 고정한 난수 시드
+LOG_SAMPLE_SEED = int(os.environ.get('LOG_SAMPLE_SEED', 0))
+# 시간 버킷의 시작 폭 (실제 trace 길이에 맞춰 두 배씩 넓어짐)
+INITIAL_BUCKET_MS = 1
+
+
+def merge_reservoirs(rng: random.Random, first: List[Any], first_total: int,
+                     second: List[Any], second_total: int, capacity: int) -> List[Any]:
+    """
+    모집단 first_total, second_total에서 각각 뽑은 균등 표본 두 개를 합쳐, 합친 모집단의 균등 표본(최대 capacity개)을 만듭니다.
+    매번 남은 모집단 크기에 비례해 어느 쪽에서 꺼낼지 정합니다 (비복원 추출).
+    """
+    first, second = list(first), list(second)
+    rng.shuffle(first)
+    rng.shuffle(second)
+    merged = []
+    while len(merged) < capacity and (first or second):
+        if first and (not second or rng.random() * (first_total + second_total) < first_total):
+            merged.append(first.pop())
+            first_total -= 1
+        else:
+            merged.append(second.pop())
+            second_total -= 1
+    return merged
+
+
+def evenly_spaced(items: List[Any], size: int) -> List[Any]:
+    """시각 순 목록에서 같은 간격으로 size개를 골라, 시간 축의 모양을 유지한 채 줄입니다."""
+    if size <= 0:
+        return []
+    if len(items) <= size:
+        return list(items)
+    return [items[i * len(items) // size] for i in range(size)]
+
+
+class StratifiedReservoir:
+    """
+    (timestamp, 항목)을 받아 시간 버킷별 저수지 표본을 유지합니다.
+    total 개까지는 모두 보관하고(exact), 넘으면 버킷당 capacity // strata 개 표본으로 바꿉니다.
+    """
+
+    def __init__(self, capacity: int = None, strata: int = None, seed: int = None):
+        self.capacity = capacity or LOG_SAMPLE_SIZE
+        self.strata = max(1, min(strata or LOG_SAMPLE_BUCKETS, self.capacity))
+        self.rng = random.Random(LOG_SAMPLE_SEED if seed is None else seed)
+        self.width = INITIAL_BUCKET_MS
+        # 버킷 번호 → [실제 건수, 표본 목록]
+        self.buckets: Dict[int, list] = {}
+        self.total = 0
+        self.sampled = False
+
+    @property
+    def bucket_capacity(self) -> int:
+        return max(1, self.capacity // self.strata)
+
+    def add(self, ts: int, item: Any):
+        self.total += 1
+        key = ts // self.width
+        if key not in self.buckets and len(self.buckets) >= self.strata:
+            # 버킷이 strata개를 넘으면 폭을 넓혀 이웃 버킷을 합침
+            while True:
+                self._coarsen()
+                key = ts // self.width
+                if key in self.buckets or len(self.buckets) < self.strata:
+                    break
+        bucket = self.buckets.setdefault(key, [0, []])
+        bucket[0] += 1
+        if not self.sampled:
+            bucket[1].append((ts, item))
+            if self.total > self.capacity:
+                self._start_sampling()
+            return
+        samples = bucket[1]
+        if len(samples) < self.bucket_capacity:
+            samples.append((ts, item))
+        else:
+            j = self.rng.randrange(bucket[0])
+            if j < len(samples):
+                samples[j] = (ts, item)
+
+    def _start_sampling(self):
+        """보관하던 레코드를 버킷별 표본으로 줄입니다 (이 시점 이후 메모리는 capacity 이하)."""
+        self.sampled = True
+        for bucket in self.buckets.values():
+            if len(bucket[1]) > self.bucket_capacity:
+                bucket[1] = self.rng.sample(bucket[1], self.bucket_capacity)
+
+    def _coarsen(self):
+        self.width *= 2
+        merged: Dict[int, list] = {}
+        for key, (count, samples) in self.buckets.items():
+            target = merged.get(key // 2)
+            if target is None:
+                merged[key // 2] = [count, samples]
+            elif self.sampled:
+                target[1] = merge_reservoirs(self.rng, target[1], target[0], samples, count, self.bucket_capacity)
+                target[0] += count
+            else:
+                target[1].extend(samples)
+                target[0] += count
+        self.buckets = merged
+
+    def items(self) -> List[Tuple[int, Any]]:
+        """보관 중인 (timestamp, 항목)을 시각 순으로 반환합니다."""
+        return sorted((entry for _, samples in self.buckets.values() for entry in samples), key=lambda entry: entry[0])
+
+    def histogram(self) -> List[Dict[str, int]]:
+        """버킷별 (시작 ms, 끝 ms, 실제 건수, 표본 수)."""
+        return [{'from_ms': key * self.width, 'to_ms': (key + 1) * self.width,
+                 'count': count, 'sampled': len(samples)}
+                for key, (count, samples) in sorted(self.buckets.items())]
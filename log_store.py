@@ -0,0 +1,823 @@
+"""
+search_logs_by_trace를 위한 로컬 로그 저장소.
+네트워크 없이 동작하는 추가 전용(append-only) 세그먼트 저장소로, 시간 파티션과 trace_id 인덱스를 가집니다.
+
+디렉토리 구조:
+    {root}/{파티션 시작 epoch ms}/seg-{번호}.log   # 레코드당 JSON 한 줄, 추가 전용 (활성 세그먼트)
+    {root}/{파티션 시작 epoch ms}/seg-{번호}.logz  # 봉인된 세그먼트의 블록 압축본 + 블록 표, trace Bloom 필터, 최소/최대 시각 꼬리말
+    {root}/{파티션 시작 epoch ms}/seg-{번호}.idx   # 봉인된 세그먼트의 trace 인덱스
+    {root}/{파티션 시작 epoch ms}/seg-{번호}.cols.npz  # 봉인된 세그먼트의 요약 열 (시각, 서비스, 환경, 상태 코드, 경로, 예외 클래스, 오류 여부)
+
+- 레코드는 timestamp가 속한 시간 파티션(기본 1일)의 활성 세그먼트에 추가되고,
+  세그먼트가 SEGMENT_MAX_BYTES를 넘으면 봉인되어 인덱스 파일이 만들어집니다.
+- 인덱스는 (trace 해시, timestamp, 오프셋, 길이) 고정 길이 항목을 trace 해시 순으로 정렬한 파일이며,
+  mmap 위에서 이진 탐색하므로 인덱스 전체를 메모리에 올리지 않습니다.
+- 조회 시 from_ts/to_ts와 겹치지 않는 파티션과 세그먼트(인덱스 헤더의 최소/최대 시각)는 열지 않으며,
+  trace 조회 비용은 시간 범위 안의 세그먼트 수 × O(log n) + 일치하는 레코드 수에 비례합니다.
+- 봉인된 세그먼트는 줄 경계에서 나눈 블록 단위로 zlib 압축되고(원본 .log는 삭제), Bloom 필터가 trace를 배제하는
+  세그먼트는 인덱스도 보지 않습니다. 일치하는 레코드가 든 블록만 풀어서 읽습니다.
+- 요약 열은 서비스/환경 단위 집계(오류 수 시계열, 상태 코드/경로별 건수 등)를 JSON 파싱 없이
+  NumPy 벡터 연산으로 처리하기 위한 것으로, 문자열 필드는 세그먼트별 사전 코드로 저장합니다.
+- tail은 파티션별 (세그먼트 번호, 바이트 오프셋) 위치 이후에 추가된 줄만 읽습니다. 세그먼트는 추가 전용이므로
+  이 위치를 담은 커서(encode_cursor)로 라이브 조회를 이어 가면 새로 쌓인 만큼만 읽습니다.
+- 다른 프로세스가 쓰는 미봉인 세그먼트는 스캔한 인덱스/요약 열을 (크기, 수정 시각)과 함께 보관해
+  search/aggregate 호출마다 파일 전체를 다시 파싱하지 않고 새로 추가된 줄만 읽습니다.
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import zlib
+import base64
+import struct
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# 시간 파티션 크기 (기본 1일)
+PARTITION_MS = int(os.environ.get('LOG_PARTITION_MS', 24 * 60 * 60 * 1000))
+# 세그먼트 봉인 크기
+SEGMENT_MAX_BYTES = int(os.environ.get('LOG_SEGMENT_MAX_BYTES', 64 * 1024 * 1024))
+# 시간대 정보가 없는 timestamp의 UTC 오프셋 (로그 시각은 KST 기준)
+LOG_UTC_OFFSET_HOURS = float(os.environ.get('LOG_UTC_OFFSET_HOURS', 9))
+
+INDEX_MAGIC = b'LOGIDX01'
+# 헤더: 매직, 항목 수, 최소 timestamp, 최대 timestamp
+INDEX_HEADER = struct.Struct('<8sQqq')
+# 항목: trace 해시, timestamp, 레코드 오프셋, 레코드 길이
+INDEX_ENTRY = struct.Struct('<QqQI')
+INDEX_DTYPE = np.dtype([('hash', '<u8'), ('ts', '<i8'), ('offset', '<u8'), ('length', '<u4')])
+
+# 봉인할 때 세그먼트를 압축할지 여부와 압축 블록 크기(압축 전 바이트), zlib 압축 수준
+LOG_SEGMENT_COMPRESSION = os.environ.get('LOG_SEGMENT_COMPRESSION', 'true').lower() == 'true'
+LOG_BLOCK_BYTES = int(os.environ.get('LOG_BLOCK_BYTES', 64 * 1024))
+LOG_COMPRESSION_LEVEL = int(os.environ.get('LOG_COMPRESSION_LEVEL', 6))
+# Bloom 필터 목표 오탐률
+LOG_BLOOM_FP_RATE = float(os.environ.get('LOG_BLOOM_FP_RATE', 0.01))
+
+COMPRESSED_MAGIC = b'LOGZ0001'
+# 블록 표 항목: 압축 전 시작 오프셋, 파일 내 오프셋, 압축 길이, 압축 전 길이
+BLOCK_ENTRY = struct.Struct('<QQII')
+# 꼬리말: 매직, 레코드 수, 최소 timestamp, 최대 timestamp, 압축 전 크기, 블록 표 오프셋, Bloom 필터 오프셋,
+#         블록 수, Bloom 비트 수, Bloom 해시 수
+COMPRESSED_FOOTER = struct.Struct('<8sQqqQQQIII')
+
+# 요약 열의 사전 코드 필드 (레코드 키, 열 이름)
+CODED_FIELDS = (('service', 'service'), ('environment', 'environment'), ('path', 'path'), (None, 'exception'))
+# 오류로 보는 로그 레벨
+ERROR_LEVELS = {'ERROR', 'FATAL', 'CRITICAL'}
+
+# 패키지 경로가 붙은 예외 클래스 (예: java.io.IOException, org.x.FooError)
+_EXCEPTION_CLASS = re.compile(r'\b((?:[a-zA-Z_$][\w$]*\.)+[A-Z][\w$]*(?:Exception|Error|Throwable))\b')
+
+
+def trace_hash(trace_id: str) -> int:
+    """trace_id의 64비트 해시. 충돌은 레코드를 읽은 뒤 trace_id를 다시 비교해 걸러냅니다."""
+    return int.from_bytes(hashlib.blake2b(trace_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def to_epoch_millis(value: Any) -> Optional[int]:
+    """timestamp 값(문자열 또는 epoch 초/밀리초)을 epoch 밀리초로 변환합니다. 해석할 수 없으면 None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # 10^12 미만이면 초 단위로 간주
+        return int(value if value >= 1e12 else value * 1000)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        # 숫자 문자열 (from_ts/to_ts 파라미터)
+        try:
+            return to_epoch_millis(float(value))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone(timedelta(hours=LOG_UTC_OFFSET_HOURS)))
+    return int(parsed.timestamp() * 1000)
+
+
+def extract_exception_class(record: dict) -> Optional[str]:
+    """message(없으면 stack_trace, error_details)에서 첫 예외 클래스 이름을 찾습니다."""
+    for field in ('message', 'stack_trace', 'error_details'):
+        value = record.get(field)
+        if isinstance(value, str):
+            match = _EXCEPTION_CLASS.search(value)
+            if match:
+                return match.group(1)
+    return None
+
+
+def is_error_record(record: dict, exception_class: Optional[str]) -> bool:
+    """5xx 상태 코드, 예외, error_details, 오류 레벨 중 하나라도 있으면 오류 레코드."""
+    status = record.get('status_code')
+    if isinstance(status, int) and status >= 500:
+        return True
+    level = record.get('level')
+    return bool(exception_class or record.get('error_details') or (isinstance(level, str) and level.upper() in ERROR_LEVELS))
+
+
+class ColumnBuilder:
+    """세그먼트의 요약 열을 레코드 단위로 쌓습니다. 문자열 필드는 사전 코드(0은 값 없음)로 바꿉니다."""
+
+    def __init__(self):
+        self.ts: List[int] = []
+        self.status: List[int] = []
+        self.error: List[bool] = []
+        self.codes = {column: [] for _, column in CODED_FIELDS}
+        self.dictionaries = {column: {'': 0} for _, column in CODED_FIELDS}
+        # arrays() 결과 (레코드가 추가되면 다시 만듦)
+        self.cached = None
+
+    def add(self, record: dict, ts: int):
+        self.cached = None
+        exception_class = extract_exception_class(record)
+        self.ts.append(ts)
+        status = record.get('status_code')
+        self.status.append(status if isinstance(status, int) and 0 <= status < 1000 else -1)
+        self.error.append(is_error_record(record, exception_class))
+        for field, column in CODED_FIELDS:
+            value = exception_class if field is None else record.get(field)
+            value = value if isinstance(value, str) else ''
+            dictionary = self.dictionaries[column]
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary)
+            self.codes[column].append(code)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        if self.cached is not None:
+            return self.cached
+        arrays = {
+            'ts': np.asarray(self.ts, dtype=np.int64),
+            'status': np.asarray(self.status, dtype=np.int16),
+            'error': np.asarray(self.error, dtype=bool),
+        }
+        for column, codes in self.codes.items():
+            arrays[column] = np.asarray(codes, dtype=np.uint32)
+            arrays[f"{column}_values"] = np.asarray(list(self.dictionaries[column]), dtype=str)
+        self.cached = arrays
+        return arrays
+
+    def write(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **self.arrays())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_file(cls, data_path: str) -> "ColumnBuilder":
+        """요약 열이 없는 세그먼트(미봉인 또는 이전 형식)는 데이터 파일을 스캔해서 만듭니다."""
+        builder = cls()
+        lines = CompressedSegment(data_path).iter_lines() if data_path.endswith('.logz') else read_lines(data_path, 0)
+        for record, _ in lines:
+            builder.add(record, to_epoch_millis(record.get('timestamp')) or 0)
+        return builder
+
+
+class SealedIndex:
+    """봉인된 세그먼트의 trace 인덱스 (mmap + 이진 탐색)."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.min_ts, self.max_ts = INDEX_HEADER.unpack_from(self.mmap, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"로그 인덱스 형식 오류: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> int:
+        # bisect가 trace 해시만 비교하도록 해시만 반환
+        return struct.unpack_from('<Q', self.mmap, INDEX_HEADER.size + i * INDEX_ENTRY.size)[0]
+
+    def lookup(self, hashed: int) -> List[Tuple[int, int, int]]:
+        """trace 해시가 같은 항목의 (timestamp, 오프셋, 길이) 목록."""
+        matches = []
+        i = bisect_left(self, hashed)
+        while i < self.count:
+            entry_hash, ts, offset, length = INDEX_ENTRY.unpack_from(self.mmap, INDEX_HEADER.size + i * INDEX_ENTRY.size)
+            if entry_hash != hashed:
+                break
+            matches.append((ts, offset, length))
+            i += 1
+        return matches
+
+    def close(self):
+        self.mmap.close()
+
+    @staticmethod
+    def write(path: str, entries: Dict[int, List[Tuple[int, int, int]]], min_ts: int, max_ts: int):
+        count = sum(len(items) for items in entries.values())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, count, min_ts, max_ts))
+            for hashed in sorted(entries):
+                for ts, offset, length in entries[hashed]:
+                    f.write(INDEX_ENTRY.pack(hashed, ts, offset, length))
+        # 인덱스 파일이 있으면 봉인된 세그먼트로 보므로 완성된 뒤에 이름을 바꿈
+        os.replace(tmp_path, path)
+
+
+class BloomFilter:
+    """trace 해시용 Bloom 필터. 64비트 해시의 두 32비트 절반으로 이중 해싱(h1 + i·h2)해 비트 위치를 만듭니다."""
+
+    def __init__(self, bits: bytes, size: int, hashes: int):
+        self.bits = bits
+        self.size = size
+        self.hashes = hashes
+
+    def might_contain(self, hashed: int) -> bool:
+        h1, h2 = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % self.size
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @classmethod
+    def build(cls, hashes: Iterable[int], fp_rate: float = None) -> "BloomFilter":
+        """해시 목록으로 필터를 만듭니다. 비트 수와 해시 수는 원소 수와 목표 오탐률로 정합니다."""
+        fp_rate = fp_rate or LOG_BLOOM_FP_RATE
+        values = np.fromiter(hashes, dtype=np.uint64)
+        n = max(1, values.size)
+        size = max(64, int(math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2)))
+        count = max(1, round(size / n * math.log(2)))
+        h1 = values & np.uint64(0xFFFFFFFF)
+        h2 = (values >> np.uint64(32)) | np.uint64(1)
+        bits = np.zeros((size + 7) // 8 * 8, dtype=bool)
+        for i in range(count):
+            bits[(h1 + np.uint64(i) * h2) % np.uint64(size)] = True
+        return cls(np.packbits(bits, bitorder='little').tobytes(), size, count)
+
+
+class CompressedSegment:
+    """
+    봉인된 압축 세그먼트(.logz). 줄 경계에서 나눈 LOG_BLOCK_BYTES 크기 블록을 각각 zlib으로 압축해 이어 붙이고,
+    끝에 블록 표, trace Bloom 필터, 꼬리말(레코드 수, 최소/최대 timestamp 등)을 둡니다.
+    인덱스 항목의 오프셋은 압축 전 기준이므로 필요한 블록만 찾아 풀어서 읽습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            f.seek(-COMPRESSED_FOOTER.size, os.SEEK_END)
+            (magic, self.count, self.min_ts, self.max_ts, self.raw_size, table_offset, bloom_offset,
+             block_count, bloom_size, bloom_hashes) = COMPRESSED_FOOTER.unpack(f.read(COMPRESSED_FOOTER.size))
+            if magic != COMPRESSED_MAGIC:
+                raise ValueError(f"압축 세그먼트 형식이 아님: {path}")
+            f.seek(table_offset)
+            table = f.read(bloom_offset - table_offset)
+            self.bloom = BloomFilter(f.read((bloom_size + 7) // 8), bloom_size, bloom_hashes)
+        self.blocks = list(BLOCK_ENTRY.iter_unpack(table)) if block_count else []
+        self.raw_offsets = [block[0] for block in self.blocks]
+
+    def might_contain(self, hashed: int) -> bool:
+        return self.bloom.might_contain(hashed)
+
+    def _block(self, fd: int, number: int) -> bytes:
+        _, file_offset, compressed_length, _ = self.blocks[number]
+        return zlib.decompress(os.pread(fd, compressed_length, file_offset))
+
+    def read_records(self, entries: List[Tuple[int, int, int]]) -> Iterator[dict]:
+        """(timestamp, 오프셋, 길이) 항목의 레코드. 항목이 든 블록만, 블록당 한 번씩 풉니다."""
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            number, block = None, None
+            for _, offset, length in entries:
+                wanted = bisect_right(self.raw_offsets, offset) - 1
+                if wanted != number:
+                    number, block = wanted, self._block(fd, wanted)
+                start = offset - self.raw_offsets[number]
+                yield json.loads(block[start:start + length])
+        finally:
+            os.close(fd)
+
+    def iter_lines(self, offset: int = 0) -> Iterator[Tuple[dict, int]]:
+        """압축 전 offset부터 끝까지의 (레코드, 줄 끝 오프셋)을 블록 단위로 풀며 반환합니다."""
+        if offset >= self.raw_size:
+            return
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            for number in range(max(0, bisect_right(self.raw_offsets, offset) - 1), len(self.blocks)):
+                raw_offset = self.raw_offsets[number]
+                block = self._block(fd, number)
+                position = max(0, offset - raw_offset)
+                while position < len(block):
+                    end = block.index(b'\n', position) + 1
+                    yield json.loads(block[position:end]), raw_offset + end
+                    position = end
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def write(path: str, data_path: str, hashes: Iterable[int], min_ts: int, max_ts: int):
+        """원본 세그먼트를 블록 단위로 압축해 씁니다 (임시 파일에 쓴 뒤 이름 변경)."""
+        tmp_path = f"{path}.tmp"
+        blocks = []
+        with open(data_path, 'rb') as source, open(tmp_path, 'wb') as f:
+            raw_offset = count = 0
+            pending, pending_size = [], 0
+
+            def flush_block():
+                data = b''.join(pending)
+                compressed = zlib.compress(data, LOG_COMPRESSION_LEVEL)
+                blocks.append(BLOCK_ENTRY.pack(raw_offset, f.tell(), len(compressed), len(data)))
+                f.write(compressed)
+                return len(data)
+
+            for line in source:
+                count += 1
+                pending.append(line)
+                pending_size += len(line)
+                if pending_size >= LOG_BLOCK_BYTES:
+                    raw_offset += flush_block()
+                    pending, pending_size = [], 0
+            if pending:
+                raw_offset += flush_block()
+            table_offset = f.tell()
+            f.write(b''.join(blocks))
+            bloom_offset = f.tell()
+            bloom = BloomFilter.build(hashes)
+            f.write(bloom.bits)
+            f.write(COMPRESSED_FOOTER.pack(COMPRESSED_MAGIC, count, min_ts, max_ts, raw_offset, table_offset,
+                                           bloom_offset, len(blocks), bloom.size, bloom.hashes))
+        os.replace(tmp_path, path)
+
+
+class ActiveSegment:
+    """아직 봉인되지 않은 세그먼트. 인덱스는 메모리에 두고, 다시 열 때는 데이터 파일을 스캔해 복원합니다."""
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.entries: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.min_ts = None
+        self.max_ts = None
+        self.size = 0
+        self.columns = ColumnBuilder()
+        if os.path.exists(data_path):
+            self._rebuild()
+        self.file = open(data_path, 'ab')
+
+    def _rebuild(self):
+        with open(self.data_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # 쓰다 만 마지막 줄은 버림
+                    break
+                record = json.loads(line)
+                ts = to_epoch_millis(record.get('timestamp')) or 0
+                self._index(record.get('trace_id'), ts, offset, len(line))
+                self.columns.add(record, ts)
+                offset += len(line)
+        if offset != os.path.getsize(self.data_path):
+            os.truncate(self.data_path, offset)
+        self.size = offset
+
+    def _index(self, trace_id, ts, offset, length):
+        if trace_id:
+            self.entries.setdefault(trace_hash(trace_id), []).append((ts, offset, length))
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+
+    def append(self, record: dict, ts: int):
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        self.file.write(line)
+        self._index(record.get('trace_id'), ts, self.size, len(line))
+        self.columns.add(record, ts)
+        self.size += len(line)
+
+    def lookup(self, hashed: int) -> List[Tuple[int, int, int]]:
+        return list(self.entries.get(hashed, ()))
+
+    def flush(self):
+        self.file.flush()
+
+    def seal(self, compress: bool = None):
+        self.file.close()
+        compress = LOG_SEGMENT_COMPRESSION if compress is None else compress
+        # 인덱스 파일이 봉인 표시이므로 요약 열과 압축본을 먼저 씀
+        self.columns.write(columns_path_for(self.data_path))
+        if compress:
+            CompressedSegment.write(compressed_path_for(self.data_path), self.data_path, self.entries.keys(),
+                                    self.min_ts or 0, self.max_ts or 0)
+        SealedIndex.write(index_path_for(self.data_path), self.entries, self.min_ts or 0, self.max_ts or 0)
+        if compress:
+            # 인덱스가 생긴 뒤부터 읽기는 .logz를 사용하므로 원본을 지움
+            os.remove(self.data_path)
+
+
+def segment_base(data_path: str) -> str:
+    """seg-000012.log / seg-000012.logz → seg-000012 (경로 유지)"""
+    return data_path.rsplit('.', 1)[0]
+
+
+def index_path_for(data_path: str) -> str:
+    return segment_base(data_path) + '.idx'
+
+
+def compressed_path_for(data_path: str) -> str:
+    return segment_base(data_path) + '.logz'
+
+
+def segment_number(name: str) -> int:
+    """seg-000012.log → 12"""
+    return int(os.path.basename(segment_base(name))[len('seg-'):])
+
+
+def list_segments(directory: str) -> List[Tuple[int, str]]:
+    """
+    파티션 디렉토리의 (세그먼트 번호, 데이터 경로) 목록 (번호 순).
+    봉인을 마친(인덱스가 있는) 압축 세그먼트는 .logz를, 그 외에는 .log를 데이터 경로로 씁니다.
+    """
+    names = set(os.listdir(directory))
+    segments = {}
+    for name in names:
+        if name.endswith('.logz'):
+            base = name[:-len('.logz')]
+            if base + '.idx' in names:
+                segments[segment_number(name)] = os.path.join(directory, name)
+    for name in names:
+        if name.endswith('.log'):
+            segments.setdefault(segment_number(name), os.path.join(directory, name))
+    return sorted(segments.items())
+
+
+def encode_cursor(positions: Dict[int, Tuple[int, int]], from_ms: int) -> str:
+    """tail 위치를 URL-safe 문자열 커서로 인코딩합니다."""
+    payload = {'f': from_ms, 'p': {str(partition): list(position) for partition, position in positions.items()}}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    """encode_cursor의 역. 형식이 맞지 않으면 ValueError."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        positions = {int(partition): (int(number), int(offset)) for partition, (number, offset) in payload['p'].items()}
+        return positions, int(payload['f'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"잘못된 커서: {cursor!r}") from e
+
+
+def columns_path_for(data_path: str) -> str:
+    return segment_base(data_path) + '.cols.npz'
+
+
+class LogStore:
+    """
+    시간 파티션과 trace_id 인덱스를 가진 로컬 로그 저장소.
+    쓰기는 단일 프로세스를 가정하고, 읽기는 봉인된 세그먼트 인덱스를 여러 호출에서 재사용합니다.
+    """
+
+    def __init__(self, root: str, partition_ms: int = None, segment_max_bytes: int = None):
+        self.root = root
+        self.partition_ms = partition_ms or PARTITION_MS
+        self.segment_max_bytes = segment_max_bytes or SEGMENT_MAX_BYTES
+        self.active: Dict[int, ActiveSegment] = {}
+        self.sealed_indexes: Dict[str, SealedIndex] = {}
+        # 봉인된 세그먼트의 요약 열은 바뀌지 않으므로 한 번 읽으면 재사용
+        self.sealed_columns: Dict[str, Dict[str, np.ndarray]] = {}
+        self.compressed_segments: Dict[str, CompressedSegment] = {}
+        # 다른 프로세스가 쓰는 미봉인 세그먼트의 스캔 결과 (세그먼트 경로(확장자 제외) → 스냅샷)
+        self.snapshots: Dict[str, ActiveSegmentSnapshot] = {}
+        self.lock = threading.Lock()
+
+    # ---- 쓰기 ----
+
+    def append(self, record: dict):
+        """레코드 하나를 timestamp가 속한 파티션의 활성 세그먼트에 추가합니다."""
+        ts = to_epoch_millis(record.get('timestamp'))
+        if ts is None:
+            raise ValueError(f"timestamp를 해석할 수 없는 로그 레코드: {record.get('timestamp')!r}")
+        partition = ts - ts % self.partition_ms
+        with self.lock:
+            segment = self.active.get(partition) or self._open_active(partition)
+            segment.append(record, ts)
+            if segment.size >= self.segment_max_bytes:
+                segment.seal()
+                del self.active[partition]
+
+    def append_many(self, records: Iterable[dict]) -> int:
+        count = 0
+        for record in records:
+            self.append(record)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self):
+        with self.lock:
+            for segment in self.active.values():
+                segment.flush()
+
+    def seal_all(self):
+        """활성 세그먼트를 모두 봉인합니다 (적재를 마칠 때 호출)."""
+        with self.lock:
+            for segment in self.active.values():
+                segment.seal()
+            self.active.clear()
+
+    def compress_sealed(self) -> int:
+        """압축하지 않고 봉인된 세그먼트(.log + .idx)를 .logz로 바꿉니다. 바꾼 세그먼트 수를 반환합니다."""
+        converted = 0
+        if not os.path.isdir(self.root):
+            return converted
+        for partition in sorted(int(name) for name in os.listdir(self.root) if name.isdigit()):
+            for _, data_path in list_segments(os.path.join(self.root, str(partition))):
+                index_path = index_path_for(data_path)
+                if not data_path.endswith('.log') or not os.path.exists(index_path):
+                    continue
+                with open(index_path, 'rb') as f:
+                    _, count, min_ts, max_ts = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                    hashes = np.unique(np.fromfile(f, dtype=INDEX_DTYPE, count=count)['hash'])
+                if not os.path.exists(columns_path_for(data_path)):
+                    ColumnBuilder.from_file(data_path).write(columns_path_for(data_path))
+                CompressedSegment.write(compressed_path_for(data_path), data_path, hashes.tolist(), min_ts, max_ts)
+                os.remove(data_path)
+                index = self.sealed_indexes.pop(data_path, None)
+                if index is not None:
+                    index.close()
+                self.sealed_columns.pop(data_path, None)
+                converted += 1
+        return converted
+
+    def _open_active(self, partition: int) -> ActiveSegment:
+        directory = os.path.join(self.root, str(partition))
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        # 마지막 세그먼트가 봉인되지 않았으면 이어서 씀
+        if segments and not os.path.exists(index_path_for(segments[-1][1])):
+            data_path = segments[-1][1]
+        else:
+            data_path = os.path.join(directory, f"seg-{segments[-1][0] + 1 if segments else 1:06d}.log")
+        segment = self.active[partition] = ActiveSegment(data_path)
+        return segment
+
+    # ---- 읽기 ----
+
+    def iter_segments(self, from_ts: int = None, to_ts: int = None) -> Iterator[Tuple[str, Any]]:
+        """시간 범위와 겹칠 수 있는 세그먼트의 (데이터 경로, 인덱스)를 시간 순으로 반환합니다."""
+        if not os.path.isdir(self.root):
+            return
+        partitions = sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+        for partition in partitions:
+            # 파티션 단위 가지치기
+            if to_ts is not None and partition > to_ts:
+                break
+            if from_ts is not None and partition + self.partition_ms <= from_ts:
+                continue
+            for _, data_path in list_segments(os.path.join(self.root, str(partition))):
+                index = self._segment_index(partition, data_path)
+                if index is None or index.min_ts is None:
+                    continue
+                # 세그먼트 단위 가지치기
+                if (from_ts is not None and index.max_ts < from_ts) or (to_ts is not None and index.min_ts > to_ts):
+                    continue
+                yield data_path, index
+
+    def _segment_index(self, partition: int, data_path: str):
+        active = self.active.get(partition)
+        if active is not None and active.data_path == data_path:
+            # append()는 버퍼에만 쓰므로, 인덱스가 가리키는 레코드를 pread로 읽을 수 있게 먼저 내보냄
+            with self.lock:
+                active.flush()
+            return active
+        index = self.sealed_indexes.get(data_path)
+        if index is None:
+            index_path = index_path_for(data_path)
+            if os.path.exists(index_path):
+                index = SealedIndex(index_path)
+                self.snapshots.pop(segment_base(data_path), None)
+            else:
+                # 다른 프로세스가 쓰던 미봉인 세그먼트는 스캔해서 인덱스를 만들고,
+                # 다음 호출부터는 (크기, 수정 시각)이 바뀌었을 때 그 뒤에 추가된 줄만 읽음
+                try:
+                    snapshot = self.snapshots.get(segment_base(data_path))
+                    if snapshot is None:
+                        snapshot = self.snapshots[segment_base(data_path)] = ActiveSegmentSnapshot(data_path)
+                    else:
+                        snapshot.refresh()
+                except FileNotFoundError:
+                    # 그 사이 봉인되어 압축본으로 바뀐 세그먼트는 다음 호출에서 압축본으로 읽음
+                    self.snapshots.pop(segment_base(data_path), None)
+                    return None
+                return snapshot
+            self.sealed_indexes[data_path] = index
+        return index
+
+    def _compressed_segment(self, data_path: str) -> CompressedSegment:
+        segment = self.compressed_segments.get(data_path)
+        if segment is None:
+            segment = self.compressed_segments[data_path] = CompressedSegment(data_path)
+        return segment
+
+    def search(self, trace_id: str, from_ts=None, to_ts=None, service: str = None, env: str = None) -> List[dict]:
+        """trace_id의 로그를 시간 범위와 서비스/환경으로 걸러 timestamp 순으로 반환합니다."""
+        return self.search_many([trace_id], from_ts, to_ts, service, env)[trace_id]
+
+    def search_many(self, trace_ids: Iterable[str], from_ts=None, to_ts=None,
+                    service: str = None, env: str = None) -> Dict[str, List[dict]]:
+        """
+        여러 trace_id를 세그먼트를 한 번만 훑어 찾습니다.
+        반환: trace_id → timestamp 순 레코드 목록 (없는 trace는 빈 목록).
+        """
+        matches: Dict[str, List[Tuple[int, dict]]] = {trace_id: [] for trace_id in trace_ids}
+        for ts, record in self.iter_search(matches, from_ts, to_ts, service, env):
+            matches[record['trace_id']].append((ts, record))
+        return {trace_id: [record for _, record in sorted(found, key=lambda item: item[0])]
+                for trace_id, found in matches.items()}
+
+    def iter_search(self, trace_ids: Iterable[str], from_ts=None, to_ts=None,
+                    service: str = None, env: str = None) -> Iterator[Tuple[int, dict]]:
+        """
+        trace_id들의 (timestamp, 레코드)를 세그먼트 순서대로 하나씩 반환합니다 (세그먼트 안에서는 파일 순서).
+        세그먼트마다 모든 trace의 인덱스 항목을 모아 오프셋 순으로 한 번에 읽으므로, 세그먼트 순회와
+        파일 열기 비용은 trace 수와 무관하고, 호출자는 결과 전체를 메모리에 올리지 않고 처리할 수 있습니다.
+        """
+        from_ms = to_epoch_millis(from_ts) if from_ts is not None else None
+        to_ms = to_epoch_millis(to_ts) if to_ts is not None else None
+        wanted = set(trace_ids)
+        hashes = {trace_hash(trace_id) for trace_id in wanted}
+        for data_path, index in self.iter_segments(from_ms, to_ms):
+            compressed = self._compressed_segment(data_path) if data_path.endswith('.logz') else None
+            # Bloom 필터가 모든 trace를 배제하면 인덱스도 보지 않음
+            candidates = [hashed for hashed in hashes if compressed is None or compressed.might_contain(hashed)]
+            entries = [entry for hashed in candidates for entry in index.lookup(hashed)
+                       if (from_ms is None or entry[0] >= from_ms) and (to_ms is None or entry[0] <= to_ms)]
+            if not entries:
+                continue
+            entries.sort(key=lambda entry: entry[1])
+            records = compressed.read_records(entries) if compressed else read_records(data_path, entries)
+            for ts, record in zip((entry[0] for entry in entries), records):
+                if record.get('trace_id') not in wanted:
+                    continue
+                if service and record.get('service') != service:
+                    continue
+                if env and record.get('environment') != env:
+                    continue
+                yield ts, record
+
+    def tail(self, positions: Dict[int, Tuple[int, int]], from_ts=None) -> Iterator[Tuple[dict, int, int, int]]:
+        """
+        positions(파티션 → (세그먼트 번호, 읽은 바이트 수)) 뒤에 추가된 레코드를 파일에 쓰인 순서대로 반환합니다.
+        from_ts가 속한 파티션부터 보며, 각 항목은 (레코드, 파티션, 세그먼트 번호, 레코드 끝 오프셋)입니다.
+        호출자가 마지막으로 소비한 항목의 위치를 positions에 반영해 넘기면 다음 호출은 그 뒤부터 읽습니다.
+        """
+        from_ms = to_epoch_millis(from_ts) if from_ts is not None else None
+        if not os.path.isdir(self.root):
+            return
+        # 이 프로세스가 append()로 쓴 레코드도 파일에서 읽히도록 함
+        self.flush()
+        partitions = sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+        for partition in partitions:
+            if from_ms is not None and partition + self.partition_ms <= from_ms:
+                continue
+            last_number, last_offset = positions.get(partition, (0, 0))
+            for number, data_path in list_segments(os.path.join(self.root, str(partition))):
+                if number < last_number:
+                    continue
+                offset = last_offset if number == last_number else 0
+                # 커서 이후로 자라지 않은 세그먼트는 풀거나 열지 않음 (압축본의 오프셋은 압축 전 기준)
+                if data_path.endswith('.logz'):
+                    compressed = self._compressed_segment(data_path)
+                    if compressed.raw_size > offset:
+                        for record, end in compressed.iter_lines(offset):
+                            yield record, partition, number, end
+                    continue
+                try:
+                    if os.path.getsize(data_path) <= offset:
+                        continue
+                except FileNotFoundError:
+                    # 그 사이 봉인되어 압축본으로 바뀐 세그먼트는 다음 호출에서 이어 읽음
+                    continue
+                for record, end in read_lines(data_path, offset):
+                    yield record, partition, number, end
+
+    def iter_columns(self, from_ts=None, to_ts=None, service: str = None, env: str = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        시간 범위와 서비스/환경에 맞는 행만 남긴 세그먼트별 요약 열을 반환합니다.
+        코드 열(service, environment, path, exception)은 같은 세그먼트의 *_values 배열로 문자열을 찾습니다.
+        """
+        from_ms = to_epoch_millis(from_ts) if from_ts is not None else None
+        to_ms = to_epoch_millis(to_ts) if to_ts is not None else None
+        for data_path, index in self.iter_segments(from_ms, to_ms):
+            columns = self._segment_columns(data_path, index)
+            mask = np.ones(columns['ts'].size, dtype=bool)
+            if from_ms is not None:
+                mask &= columns['ts'] >= from_ms
+            if to_ms is not None:
+                mask &= columns['ts'] <= to_ms
+            skip = False
+            for column, value in (('service', service), ('environment', env)):
+                if value:
+                    codes = np.flatnonzero(columns[f"{column}_values"] == value)
+                    if not codes.size:
+                        skip = True
+                        break
+                    mask &= columns[column] == codes[0]
+            if skip or not mask.any():
+                continue
+            yield {name: (array if name.endswith('_values') else array[mask]) for name, array in columns.items()}
+
+    def _segment_columns(self, data_path: str, index) -> Dict[str, np.ndarray]:
+        if isinstance(index, (ActiveSegment, ActiveSegmentSnapshot)):
+            return index.columns.arrays()
+        columns = self.sealed_columns.get(data_path)
+        if columns is None:
+            columns_path = columns_path_for(data_path)
+            if os.path.exists(columns_path):
+                with np.load(columns_path) as stored:
+                    columns = {name: stored[name] for name in stored.files}
+            else:
+                columns = ColumnBuilder.from_file(data_path).arrays()
+            self.sealed_columns[data_path] = columns
+        return columns
+
+    def close(self):
+        self.seal_all()
+        for index in self.sealed_indexes.values():
+            index.close()
+        self.sealed_indexes.clear()
+        self.sealed_columns.clear()
+        self.compressed_segments.clear()
+        self.snapshots.clear()
+
+
+class ActiveSegmentSnapshot:
+    """
+    다른 프로세스가 쓰고 있는 미봉인 세그먼트를 읽기 전용으로 스캔한 인덱스.
+    refresh()는 파일의 (크기, 수정 시각)이 바뀌었을 때만 마지막으로 읽은 완성된 줄 뒤부터 이어 읽습니다.
+    파일이 읽은 위치보다 짧아졌으면(다시 쓴 경우) 처음부터 다시 스캔합니다.
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.lock = threading.Lock()
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        self.entries: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.min_ts = None
+        self.max_ts = None
+        self.columns = ColumnBuilder()
+        # 스캔한 완성된 줄의 끝 오프셋과 그때의 파일 (크기, 수정 시각)
+        self.offset = 0
+        self.stamp = None
+
+    def refresh(self):
+        with self.lock:
+            stat = os.stat(self.data_path)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            if stamp == self.stamp:
+                return
+            if stat.st_size < self.offset:
+                self._reset()
+            with open(self.data_path, 'rb') as f:
+                f.seek(self.offset)
+                offset = self.offset
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    record = json.loads(line)
+                    ts = to_epoch_millis(record.get('timestamp')) or 0
+                    if record.get('trace_id'):
+                        self.entries.setdefault(trace_hash(record['trace_id']), []).append((ts, offset, len(line)))
+                    self.columns.add(record, ts)
+                    self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+                    self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+                    offset += len(line)
+            self.offset = offset
+            self.stamp = stamp
+
+    def lookup(self, hashed: int) -> List[Tuple[int, int, int]]:
+        return list(self.entries.get(hashed, ()))
+
+
+def read_records(data_path: str, entries: List[Tuple[int, int, int]]) -> Iterator[dict]:
+    """(timestamp, 오프셋, 길이) 항목의 레코드를 세그먼트 파일에서 직접 읽습니다."""
+    fd = os.open(data_path, os.O_RDONLY)
+    try:
+        for _, offset, length in entries:
+            yield json.loads(os.pread(fd, length, offset))
+    finally:
+        os.close(fd)
+
+
+def read_lines(data_path: str, offset: int) -> Iterator[Tuple[dict, int]]:
+    """offset부터 끝까지 완성된 줄의 (레코드, 줄 끝 오프셋). 쓰는 중인 마지막 미완성 줄은 건너뜁니다."""
+    with open(data_path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            yield json.loads(line), offset
@@ -25,6 +25,191 @@ logging.basicConfig(format='[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d}
                     level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bedrock Agents의 함수당 파라미터 수 한도. 선택 파라미터는 options 하나로 묶어 이 안에 맞춤
+MAX_FUNCTION_PARAMETERS = 5
+
+
+def check_tool_defs(tool_defs):
+    """함수당 파라미터 수가 한도를 넘는 정의가 있으면 에이전트를 만들기 전에 실패시킵니다."""
+    for tool in tool_defs:
+        if len(tool['parameters']) > MAX_FUNCTION_PARAMETERS:
+            raise ValueError(f"{tool['name']}의 파라미터가 {len(tool['parameters'])}개로 "
+                             f"함수당 한도 {MAX_FUNCTION_PARAMETERS}개를 넘습니다")
+    return tool_defs
+
+
+# 저장소 기반 도구. Agent.create(tool_code=...)는 도구 파일 하나만 압축해 배포하므로 이 도구들이 쓰는 헬퍼 모듈
+# (log_store, metric_store, result_cache, datadog_client 등)과 저장소/Datadog 설정이 Lambda에 없으면
+# "저장소를 사용할 수 없습니다" 오류만 반환함. 함께 배포한 경우(--store_tools true)에만 등록
+LOG_STORE_TOOL_INSTRUCTIONS = dedent("""
+서비스 전체에서 무엇이 언제부터 실패하는지는 aggregate_logs로 먼저 확인하세요.
+Trace ID가 여러 개이면 search_logs_by_traces로 한 번에 검색하세요.
+진행 중인 장애의 새 로그를 다시 볼 때는 전체 구간을 재검색하지 말고 tail_logs의 cursor로 이어서 조회하세요.
+""")
+RESOURCE_STORE_TOOL_INSTRUCTIONS = dedent("""
+주변 서비스나 호스트별 비교가 필요하면 get_resource_metrics_batch로 한 번에 조회하세요.
+오류 로그 급증과 리소스 급증이 같은 시점(또는 일정한 시차)에 나타나는지는 correlate_errors_with_resources 결과로 확인하세요.
+""")
+LOG_STORE_TOOL_DEFS = [
+    {
+        "name": "search_logs_by_traces",
+        "description": "여러 Trace ID(같은 장애로 동시에 발생한 알림 등)의 로그를 한 번에 검색합니다. trace들이 공유하는 오류 지문은 fingerprints에 한 번만 담고, traces에는 trace별 지문과 건수를 반환합니다.",
+        "parameters": {
+            "trace_ids": {
+                "description": "검색할 Trace ID 목록, 쉼표로 구분",
+                "type": "string",
+                "required": True
+            },
+            "from_ts": {
+                "description": "검색 시작 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "to_ts": {
+                "description": "검색 종료 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "service": {
+                "description": "검색할 서비스 이름",
+                "type": "string",
+                "required": True
+            },
+            "env": {
+                "description": "검색할 환경 (예: prd-bo, stg)",
+                "type": "string",
+                "required": True
+            }
+        }
+    },
+    {
+        "name": "tail_logs",
+        "description": "진행 중인 장애에서 새로 쌓인 로그만 이어서 조회합니다. 첫 호출은 from_ts 이후의 로그와 cursor를 반환하고, 이후 호출에 cursor를 넘기면 그 뒤에 추가된 로그만 반환합니다.",
+        "parameters": {
+            "service": {
+                "description": "조회할 서비스 이름",
+                "type": "string",
+                "required": True
+            },
+            "env": {
+                "description": "조회할 환경 (예: prd-bo, stg)",
+                "type": "string",
+                "required": True
+            },
+            "from_ts": {
+                "description": "첫 호출의 조회 시작 타임스탬프 (밀리초). cursor를 넘길 때는 생략",
+                "type": "string",
+                "required": False
+            },
+            "cursor": {
+                "description": "이전 tail_logs 응답의 cursor 값 (그대로 전달)",
+                "type": "string",
+                "required": False
+            },
+            "options": {
+                "description": "선택 파라미터를 key=value;key=value 형식으로 묶어 전달. trace_id: 특정 Trace ID의 로그만 볼 때 지정, fields: 응답에 남길 필드의 점(.) 경로 목록, 쉼표로 구분 (예: trace_id=abc123;fields=logs.message,cursor,tail_metadata). 생략하면 전체 로그와 전체 필드",
+                "type": "string",
+                "required": False
+            }
+        }
+    },
+    {
+        "name": "aggregate_logs",
+        "description": "서비스/환경의 시간 범위 로그를 status_code별, path별, 예외 클래스별, 시간대별(구간이 짧으면 1분 단위)로 집계해 건수, 오류 수, 첫/마지막 오류 시각을 표(columns/rows)로 반환합니다. 무엇이 언제부터 실패하는지 파악할 때 사용합니다.",
+        "parameters": {
+            "service": {
+                "description": "집계할 서비스 이름",
+                "type": "string",
+                "required": True
+            },
+            "env": {
+                "description": "집계할 환경 (예: prd-bo, stg)",
+                "type": "string",
+                "required": True
+            },
+            "from_ts": {
+                "description": "집계 시작 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "to_ts": {
+                "description": "집계 종료 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "options": {
+                "description": "선택 파라미터를 key=value;key=value 형식으로 묶어 전달. fields: 응답에 남길 필드의 점(.) 경로 목록, 쉼표로 구분 (예: fields=by_path,by_exception,timeline). 생략하면 전체 필드",
+                "type": "string",
+                "required": False
+            }
+        }
+    }
+]
+RESOURCE_STORE_TOOL_DEFS = [
+    {
+        "name": "get_resource_metrics_batch",
+        "description": "여러 서비스(주변 서비스 포함)와 환경의 CPU/메모리 메트릭을 한 번에 조회해 행렬(columns/rows) 형태로 반환합니다. 호스트/파드별로 나눌 수 있습니다.",
+        "parameters": {
+            "services": {
+                "description": "조회할 서비스 이름 목록, 쉼표로 구분 (예: fsp-pay-gateway,fsp-pay-bo)",
+                "type": "string",
+                "required": True
+            },
+            "env": {
+                "description": "조회할 환경 목록, 쉼표로 구분 (예: prd-bo)",
+                "type": "string",
+                "required": True
+            },
+            "from_ts": {
+                "description": "조회 시작 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "to_ts": {
+                "description": "조회 종료 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "options": {
+                "description": "선택 파라미터를 key=value;key=value 형식으로 묶어 전달. group_by: host 또는 pod를 지정하면 호스트(파드)별로 나눠 반환, fields: 응답에 남길 필드의 점(.) 경로 목록, 쉼표로 구분 (예: group_by=host;fields=columns,rows). 생략하면 서비스/환경별 전체 필드",
+                "type": "string",
+                "required": False
+            }
+        }
+    },
+    {
+        "name": "correlate_errors_with_resources",
+        "description": "서비스의 오류 로그 수와 CPU/메모리 사용률을 같은 시간 격자에 놓고 시차 상관을 계산해, 상관계수와 가장 강한 시차(resource_leads_by_seconds), 두 급증이 함께 나타나는 구간을 반환합니다.",
+        "parameters": {
+            "service": {
+                "description": "분석할 서비스 이름",
+                "type": "string",
+                "required": True
+            },
+            "env": {
+                "description": "분석할 환경 (예: prd-bo, stg)",
+                "type": "string",
+                "required": True
+            },
+            "from_ts": {
+                "description": "분석 시작 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "to_ts": {
+                "description": "분석 종료 타임스탬프 (밀리초)",
+                "type": "string",
+                "required": True
+            },
+            "options": {
+                "description": "선택 파라미터를 key=value;key=value 형식으로 묶어 전달. fields: 응답에 남길 필드의 점(.) 경로 목록, 쉼표로 구분 (예: fields=analysis,cpu.correlation). 생략하면 전체 필드",
+                "type": "string",
+                "required": False
+            }
+        }
+    }
+]
+
 
 def upload_directory(path, bucket_name):
     for root, dirs, files in os.walk(path):
@@ -47,6 +232,10 @@ def main(args):
         Agent.set_force_recreate_default(True)
         Agent.delete_by_name("skt_chatops_assistant", verbose=True)
 
+    store_tools = args.store_tools == "true"
+    if not store_tools:
+        print("저장소 기반 도구는 등록하지 않습니다 (헬퍼 모듈과 저장소를 함께 배포했다면 --store_tools true)")
+
     bucket_name = None
     print("서비스 지식베이스 생성 중...")
     kb_name = "service-kb"
@@ -83,12 +272,12 @@ def main(args):
         4. 영향받는 클라이언트가 있다면 해당 정보 제공
         
         JSON 형식으로 구조화된 응답을 제공하세요.
-        """),
+        """) + (LOG_STORE_TOOL_INSTRUCTIONS if store_tools else ""),
         tool_code="log_analysis_function.py",
-        tool_defs=[
+        tool_defs=check_tool_defs([
             {
                 "name": "search_logs_by_trace",
-                "description": "주어진 Trace ID를 기반으로 특정 시간 범위 내의 Datadog 로그를 검색합니다.",
+                "description": "주어진 Trace ID를 기반으로 특정 시간 범위 내의 Datadog 로그를 검색합니다. 로그가 많으면 오류 지문별 대표 로그와 시간대별 표본(기본 100건)만 반환하고 실제 건수와 빠진 지문 수를 함께 보고합니다.",
                 "parameters": {
                     "trace_id": {
                         "description": "검색할 Trace ID",
@@ -117,7 +306,7 @@ def main(args):
                     }
                 }
             }
-        ],
+        ] + (LOG_STORE_TOOL_DEFS if store_tools else [])),
         llm="us.anthropic.claude-3-5-sonnet-20241022-v2:0"
     )
 
@@ -135,9 +324,9 @@ def main(args):
         4. 리소스 부족이 확인된 경우 권장 조치 제안
         
         JSON 형식으로 구조화된 응답을 제공하세요.
-        """),
+        """) + (RESOURCE_STORE_TOOL_INSTRUCTIONS if store_tools else ""),
         tool_code="resource_analysis_function.py",
-        tool_defs=[
+        tool_defs=check_tool_defs([
             {
                 "name": "get_resource_metrics",
                 "description": "주어진 서비스와 시간 범위에 대한 리소스(CPU, 메모리) 메트릭을 조회합니다.",
@@ -161,10 +350,15 @@ def main(args):
                         "description": "조회 종료 타임스탬프 (밀리초)",
                         "type": "string",
                         "required": True
+                    },
+                    "options": {
+                        "description": "선택 파라미터를 key=value;key=value 형식으로 묶어 전달. fields: 응답에 남길 필드의 점(.) 경로 목록, 쉼표로 구분 (예: fields=cpu,memory.max_usage_percent). 생략하면 전체 필드",
+                        "type": "string",
+                        "required": False
                     }
                 }
             }
-        ],
+        ] + (RESOURCE_STORE_TOOL_DEFS if store_tools else [])),
         llm="us.anthropic.claude-3-5-sonnet-20241022-v2:0"
     )
 
@@ -273,6 +467,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--recreate_agents", required=False, default="true", help="False: 기존 에이전트 재사용, True: 에이전트 새로 생성")
     parser.add_argument("--clean_up", required=False, default="false", help="True: 에이전트 리소스 정리")
+    parser.add_argument("--store_tools", required=False, default="false", help="True: 헬퍼 모듈과 저장소를 Lambda에 함께 배포한 경우 저장소 기반 도구(aggregate_logs, tail_logs 등)도 등록")
     parser.add_argument("--trace_level", required=False, default="core", help="트레이스 레벨: 'core', 'outline', 'all'")
 
     args = parser.parse_args()
@@ -0,0 +1,613 @@
+"""
+get_resource_metrics를 위한 로컬 시계열 메트릭 저장소.
+서비스/환경/메트릭마다 열(column) 단위 바이너리 파일을 두고 NumPy memmap으로 읽습니다.
+
+디렉토리 구조:
+    {root}/{service}/{env}/{metric}/ts.i8      # epoch ms (int64), 오름차순
+    {root}/{service}/{env}/{metric}/value.f4   # 측정값 (float32)
+    {root}/{service}/{env}/{metric}/host.u2    # 호스트 코드 (uint16)
+    {root}/{service}/{env}/{metric}/hosts.json # 호스트 코드 → 이름
+    {root}/{service}/{env}/{metric}/coverage.json  # Datadog에서 받아 채운 [from_ms, to_ms] 구간 목록
+    {root}/{service}/{env}/{metric}/rollup-{버킷 ms}/  # 롤업 계층 (bucket, host, count, sum, min, max 열)
+    {root}/{service}/{env}/{metric}/sketch-{버킷 ms}/  # 버킷별 분위수 스케치 (행: bucket, offset, length / bin: index, count)
+
+- 쓰기는 파일 끝에 이어 붙이며, 배치의 시각이 기존 마지막 시각보다 앞서면 거부합니다.
+  롤업 계층(기본 1분/1시간/1일)은 같은 쓰기에서 갱신되며, 마지막 버킷이 배치와 겹치면 그 버킷만 다시 계산합니다.
+  앞쪽 빈 구간을 채울 때는 insert로 들어갈 위치부터 원본 꼬리와 계층을 다시 씁니다.
+- 조회 계획은 구간 안에 완전히 들어가는 가장 큰 버킷들을 가장 거친 계층에서 읽고, 양 끝의 남는 부분을
+  점점 더 세밀한 계층과 원본 데이터로 채웁니다. 비용은 구간 길이가 아니라 (구간/가장 큰 버킷 + 경계의 세밀한 버킷 수)에 비례합니다.
+- p50/p95/p99는 버킷별 DDSketch(quantile_sketch)를 같은 방식의 계획으로 합쳐 계산합니다 (기본 1시간/1일 계층).
+- 각 부분은 정렬된 시각 열에서 np.searchsorted(이진 탐색)로 범위를 찾고 벡터 연산으로 집계합니다.
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from quantile_sketch import Sketch, bucket_bins, merge_bins, INDEX_DTYPE, COUNT_DTYPE
+
+TS_DTYPE = np.int64
+VALUE_DTYPE = np.float32
+HOST_DTYPE = np.uint16
+
+COLUMNS = (('ts', 'ts.i8', TS_DTYPE), ('value', 'value.f4', VALUE_DTYPE), ('host', 'host.u2', HOST_DTYPE))
+ROLLUP_COLUMNS = (('bucket', 'bucket.i8', TS_DTYPE), ('host', 'host.u2', HOST_DTYPE), ('count', 'count.i8', np.int64),
+                  ('sum', 'sum.f8', np.float64), ('min', 'min.f4', VALUE_DTYPE), ('max', 'max.f4', VALUE_DTYPE))
+SKETCH_ROWS = (('bucket', 'bucket.i8', TS_DTYPE), ('offset', 'offset.i8', np.int64), ('length', 'length.i4', np.int32))
+SKETCH_BINS = (('index', 'index.i2', INDEX_DTYPE), ('count', 'count.u4', COUNT_DTYPE))
+
+# 롤업 계층 버킷 크기 (ms), 쉼표 구분. 비우면 롤업 없이 원본만 사용
+ROLLUP_TIERS_MS = sorted(int(t) for t in os.environ.get('METRIC_ROLLUP_TIERS_MS', '60000,3600000,86400000').split(',') if t.strip())
+# 분위수 스케치 계층 버킷 크기 (ms). 더 짧은 경계 구간은 원본 값으로 채움
+SKETCH_TIERS_MS = sorted(int(t) for t in os.environ.get('METRIC_SKETCH_TIERS_MS', '3600000,86400000').split(',') if t.strip())
+
+
+def open_columns(path: str, spec, size: int) -> Dict[str, np.ndarray]:
+    """열 파일들을 같은 길이의 읽기 전용 memmap으로 엽니다."""
+    columns = {}
+    for name, filename, dtype in spec:
+        # 크기 0 파일은 memmap할 수 없음
+        columns[name] = (np.memmap(os.path.join(path, filename), dtype=dtype, mode='r', shape=(size,))
+                         if size else np.empty(0, dtype=dtype))
+    return columns
+
+
+def append_columns(path: str, spec, arrays: Iterable[np.ndarray]):
+    for (_, filename, dtype), column in zip(spec, arrays):
+        with open(os.path.join(path, filename), 'ab') as f:
+            np.asarray(column).astype(dtype, copy=False).tofile(f)
+
+
+def write_columns_at(path: str, spec, row: int, arrays: Iterable[np.ndarray]):
+    """row 행부터 덮어씁니다. 파일을 줄이지 않으므로 다른 프로세스의 memmap이 깨지지 않습니다."""
+    for (_, filename, dtype), column in zip(spec, arrays):
+        file_path = os.path.join(path, filename)
+        with open(file_path, 'r+b' if os.path.exists(file_path) else 'wb') as f:
+            f.seek(row * np.dtype(dtype).itemsize)
+            np.asarray(column).astype(dtype, copy=False).tofile(f)
+
+
+def truncate_columns(path: str, spec, rows: int):
+    for _, filename, dtype in spec:
+        os.truncate(os.path.join(path, filename), rows * np.dtype(dtype).itemsize)
+
+
+def column_rows(path: str, spec) -> int:
+    first = os.path.join(path, spec[0][1])
+    return os.path.getsize(first) // np.dtype(spec[0][2]).itemsize if os.path.exists(first) else 0
+
+
+def reduce_rows(bucket, host, count, total, low, high):
+    """(bucket, host)가 같은 행들을 count/sum은 더하고 min/max는 취해 합칩니다."""
+    order = np.lexsort((host, bucket))
+    bucket, host, count, total, low, high = (a[order] for a in (bucket, host, count, total, low, high))
+    boundary = np.empty(bucket.size, dtype=bool)
+    boundary[:1] = True
+    boundary[1:] = (bucket[1:] != bucket[:-1]) | (host[1:] != host[:-1])
+    starts = np.flatnonzero(boundary)
+    return (bucket[starts], host[starts], np.add.reduceat(count, starts), np.add.reduceat(total, starts),
+            np.minimum.reduceat(low, starts), np.maximum.reduceat(high, starts))
+
+
+class Partial:
+    """합칠 수 있는 부분 집계 (count, sum, min, max)."""
+
+    __slots__ = ('count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, count, total, low, high):
+        if not count:
+            return
+        self.count += int(count)
+        self.sum += float(total)
+        self.min = float(low) if self.min is None else min(self.min, float(low))
+        self.max = float(high) if self.max is None else max(self.max, float(high))
+
+    def result(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return {'count': 0, 'avg': None, 'min': None, 'max': None}
+        return {'count': self.count, 'avg': self.sum / self.count, 'min': self.min, 'max': self.max}
+
+
+class Series:
+    """한 서비스/환경/메트릭의 원본 열과 롤업 계층 (읽기 전용 memmap)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = column_rows(path, COLUMNS)
+        self.columns = open_columns(path, COLUMNS, self.size)
+        with open(os.path.join(path, 'hosts.json'), encoding='utf-8') as f:
+            self.hosts: List[str] = json.load(f)
+        self.tiers: Dict[int, Dict[str, np.ndarray]] = {}
+        for tier_ms in ROLLUP_TIERS_MS:
+            tier_path = os.path.join(path, f"rollup-{tier_ms}")
+            if os.path.isdir(tier_path):
+                self.tiers[tier_ms] = open_columns(tier_path, ROLLUP_COLUMNS, column_rows(tier_path, ROLLUP_COLUMNS))
+        self.sketches: Dict[int, Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]] = {}
+        for tier_ms in SKETCH_TIERS_MS:
+            sketch_path = os.path.join(path, f"sketch-{tier_ms}")
+            if os.path.isdir(sketch_path):
+                self.sketches[tier_ms] = (open_columns(sketch_path, SKETCH_ROWS, column_rows(sketch_path, SKETCH_ROWS)),
+                                          open_columns(sketch_path, SKETCH_BINS, column_rows(sketch_path, SKETCH_BINS)))
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self.columns['ts']
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.columns['value']
+
+    @property
+    def host(self) -> np.ndarray:
+        return self.columns['host']
+
+    def window(self, from_ms: Optional[int], to_ms: Optional[int]) -> slice:
+        """[from_ms, to_ms] 구간의 원본 인덱스 범위 (이진 탐색)."""
+        start = 0 if from_ms is None else int(np.searchsorted(self.ts, from_ms, side='left'))
+        end = self.size if to_ms is None else int(np.searchsorted(self.ts, to_ms, side='right'))
+        return slice(start, max(start, end))
+
+    def tier_window(self, tier_ms: int, start_ms: int, end_ms: int) -> slice:
+        """버킷 시작이 [start_ms, end_ms)인 롤업 행 범위."""
+        bucket = self.tiers[tier_ms]['bucket']
+        start = int(np.searchsorted(bucket, start_ms, side='left'))
+        end = int(np.searchsorted(bucket, end_ms, side='left'))
+        return slice(start, max(start, end))
+
+    def plan(self, from_ms: int, to_ms: int, tiers: Iterable[int] = None) -> List[Tuple[Optional[int], int, int]]:
+        """
+        [from_ms, to_ms] 조회 계획: (계층 버킷 ms 또는 원본이면 None, 시작 ms, 끝 ms(미포함)) 목록.
+        가장 거친 계층으로 구간 안쪽을 덮고 남는 양 끝은 더 세밀한 계층으로 재귀적으로 채웁니다.
+        tiers를 주지 않으면 롤업 계층을 사용합니다.
+        """
+        plan: List[Tuple[Optional[int], int, int]] = []
+        tiers = sorted(self.tiers if tiers is None else tiers, reverse=True)
+
+        def cover(start, end, level):
+            if start >= end:
+                return
+            for i in range(level, len(tiers)):
+                tier_ms = tiers[i]
+                inner_start = -(-start // tier_ms) * tier_ms
+                inner_end = end // tier_ms * tier_ms
+                if inner_start < inner_end:
+                    cover(start, inner_start, i + 1)
+                    plan.append((tier_ms, inner_start, inner_end))
+                    cover(inner_end, end, i + 1)
+                    return
+            plan.append((None, start, end))
+
+        cover(from_ms, to_ms + 1, 0)
+        return plan
+
+    def aggregate(self, from_ms: Optional[int], to_ms: Optional[int]) -> Partial:
+        partial = Partial()
+        if not self.size:
+            return partial
+        from_ms = int(self.ts[0]) if from_ms is None else from_ms
+        to_ms = int(self.ts[-1]) if to_ms is None else to_ms
+        for tier_ms, start, end in self.plan(from_ms, to_ms):
+            if tier_ms is None:
+                values = self.value[self.window(start, end - 1)]
+                if values.size:
+                    # float32 누적 오차를 피하도록 float64로 합산
+                    partial.add(values.size, values.sum(dtype=np.float64), values.min(), values.max())
+            else:
+                rows = self.tier_window(tier_ms, start, end)
+                tier = self.tiers[tier_ms]
+                count = tier['count'][rows]
+                if count.size:
+                    partial.add(count.sum(), tier['sum'][rows].sum(), tier['min'][rows].min(), tier['max'][rows].max())
+        return partial
+
+    def aggregate_by_host(self, from_ms: Optional[int], to_ms: Optional[int]) -> Dict[str, np.ndarray]:
+        """
+        호스트별 count/sum/min/max 배열 (길이 = 호스트 수). aggregate와 같은 계획을 쓰고,
+        각 부분은 호스트 코드로 bincount / ufunc.at 해서 한 번에 나눕니다.
+        """
+        hosts = max(len(self.hosts), 1)
+        result = {'count': np.zeros(hosts, dtype=np.int64), 'sum': np.zeros(hosts),
+                  'min': np.full(hosts, np.inf), 'max': np.full(hosts, -np.inf)}
+        if not self.size:
+            return result
+        from_ms = int(self.ts[0]) if from_ms is None else from_ms
+        to_ms = int(self.ts[-1]) if to_ms is None else to_ms
+        for tier_ms, start, end in self.plan(from_ms, to_ms):
+            if tier_ms is None:
+                window = self.window(start, end - 1)
+                host, count = self.host[window], None
+                total = low = high = self.value[window].astype(np.float64)
+            else:
+                rows = self.tier_window(tier_ms, start, end)
+                tier = self.tiers[tier_ms]
+                host, count = tier['host'][rows], tier['count'][rows]
+                total, low, high = tier['sum'][rows], tier['min'][rows], tier['max'][rows]
+            if not host.size:
+                continue
+            result['count'] += np.bincount(host, weights=count, minlength=hosts).astype(np.int64)
+            result['sum'] += np.bincount(host, weights=total, minlength=hosts)
+            np.minimum.at(result['min'], host, low)
+            np.maximum.at(result['max'], host, high)
+        return result
+
+    def resample(self, from_ms: int, to_ms: int, step_ms: int) -> Dict[str, np.ndarray]:
+        """
+        [from_ms, to_ms]를 step_ms 격자로 나눠 칸마다 모든 호스트의 평균/최댓값/개수를 구합니다 (빈 칸의 평균은 NaN).
+        step_ms를 나누어떨어지게 하는 가장 거친 롤업 계층을 읽고, 없으면 원본을 읽습니다.
+        격자는 step_ms 경계에 맞춰 양 끝이 넓어질 수 있습니다.
+        """
+        start = from_ms // step_ms * step_ms
+        cells = max(0, -(-(to_ms + 1 - start) // step_ms))
+        end = start + cells * step_ms
+        sources = [tier_ms for tier_ms in self.tiers if tier_ms <= step_ms and step_ms % tier_ms == 0]
+        if sources:
+            tier = self.tiers[max(sources)]
+            rows = self.tier_window(max(sources), start, end)
+            bucket, count, total, high = tier['bucket'][rows], tier['count'][rows], tier['sum'][rows], tier['max'][rows]
+        else:
+            window = self.window(start, end - 1)
+            bucket, high = self.ts[window], self.value[window]
+            count, total = np.ones(bucket.size, dtype=np.int64), high.astype(np.float64)
+        cell = (bucket - start) // step_ms
+        counts = np.bincount(cell, weights=count, minlength=cells)[:cells]
+        sums = np.bincount(cell, weights=total, minlength=cells)[:cells]
+        maxima = np.full(cells, np.nan)
+        if cell.size:
+            # cell이 정렬되어 있으므로 칸 경계에서 reduceat
+            starts = np.flatnonzero(np.concatenate(([True], cell[1:] != cell[:-1])))
+            maxima[cell[starts]] = np.maximum.reduceat(np.asarray(high, dtype=np.float64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(counts > 0, sums / counts, np.nan)
+        return {'ts': start + np.arange(cells, dtype=np.int64) * step_ms, 'mean': mean, 'max': maxima, 'count': counts}
+
+    def sketch(self, from_ms: Optional[int], to_ms: Optional[int]) -> Sketch:
+        """[from_ms, to_ms] 구간의 분위수 스케치 (스케치 계층 병합 + 경계는 원본 값)."""
+        sketch = Sketch()
+        if not self.size:
+            return sketch
+        from_ms = int(self.ts[0]) if from_ms is None else from_ms
+        to_ms = int(self.ts[-1]) if to_ms is None else to_ms
+        for tier_ms, start, end in self.plan(from_ms, to_ms, self.sketches):
+            if tier_ms is None:
+                sketch.add_values(self.value[self.window(start, end - 1)])
+                continue
+            rows, bins = self.sketches[tier_ms]
+            first = int(np.searchsorted(rows['bucket'], start, side='left'))
+            last = int(np.searchsorted(rows['bucket'], end, side='left'))
+            if first < last:
+                # 버킷 순서로 이어진 bin 구간을 한 번에 더함
+                span = slice(int(rows['offset'][first]), int(rows['offset'][last - 1] + rows['length'][last - 1]))
+                sketch.add_bins(bins['index'][span], bins['count'][span])
+        return sketch
+
+
+def aggregate(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """avg/min/max/count. 빈 구간이면 값은 None."""
+    partial = Partial()
+    if values.size:
+        partial.add(values.size, values.sum(dtype=np.float64), values.min(), values.max())
+    return partial.result()
+
+
+class MetricStore:
+    """서비스/환경/메트릭별 열 기반 메트릭 저장소."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.series: Dict[str, Series] = {}
+        self.lock = threading.Lock()
+
+    def series_path(self, service: str, env: str, metric: str) -> str:
+        return os.path.join(self.root, service, env, metric)
+
+    # ---- 쓰기 ----
+
+    def append(self, service: str, env: str, metric: str, ts: Iterable[int], values: Iterable[float],
+               hosts: Iterable[str] = None):
+        """시각 오름차순으로 이어 붙일 배치를 추가하고 롤업 계층을 갱신합니다. 배치 내부는 정렬해서 씁니다."""
+        self._write(service, env, metric, ts, values, hosts, insert=False)
+
+    def insert(self, service: str, env: str, metric: str, ts: Iterable[int], values: Iterable[float],
+               hosts: Iterable[str] = None):
+        """
+        시각 순서와 상관없이 배치를 넣습니다 (Datadog에서 앞쪽 빈 구간을 받아 채울 때).
+        마지막 시각 이후면 append와 같고, 앞서면 들어갈 위치부터 원본 꼬리와 롤업/스케치 계층을 다시 씁니다.
+        비용은 들어갈 위치 뒤에 있는 데이터 양에 비례합니다.
+        """
+        self._write(service, env, metric, ts, values, hosts, insert=True)
+
+    def _write(self, service: str, env: str, metric: str, ts: Iterable[int], values: Iterable[float],
+               hosts: Optional[Iterable[str]], insert: bool):
+        ts = np.asarray(ts, dtype=TS_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        if ts.shape != values.shape:
+            raise ValueError("ts와 values의 길이가 다릅니다")
+        if ts.size == 0:
+            return
+        path = self.series_path(service, env, metric)
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            host_names = self._load_hosts(path)
+            if hosts is None:
+                host_codes = np.zeros(ts.size, dtype=HOST_DTYPE)
+                if not host_names:
+                    host_names.append('')
+            else:
+                host_codes = self._encode_hosts(host_names, hosts, ts.size)
+
+            order = np.argsort(ts, kind='stable')
+            ts, values, host_codes = ts[order], values[order], host_codes[order]
+            last_ts = self._last_ts(path)
+            if last_ts is not None and ts[0] < last_ts and not insert:
+                raise ValueError(f"시각 순서가 맞지 않는 쓰기: {ts[0]} < 마지막 시각 {last_ts} ({service}/{env}/{metric})")
+
+            coverage_path = os.path.join(path, 'coverage.json')
+            if insert and last_ts is not None and not os.path.exists(coverage_path):
+                # 기본 coverage(원본의 처음~마지막 시각)가 끼워 넣은 배치까지 덮지 않도록 넣기 전 범위를 기록
+                first_ts = int(np.fromfile(os.path.join(path, 'ts.i8'), dtype=TS_DTYPE, count=1)[0])
+                with open(coverage_path, 'w', encoding='utf-8') as f:
+                    json.dump([[first_ts, last_ts]], f)
+            with open(os.path.join(path, 'hosts.json'), 'w', encoding='utf-8') as f:
+                json.dump(host_names, f, ensure_ascii=False)
+            if last_ts is not None and ts[0] < last_ts:
+                self._insert_rows(path, ts, values, host_codes)
+            else:
+                append_columns(path, COLUMNS, (ts, values, host_codes))
+                for tier_ms in ROLLUP_TIERS_MS:
+                    self._update_rollup(path, tier_ms, ts, values, host_codes)
+                for tier_ms in SKETCH_TIERS_MS:
+                    self._update_sketch(path, tier_ms, ts, values)
+            # 다음 조회에서 새 크기로 다시 열도록 함
+            self.series.pop(path, None)
+
+    def _insert_rows(self, path: str, ts: np.ndarray, values: np.ndarray, host_codes: np.ndarray):
+        """원본 열 중간에 정렬된 배치를 끼워 넣고 그 위치부터 계층을 다시 계산합니다."""
+        size = column_rows(path, COLUMNS)
+        raw = open_columns(path, COLUMNS, size)
+        # 같은 시각의 기존 행 뒤에 넣음
+        row = int(np.searchsorted(raw['ts'], ts[0], side='right'))
+        tail = [np.array(raw[name][row:]) for name, _, _ in COLUMNS]
+        del raw
+        order = np.argsort(np.concatenate((tail[0], ts)), kind='stable')
+        merged = [np.concatenate((old, new.astype(old.dtype, copy=False)))[order]
+                  for old, new in zip(tail, (ts, values, host_codes))]
+        # 행 수가 늘기만 하므로 row부터 덮어써도 파일이 줄지 않음
+        write_columns_at(path, COLUMNS, row, merged)
+        for tier_ms in ROLLUP_TIERS_MS:
+            # 롤업은 첫 버킷 이후의 기존 행과 배치를 다시 합치므로 중간 삽입도 그대로 처리됨
+            self._update_rollup(path, tier_ms, ts, values, host_codes)
+        raw = open_columns(path, COLUMNS, size + ts.size)
+        for tier_ms in SKETCH_TIERS_MS:
+            self._rewrite_sketch(path, tier_ms, raw, int(ts[0]) // tier_ms * tier_ms)
+        del raw
+
+    def _rewrite_sketch(self, path: str, tier_ms: int, raw: Dict[str, np.ndarray], start: int):
+        """start 버킷부터의 스케치를 원본 열에서 다시 만듭니다. 버킷별 bin 수는 줄지 않으므로 덮어써도 됨."""
+        sketch_path = os.path.join(path, f"sketch-{tier_ms}")
+        os.makedirs(sketch_path, exist_ok=True)
+        first = int(np.searchsorted(raw['ts'], start, side='left'))
+        row_buckets, lengths, bin_index, bin_counts = bucket_bins(
+            np.asarray(raw['ts'][first:]) // tier_ms * tier_ms, np.asarray(raw['value'][first:]))
+
+        row_at = column_rows(sketch_path, SKETCH_ROWS)
+        bin_at = column_rows(sketch_path, SKETCH_BINS)
+        if row_at:
+            rows = open_columns(sketch_path, SKETCH_ROWS, row_at)
+            keep = int(np.searchsorted(rows['bucket'], start, side='left'))
+            if keep < row_at:
+                bin_at = int(rows['offset'][keep])
+            row_at = keep
+            del rows
+        offsets = bin_at + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        write_columns_at(sketch_path, SKETCH_BINS, bin_at, (bin_index, bin_counts))
+        write_columns_at(sketch_path, SKETCH_ROWS, row_at, (row_buckets, offsets, lengths))
+
+    def _update_rollup(self, path: str, tier_ms: int, ts: np.ndarray, values: np.ndarray, host_codes: np.ndarray):
+        """배치를 계층 버킷으로 줄여 붙입니다. 기존 마지막 버킷과 겹치면 그 행들을 다시 합칩니다."""
+        tier_path = os.path.join(path, f"rollup-{tier_ms}")
+        os.makedirs(tier_path, exist_ok=True)
+        values64 = values.astype(np.float64)
+        rows = (ts // tier_ms * tier_ms, host_codes, np.ones(ts.size, dtype=np.int64), values64, values, values)
+
+        stored = column_rows(tier_path, ROLLUP_COLUMNS)
+        keep = stored
+        if stored:
+            existing = open_columns(tier_path, ROLLUP_COLUMNS, stored)
+            keep = int(np.searchsorted(existing['bucket'], rows[0][0], side='left'))
+            if keep < stored:
+                tail = [np.array(existing[name][keep:]) for name, _, _ in ROLLUP_COLUMNS]
+                rows = tuple(np.concatenate((old, new.astype(old.dtype, copy=False))) for old, new in zip(tail, rows))
+            del existing
+        # 다시 합친 행은 기존 꼬리 행 이상이므로 keep 위치부터 덮어써도 파일이 줄지 않음
+        write_columns_at(tier_path, ROLLUP_COLUMNS, keep, reduce_rows(*rows))
+
+    def _update_sketch(self, path: str, tier_ms: int, ts: np.ndarray, values: np.ndarray):
+        """배치를 버킷별 스케치로 붙입니다. 마지막 저장 버킷과 겹치면 그 버킷의 bin을 합쳐 다시 씁니다."""
+        sketch_path = os.path.join(path, f"sketch-{tier_ms}")
+        os.makedirs(sketch_path, exist_ok=True)
+        row_buckets, lengths, bin_index, bin_counts = bucket_bins(ts // tier_ms * tier_ms, values)
+
+        row_at = column_rows(sketch_path, SKETCH_ROWS)
+        bin_at = column_rows(sketch_path, SKETCH_BINS)
+        if row_at:
+            rows = open_columns(sketch_path, SKETCH_ROWS, row_at)
+            if rows['bucket'][-1] == row_buckets[0]:
+                row_at -= 1
+                old_offset, old_length = int(rows['offset'][-1]), int(rows['length'][-1])
+                bins = open_columns(sketch_path, SKETCH_BINS, bin_at)
+                first = int(lengths[0])
+                merged_index, merged_counts = merge_bins(
+                    (bins['index'][old_offset:old_offset + old_length], bin_index[:first]),
+                    (bins['count'][old_offset:old_offset + old_length], bin_counts[:first]))
+                bin_index = np.concatenate((merged_index, bin_index[first:]))
+                bin_counts = np.concatenate((merged_counts, bin_counts[first:]))
+                lengths = np.concatenate(([merged_index.size], lengths[1:]))
+                bin_at = old_offset
+                del bins
+            del rows
+        offsets = bin_at + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # 읽는 쪽이 아직 쓰지 않은 bin을 가리키는 행을 보지 않도록 bin을 먼저 씀 (합친 bin 수는 줄지 않음)
+        write_columns_at(sketch_path, SKETCH_BINS, bin_at, (bin_index, bin_counts))
+        write_columns_at(sketch_path, SKETCH_ROWS, row_at, (row_buckets, offsets, lengths))
+
+    def rebuild_rollups(self, service: str, env: str, metric: str):
+        """원본 열에서 롤업/스케치 계층을 다시 만듭니다 (계층 설정을 바꿨을 때)."""
+        path = self.series_path(service, env, metric)
+        size = column_rows(path, COLUMNS)
+        with self.lock:
+            raw = open_columns(path, COLUMNS, size)
+            for tier_ms in ROLLUP_TIERS_MS:
+                tier_path = os.path.join(path, f"rollup-{tier_ms}")
+                if os.path.isdir(tier_path):
+                    truncate_columns(tier_path, ROLLUP_COLUMNS, 0)
+                if size:
+                    self._update_rollup(path, tier_ms, np.asarray(raw['ts']), np.asarray(raw['value']), np.asarray(raw['host']))
+            for tier_ms in SKETCH_TIERS_MS:
+                sketch_path = os.path.join(path, f"sketch-{tier_ms}")
+                if os.path.isdir(sketch_path):
+                    truncate_columns(sketch_path, SKETCH_ROWS, 0)
+                    truncate_columns(sketch_path, SKETCH_BINS, 0)
+                if size:
+                    self._update_sketch(path, tier_ms, np.asarray(raw['ts']), np.asarray(raw['value']))
+            self.series.pop(path, None)
+
+    def coverage(self, service: str, env: str, metric: str) -> List[List[int]]:
+        """
+        외부(Datadog)에서 받아 채운 [from_ms, to_ms] 구간 목록 (coverage.json, 시작 순).
+        기록이 없으면 이미 저장된 원본의 처음~마지막 시각을 덮은 것으로 봅니다.
+        """
+        path = self.series_path(service, env, metric)
+        coverage_path = os.path.join(path, 'coverage.json')
+        if os.path.exists(coverage_path):
+            with open(coverage_path, encoding='utf-8') as f:
+                return json.load(f)
+        series = self.open_series(service, env, metric)
+        return [[int(series.ts[0]), int(series.ts[-1])]] if series is not None and series.size else []
+
+    def add_coverage(self, service: str, env: str, metric: str, from_ms: int, to_ms: int):
+        """[from_ms, to_ms]를 덮은 구간으로 기록합니다. 겹치거나 맞닿은 구간은 하나로 합칩니다."""
+        merged = []
+        for start, end in sorted(self.coverage(service, env, metric) + [[int(from_ms), int(to_ms)]]):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        path = self.series_path(service, env, metric)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'coverage.json'), 'w', encoding='utf-8') as f:
+            json.dump(merged, f)
+
+    def gaps(self, service: str, env: str, metric: str, from_ms: int, to_ms: int) -> List[Tuple[int, int]]:
+        """[from_ms, to_ms] 중 coverage가 덮지 않은 구간들."""
+        result = []
+        cursor = from_ms
+        for start, end in self.coverage(service, env, metric):
+            if start > to_ms:
+                break
+            if start > cursor:
+                result.append((cursor, start - 1))
+            cursor = max(cursor, end + 1)
+        if cursor <= to_ms:
+            result.append((cursor, to_ms))
+        return result
+
+    def _load_hosts(self, path: str) -> List[str]:
+        hosts_path = os.path.join(path, 'hosts.json')
+        if not os.path.exists(hosts_path):
+            return []
+        with open(hosts_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _encode_hosts(self, host_names: List[str], hosts: Iterable[str], size: int) -> np.ndarray:
+        """호스트 이름을 코드로 바꿉니다. 이름 종류만큼만 파이썬 루프를 돕니다."""
+        unique, inverse = np.unique(np.asarray(list(hosts) if not isinstance(hosts, np.ndarray) else hosts, dtype=str),
+                                    return_inverse=True)
+        if inverse.size != size:
+            raise ValueError("hosts의 길이가 ts와 다릅니다")
+        lookup = {name: code for code, name in enumerate(host_names)}
+        codes = []
+        for name in unique.tolist():
+            if name not in lookup:
+                lookup[name] = len(host_names)
+                host_names.append(name)
+            codes.append(lookup[name])
+        if len(host_names) > np.iinfo(HOST_DTYPE).max + 1:
+            raise ValueError("시리즈당 호스트 수 한도를 넘었습니다")
+        return np.asarray(codes, dtype=HOST_DTYPE)[inverse]
+
+    def _last_ts(self, path: str) -> Optional[int]:
+        ts_path = os.path.join(path, 'ts.i8')
+        itemsize = np.dtype(TS_DTYPE).itemsize
+        if not os.path.exists(ts_path) or os.path.getsize(ts_path) < itemsize:
+            return None
+        with open(ts_path, 'rb') as f:
+            f.seek(-itemsize, os.SEEK_END)
+            return int(np.frombuffer(f.read(itemsize), dtype=TS_DTYPE)[0])
+
+    # ---- 읽기 ----
+
+    def open_series(self, service: str, env: str, metric: str) -> Optional[Series]:
+        """시리즈를 열어 캐시합니다. 파일 크기가 바뀌었으면(다른 프로세스의 쓰기) 다시 엽니다."""
+        path = self.series_path(service, env, metric)
+        ts_path = os.path.join(path, 'ts.i8')
+        if not os.path.exists(ts_path):
+            return None
+        size = os.path.getsize(ts_path) // np.dtype(TS_DTYPE).itemsize
+        with self.lock:
+            series = self.series.get(path)
+            if series is None or series.size != size:
+                series = self.series[path] = Series(path)
+        return series
+
+    def query(self, service: str, env: str, metric: str, from_ms: int = None, to_ms: int = None) -> Dict[str, Optional[float]]:
+        """[from_ms, to_ms] 구간의 avg/min/max/count (롤업 계층 + 원본 경계)."""
+        series = self.open_series(service, env, metric)
+        if series is None:
+            return Partial().result()
+        return series.aggregate(from_ms, to_ms).result()
+
+    def query_by_host(self, service: str, env: str, metric: str, from_ms: int = None, to_ms: int = None) -> Dict[str, Dict[str, Optional[float]]]:
+        """[from_ms, to_ms] 구간의 호스트별 avg/min/max/count."""
+        series = self.open_series(service, env, metric)
+        if series is None:
+            return {}
+        per_host = series.aggregate_by_host(from_ms, to_ms)
+        result = {}
+        for code, name in enumerate(series.hosts):
+            count = int(per_host['count'][code])
+            if count:
+                result[name] = {'count': count, 'avg': float(per_host['sum'][code] / count),
+                                'min': float(per_host['min'][code]), 'max': float(per_host['max'][code])}
+        return result
+
+    def quantiles(self, service: str, env: str, metric: str, from_ms: int = None, to_ms: int = None,
+                  qs=(0.5, 0.95, 0.99)) -> Dict[float, Optional[float]]:
+        """[from_ms, to_ms] 구간의 분위수 (상대 오차 SKETCH_RELATIVE_ACCURACY 이내)."""
+        series = self.open_series(service, env, metric)
+        if series is None:
+            return {q: None for q in qs}
+        return series.sketch(from_ms, to_ms).quantiles(qs)
+
+    def resample(self, service: str, env: str, metric: str, from_ms: int, to_ms: int, step_ms: int) -> Optional[Dict[str, np.ndarray]]:
+        """step_ms 격자 위의 칸별 평균/최댓값/개수 (Series.resample). 시리즈가 없으면 None."""
+        series = self.open_series(service, env, metric)
+        if series is None:
+            return None
+        return series.resample(from_ms, to_ms, step_ms)
+
+    def read(self, service: str, env: str, metric: str, from_ms: int = None, to_ms: int = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """구간의 원본 (ts, value, host) 열 (memmap 뷰, 복사 없음)."""
+        series = self.open_series(service, env, metric)
+        if series is None:
+            return np.empty(0, TS_DTYPE), np.empty(0, VALUE_DTYPE), np.empty(0, HOST_DTYPE)
+        window = series.window(from_ms, to_ms)
+        return series.ts[window], series.value[window], series.host[window]
@@ -0,0 +1,114 @@
+"""
+합칠 수 있는(mergeable) DDSketch 방식의 분위수 스케치.
+값 v > 0을 로그 스케일 bin i = ceil(log_γ(v)) (γ = (1 + α) / (1 - α))에 세고, bin 개수만 더하면 스케치가 합쳐집니다.
+
+오차 한계:
+    MIN_VALUE 이상의 값에 대해, 분위수 q의 추정값 v̂와 실제 q 순위 값 v_q 사이에 |v̂ - v_q| ≤ α · v_q 가 성립합니다
+    (기본 α = 1%: CPU 95%는 ±0.95%p 이내). MIN_VALUE 미만(0, 음수 포함)은 0 bin에 모이며 절대 오차는 MIN_VALUE 이하입니다.
+메모리:
+    bin 수는 값 범위에만 의존합니다. 0~100% 사용률은 α = 1%일 때 0 bin을 제외하고 많아야 ~2·ln(100/MIN_VALUE)/ln(γ)개이며,
+    실제 한 시간 버킷은 값이 몰려 있어 수십 개 bin이면 충분합니다. 저장은 (bin 번호, 개수) 쌍으로 희소하게 합니다.
+"""
+
+import os
+import math
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+# 상대 정확도 α
+SKETCH_RELATIVE_ACCURACY = float(os.environ.get('SKETCH_RELATIVE_ACCURACY', 0.01))
+# 이 값 미만은 0 bin으로 모음
+MIN_VALUE = 1e-9
+
+GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+# 0 bin 번호 (int16 최솟값)
+ZERO_INDEX = np.iinfo(np.int16).min
+INDEX_DTYPE = np.int16
+COUNT_DTYPE = np.uint32
+
+
+def sketch_index(values: np.ndarray) -> np.ndarray:
+    """값 배열의 bin 번호 (벡터 연산)."""
+    values = np.asarray(values, dtype=np.float64)
+    index = np.full(values.shape, ZERO_INDEX, dtype=INDEX_DTYPE)
+    positive = values >= MIN_VALUE
+    index[positive] = np.ceil(np.log(values[positive]) / LOG_GAMMA).astype(INDEX_DTYPE)
+    return index
+
+
+def bin_value(index: np.ndarray) -> np.ndarray:
+    """bin의 대표값. (γ^(i-1), γ^i] 구간에서 상대 오차가 α 이하가 되는 2·γ^i / (γ + 1)."""
+    index = np.asarray(index)
+    values = 2 * np.exp(index.astype(np.float64) * LOG_GAMMA) / (GAMMA + 1)
+    return np.where(index == ZERO_INDEX, 0.0, values)
+
+
+class Sketch:
+    """bin 번호 → 개수를 누적하는 스케치. 여러 버킷/원본 구간을 더해 하나의 분포를 만듭니다."""
+
+    def __init__(self):
+        self.indexes = []
+        self.weights = []
+
+    def add_bins(self, indexes: np.ndarray, counts: np.ndarray):
+        """이미 bin으로 나뉜 (번호, 개수) 배열을 더합니다 (저장된 스케치 병합)."""
+        if len(indexes):
+            self.indexes.append(np.asarray(indexes, dtype=np.int32))
+            self.weights.append(np.asarray(counts, dtype=np.int64))
+
+    def add_values(self, values: np.ndarray):
+        values = np.asarray(values)
+        if values.size:
+            self.add_bins(sketch_index(values), np.ones(values.size, dtype=np.int64))
+
+    def merged(self):
+        """(정렬된 bin 번호, 개수) — 모든 입력을 bincount 한 번으로 합칩니다."""
+        if not self.indexes:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        indexes = np.concatenate(self.indexes)
+        weights = np.concatenate(self.weights)
+        low = int(indexes.min())
+        counts = np.bincount(indexes - low, weights=weights).astype(np.int64)
+        present = np.flatnonzero(counts)
+        return present.astype(np.int32) + low, counts[present]
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[float, Optional[float]]:
+        indexes, counts = self.merged()
+        total = int(counts.sum())
+        if not total:
+            return {q: None for q in qs}
+        cumulative = np.cumsum(counts)
+        # 순위 q·(n-1)을 포함하는 bin
+        ranks = np.asarray([q * (total - 1) for q in qs])
+        positions = np.searchsorted(cumulative, ranks, side='right')
+        values = bin_value(indexes[np.minimum(positions, indexes.size - 1)])
+        return {q: float(v) for q, v in zip(qs, values)}
+
+
+def bucket_bins(buckets: np.ndarray, values: np.ndarray):
+    """
+    (버킷, 값) 배열을 버킷별 희소 bin으로 바꿉니다.
+    반환: (버킷 시작들, 버킷별 bin 수, bin 번호, bin 개수) — bin은 버킷 순서대로 이어져 있습니다.
+    """
+    index = sketch_index(values).astype(np.int32)
+    order = np.lexsort((index, buckets))
+    buckets, index = buckets[order], index[order]
+    boundary = np.empty(buckets.size, dtype=bool)
+    boundary[:1] = True
+    boundary[1:] = (buckets[1:] != buckets[:-1]) | (index[1:] != index[:-1])
+    starts = np.flatnonzero(boundary)
+    counts = np.diff(np.append(starts, buckets.size))
+    bin_buckets, bin_index = buckets[starts], index[starts]
+    row_starts = np.flatnonzero(np.concatenate(([True], bin_buckets[1:] != bin_buckets[:-1])))
+    lengths = np.diff(np.append(row_starts, bin_buckets.size))
+    return bin_buckets[row_starts], lengths, bin_index, counts
+
+
+def merge_bins(indexes: Iterable[np.ndarray], counts: Iterable[np.ndarray]):
+    """여러 (bin 번호, 개수) 묶음을 하나로 합칩니다."""
+    sketch = Sketch()
+    for index, count in zip(indexes, counts):
+        sketch.add_bins(index, count)
+    return sketch.merged()
@@ -1,5 +1,94 @@
-from datetime import datetime
+import time
+# 콜드 스타트 초기화(모듈 로드) 시간 측정 시작점
+_INIT_STARTED = time.perf_counter()
+
+import os
 import random
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+
+    from metric_store import MetricStore
+    from log_store import LogStore
+    import anomaly_detection
+    import correlation
+    from tool_response import encode_response, parse_list, parse_int, parse_options
+    from result_cache import cached, create_result_cache
+    from datadog_client import DatadogError, create_datadog_client, series_points
+    METRIC_BACKEND_IMPORT_ERROR = None
+except ImportError as e:
+    # Agent.create(tool_code=...)는 이 파일 하나만 압축해 배포하므로 형제 모듈이나 numpy가 없을 수 있음.
+    # 그때는 저장소 없이 기존 샘플 응답으로 동작
+    METRIC_BACKEND_IMPORT_ERROR = e
+    encode_response = None
+
+    def cached(cache):
+        return lambda func: func
+
+    def parse_int(value):
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            return None
+
+    def parse_options(value):
+        return {}
+
+# 응답 시각을 표기할 UTC 오프셋 (로그 저장소의 LOG_UTC_OFFSET_HOURS와 같은 값, 기본 KST)
+LOG_UTC_OFFSET_HOURS = float(os.environ.get('LOG_UTC_OFFSET_HOURS', 9))
+LOG_TZ = timezone(timedelta(hours=LOG_UTC_OFFSET_HOURS))
+# 로컬 메트릭 저장소 위치 (generate_fake_metrics.py로 생성)
+METRIC_STORE_DIR = os.environ.get('METRIC_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metric_data'))
+# 오류 로그 수와 리소스 메트릭의 상관 분석에 쓰는 로컬 로그 저장소 (log_analysis_function과 같은 위치)
+LOG_STORE_DIR = os.environ.get('LOG_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'log_data'))
+if METRIC_BACKEND_IMPORT_ERROR is None:
+    # 열린 memmap을 호출 간에 재사용하도록 컨테이너당 한 번 생성 (저장소가 배포되지 않았으면 None)
+    metric_store = MetricStore(METRIC_STORE_DIR) if os.path.isdir(METRIC_STORE_DIR) else None
+    log_store = LogStore(LOG_STORE_DIR) if os.path.isdir(LOG_STORE_DIR) else None
+else:
+    print(f"[init] 메트릭 저장소 모듈을 불러오지 못해 샘플 응답으로 동작합니다: {METRIC_BACKEND_IMPORT_ERROR}")
+    metric_store = log_store = None
+
+# 임계값-지속시간 규칙: 서비스 평균 사용률이 임계값을 CRITICAL_DURATION_MS 이상 연속으로 넘으면 critical
+CPU_CRITICAL_PERCENT = float(os.environ.get('CPU_CRITICAL_PERCENT', 85))
+MEMORY_CRITICAL_PERCENT = float(os.environ.get('MEMORY_CRITICAL_PERCENT', 90))
+CRITICAL_DURATION_MS = int(os.environ.get('CRITICAL_DURATION_MS', 5 * 60 * 1000))
+# 이상 탐지 격자의 최대 시점 수 (구간이 길면 1분 → 1시간 → 1일 격자로 거칠게)
+ANALYSIS_MAX_POINTS = int(os.environ.get('ANALYSIS_MAX_POINTS', 20000))
+ANALYSIS_STEPS_MS = (60 * 1000, 60 * 60 * 1000, 24 * 60 * 60 * 1000)
+# 메트릭별로 반환할 최대 이상 구간 수 (최고값 순)
+ANALYSIS_MAX_INTERVALS = int(os.environ.get('ANALYSIS_MAX_INTERVALS', 10))
+
+# 이 값 이상의 상관계수와 정렬 구간이 함께 있으면 오류와 리소스 급증이 연관된 것으로 판단
+CORRELATION_MIN_COEFFICIENT = float(os.environ.get('CORRELATION_MIN_COEFFICIENT', 0.5))
+
+# 같은 서비스/시간 범위 재질의용 결과 캐시 (RESULT_CACHE_* 환경 변수)
+result_cache = create_result_cache() if METRIC_BACKEND_IMPORT_ERROR is None else None
+# DD_API_KEY가 있으면 분석 전에 Datadog 메트릭을 로컬 저장소로 동기화 (연결 풀을 호출 간에 재사용)
+datadog = create_datadog_client() if METRIC_BACKEND_IMPORT_ERROR is None else None
+if datadog is not None and metric_store is None:
+    # 받은 메트릭을 쌓을 저장소를 만듦 (Lambda에서는 METRIC_STORE_DIR을 /tmp 아래로 지정)
+    try:
+        os.makedirs(METRIC_STORE_DIR, exist_ok=True)
+        metric_store = MetricStore(METRIC_STORE_DIR)
+    except OSError as e:
+        print(f"[init] 메트릭 저장소 디렉토리를 만들지 못해 Datadog 동기화를 끕니다: {e}")
+        datadog = None
+if METRIC_BACKEND_IMPORT_ERROR is None and metric_store is None:
+    print(f"[init] 메트릭 저장소 디렉토리가 없습니다: {METRIC_STORE_DIR}")
+# Datadog 질의의 명시적 롤업 간격(초). 저장소 원본 간격(generate_fake_metrics 기본 60초)과 맞춰 포인트 하나를 원본 샘플 하나로 저장
+DATADOG_ROLLUP_SECONDS = int(os.environ.get('DATADOG_ROLLUP_SECONDS', 60))
+# Datadog 수집 지연 여유(초). 이보다 최근 구간은 포인트가 아직 도착하지 않았을 수 있어 받지 않음
+DATADOG_INGEST_DELAY_SECONDS = int(os.environ.get('DATADOG_INGEST_DELAY_SECONDS', 300))
+# 질의 하나의 최대 포인트 수. Datadog은 시리즈당 포인트가 너무 많으면 롤업 간격을 늘리므로 구간을 나눠 요청
+DATADOG_MAX_POINTS = int(os.environ.get('DATADOG_MAX_POINTS', 1440))
+# 저장소 메트릭 → (Datadog 질의 템플릿, 응답 값 → 사용률(%) 변환)
+DATADOG_METRIC_QUERIES = {
+    # system.cpu.user는 사용자 모드만 포함하므로 100 - idle로 전체 CPU 사용률을 구함
+    'cpu': ('avg:system.cpu.idle{{service:{service},env:{env}}} by {{host}}.rollup(avg, {rollup})', lambda values: 100 - values),
+    'memory': ('avg:system.mem.pct_usable{{service:{service},env:{env}}} by {{host}}.rollup(avg, {rollup})', lambda values: (1 - values) * 100),
+}
 
 def get_named_parameter(event, name):
     if 'parameters' in event:
@@ -8,17 +97,35 @@ def get_named_parameter(event, name):
     else:
         return None
     
+def get_named_parameters(event):
+    """파라미터 목록을 한 번에 이름 → 값 dict로 변환합니다. options에 묶인 선택 파라미터도 풀어 넣습니다."""
+    parameters = {item['name']: item['value'] for item in event.get('parameters', [])}
+    # 함수당 파라미터 수 한도 때문에 선택 파라미터는 options 하나로 묶여 옴 (따로 온 값이 우선)
+    return dict(parse_options(parameters.pop('options', None)), **parameters)
+    
 def populate_function_response(event, response_body):
+    if encode_response is None:
+        return {'response': {'actionGroup': event['actionGroup'], 'function': event['function'],
+                    'functionResponse': {'responseBody': {'TEXT': {'body': str(response_body)}}}}}
+    # 공백 없는 JSON으로 인코딩하고 fields 투영과 바이트 예산 적용
+    body, info = encode_response(response_body, get_named_parameters(event).get('fields'))
+    print(f"[response] bytes={info['bytes']} truncated={info['truncated']} projected={info['projected']}")
     return {'response': {'actionGroup': event['actionGroup'], 'function': event['function'],
-                'functionResponse': {'responseBody': {'TEXT': {'body': str(response_body)}}}}}
+                'functionResponse': {'responseBody': {'TEXT': {'body': body}}}}}
 
-def get_resource_metrics(service, env, from_ts, to_ts):
-    # 실제로는 Datadog API를 호출하여 메트릭을 검색하겠지만,
-    # 데모 목적으로 샘플 데이터 반환
+def window_error(from_ts, to_ts):
+    return f"오류: from_ts/to_ts는 정수(밀리초 타임스탬프)여야 합니다 (입력값: from_ts={from_ts}, to_ts={to_ts})"
+
+def store_unavailable_error(store_dir):
+    reason = METRIC_BACKEND_IMPORT_ERROR or f"{store_dir} 없음"
+    return f"오류: 저장소를 사용할 수 없습니다 ({reason}). 저장소와 모듈을 함께 배포했는지 확인하세요"
+
+def sample_resource_metrics(service, env, from_ts, to_ts):
+    # 메트릭 저장소가 없는 배포에서는 데모 목적의 샘플 데이터 반환
     
     # 타임스탬프를 읽기 쉬운 형식으로 변환
-    from_date = datetime.fromtimestamp(int(from_ts)/1000).strftime('%Y-%m-%d %H:%M:%S')
-    to_date = datetime.fromtimestamp(int(to_ts)/1000).strftime('%Y-%m-%d %H:%M:%S')
+    from_date = format_ts(from_ts)
+    to_date = format_ts(to_ts)
     
     # CPU 사용률 - 임의로 40~50% 사이 값 생성
     cpu_usage = round(random.uniform(40, 50), 1)
@@ -50,20 +157,341 @@ def get_resource_metrics(service, env, from_ts, to_ts):
         }
     }
 
+def usage_summary(stats, quantiles):
+    """저장소 집계 결과와 분위수를 응답 형식(사용률 %, 소수 첫째 자리)으로 변환합니다."""
+    def percent(value):
+        return round(value, 1) if value is not None else None
+    return {
+        "avg_usage_percent": percent(stats['avg']),
+        "max_usage_percent": percent(stats['max']),
+        "min_usage_percent": percent(stats['min']),
+        # 분위수 스케치 추정값 (상대 오차 1% 이내)
+        "p50_usage_percent": percent(quantiles[0.5]),
+        "p95_usage_percent": percent(quantiles[0.95]),
+        "p99_usage_percent": percent(quantiles[0.99]),
+        "sample_count": stats['count']
+    }
+
+def format_ts(ts_ms):
+    # Lambda 호스트 시간대(UTC)가 아니라 로그/메트릭 시각과 같은 LOG_TZ 기준으로 표기
+    return datetime.fromtimestamp(ts_ms/1000, LOG_TZ).strftime('%Y-%m-%d %H:%M:%S')
+
+def analysis_step(from_ms, to_ms):
+    """격자 시점 수가 ANALYSIS_MAX_POINTS 이하가 되는 가장 세밀한 간격."""
+    for step in ANALYSIS_STEPS_MS:
+        if (to_ms - from_ms) // step <= ANALYSIS_MAX_POINTS:
+            return step
+    return ANALYSIS_STEPS_MS[-1]
+
+def threshold_intervals(service, env, metric, grid, step, threshold):
+    """
+    임계값-지속시간 구간 (1분 해상도). 격자가 1분보다 거칠면 칸 최댓값이 임계값을 넘는 칸만
+    1분 격자로 다시 읽어 확인하므로, 긴 구간에서도 읽는 양은 후보 칸에 비례합니다.
+    """
+    fine_step = ANALYSIS_STEPS_MS[0]
+    min_points = max(1, -(-CRITICAL_DURATION_MS // fine_step))
+    if step == fine_step:
+        candidates = [(grid['ts'][0], grid['ts'][-1] + step)] if grid['ts'].size else []
+    else:
+        candidates = [(grid['ts'][a] - CRITICAL_DURATION_MS, grid['ts'][b - 1] + step + CRITICAL_DURATION_MS)
+                      for a, b in anomaly_detection.runs(anomaly_detection.threshold_mask(grid['max'], threshold))]
+    intervals = []
+    for start, end in candidates:
+        fine = grid if step == fine_step else metric_store.resample(service, env, metric, int(start), int(end) - 1, fine_step)
+        for a, b in anomaly_detection.runs(anomaly_detection.threshold_mask(fine['mean'], threshold), min_points):
+            intervals.append(('threshold', int(fine['ts'][a]), int(fine['ts'][b - 1]) + fine_step, float(np.nanmax(fine['mean'][a:b]))))
+    return intervals
+
+def analyze_metric(service, env, metric, from_ms, to_ms, threshold):
+    """
+    구간의 서비스 평균 시리즈를 직전 기준선과 비교해 이상 구간을 찾습니다.
+    rolling z-score 스파이크, EWMA 상승, 임계값-지속시간 규칙을 NumPy 배열 연산으로 평가합니다.
+    """
+    step = analysis_step(from_ms, to_ms)
+    # 구간 시작 시점에도 기준선이 있도록 기준선 길이만큼 앞에서부터 읽음
+    lead = (anomaly_detection.ANOMALY_BASELINE_POINTS + anomaly_detection.ANOMALY_BASELINE_GAP) * step
+    grid = metric_store.resample(service, env, metric, from_ms - lead, to_ms, step)
+    if grid is None:
+        return []
+    inside = grid['ts'] >= from_ms // step * step
+    detected = anomaly_detection.detect(grid['mean'])
+
+    intervals = []
+    for kind in ('spike', 'shift'):
+        for a, b in anomaly_detection.runs(detected[kind] & inside):
+            intervals.append((kind, int(grid['ts'][a]), int(grid['ts'][b - 1]) + step, float(np.nanmax(grid['mean'][a:b]))))
+    window = {name: column[inside] for name, column in grid.items()}
+    intervals.extend(threshold_intervals(service, env, metric, window, step, threshold))
+
+    intervals.sort(key=lambda interval: interval[3], reverse=True)
+    return [{"type": kind, "from": format_ts(start), "to": format_ts(end), "peak_usage_percent": round(peak, 1)}
+            for kind, start, end, peak in intervals[:ANALYSIS_MAX_INTERVALS]]
+
+def sync_from_datadog(pairs, from_ms, to_ms):
+    """
+    Datadog 클라이언트가 있으면 (서비스, 환경)들의 CPU/메모리 중 저장소가 아직 덮지 않은 구간만 동시에 질의해 채웁니다.
+    받은 구간은 시리즈별 coverage에 기록하므로 마지막 시각보다 앞선 구간도 한 번씩만 받아 끼워 넣습니다.
+    수집 지연 여유(DATADOG_INGEST_DELAY_SECONDS) 안의 최근 구간은 받지 않고, 응답의 마지막 포인트 뒤 빈 구간은
+    늦게 도착할 수 있으므로 덮은 구간으로 기록하지 않습니다.
+    질의는 DATADOG_ROLLUP_SECONDS 간격의 명시적 롤업으로 보내고, 응답 간격이 다르면 원본 샘플과 섞이지 않게 버립니다.
+    질의나 저장이 실패하면 경고만 남기고 로컬 저장소에 있는 데이터로 분석합니다.
+    """
+    if datadog is None:
+        return
+    step = DATADOG_ROLLUP_SECONDS * 1000
+    # 수집 지연 여유 안이거나 아직 채워지는 중인 롤업 버킷은 받지 않음
+    settled = int(time.time() * 1000) - DATADOG_INGEST_DELAY_SECONDS * 1000
+    end = min(to_ms + 1, settled) // step * step - 1
+    jobs = []
+    for service, env in pairs:
+        for metric, (template, _) in DATADOG_METRIC_QUERIES.items():
+            query = template.format(service=service, env=env, rollup=DATADOG_ROLLUP_SECONDS)
+            try:
+                gaps = metric_store.gaps(service, env, metric, from_ms // step * step, end)
+            except (OSError, ValueError) as e:
+                print(f"[datadog] {service}/{env}/{metric} 동기화 기록을 읽지 못함, 로컬 저장소만 사용: {e}")
+                continue
+            for gap_from, gap_to in gaps:
+                # 시작 시각이 이미 덮인 버킷은 다시 받지 않도록 다음 버킷 경계부터 요청
+                for chunk_from in range(-(-gap_from // step) * step, gap_to + 1, step * DATADOG_MAX_POINTS):
+                    jobs.append((service, env, metric, query, chunk_from, min(gap_to, chunk_from + step * DATADOG_MAX_POINTS - 1)))
+    if not jobs:
+        return
+    try:
+        responses = datadog.query_metrics_many([(query, start, stop) for _, _, _, query, start, stop in jobs])
+    except DatadogError as e:
+        print(f"[datadog] 메트릭 동기화 실패, 로컬 저장소만 사용: {e}")
+        return
+    for (service, env, metric, _, start, stop), response in zip(jobs, responses):
+        intervals = {series.get('interval') for series in response.get('series') or ()}
+        if intervals - {DATADOG_ROLLUP_SECONDS}:
+            print(f"[datadog] {service}/{env}/{metric} 롤업 간격이 {DATADOG_ROLLUP_SECONDS}초가 아니라 건너뜀: {intervals}")
+            continue
+        points = [(ts, value, host) for host, pointlist in series_points(response)
+                  for ts, value in pointlist if value is not None and start <= ts <= stop]
+        if not points:
+            # 빈 응답은 아직 수집되지 않은 구간일 수 있으므로 다음 호출에서 다시 받음
+            continue
+        points.sort(key=lambda point: point[0])
+        ts, values, hosts = zip(*points)
+        transform = DATADOG_METRIC_QUERIES[metric][1]
+        try:
+            metric_store.insert(service, env, metric, ts, transform(np.asarray(values, dtype=np.float64)), hosts)
+            # 마지막 포인트의 롤업 버킷까지만 덮은 것으로 기록 (그 뒤 빈 구간은 늦게 도착할 수 있음)
+            metric_store.add_coverage(service, env, metric, start, min(stop, ts[-1] + step - 1))
+        except (OSError, ValueError) as e:
+            # 읽기 전용 저장소이거나 호스트 수 한도를 넘은 경우
+            print(f"[datadog] {service}/{env}/{metric} 저장 실패, 로컬 저장소만 사용: {e}")
+
+@cached(result_cache)
+def get_resource_metrics(service, env, from_ts, to_ts):
+    # 로컬 메트릭 저장소에서 시간 범위를 이진 탐색으로 찾아 벡터 연산으로 집계
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    if metric_store is None:
+        return sample_resource_metrics(service, env, from_ms, to_ms)
+    sync_from_datadog([(service, env)], from_ms, to_ms)
+    cpu = usage_summary(metric_store.query(service, env, 'cpu', from_ms, to_ms),
+                        metric_store.quantiles(service, env, 'cpu', from_ms, to_ms))
+    memory = usage_summary(metric_store.query(service, env, 'memory', from_ms, to_ms),
+                           metric_store.quantiles(service, env, 'memory', from_ms, to_ms))
+    cpu_intervals = analyze_metric(service, env, 'cpu', from_ms, to_ms, CPU_CRITICAL_PERCENT)
+    memory_intervals = analyze_metric(service, env, 'memory', from_ms, to_ms, MEMORY_CRITICAL_PERCENT)
+    is_cpu_critical = any(interval['type'] == 'threshold' for interval in cpu_intervals)
+    is_memory_critical = any(interval['type'] == 'threshold' for interval in memory_intervals)
+    # 한 시점짜리 스파이크는 보고만 하고, 지속적인 상승(EWMA)이나 critical일 때만 리소스 문제로 판단
+    sustained = any(interval['type'] == 'shift' for interval in cpu_intervals + memory_intervals)
+    
+    return {
+        "service": service,
+        "environment": env,
+        "time_period": {
+            "from": format_ts(from_ms),
+            "to": format_ts(to_ms)
+        },
+        "cpu": cpu,
+        "memory": memory,
+        "analysis": {
+            "is_cpu_critical": is_cpu_critical,
+            "is_memory_critical": is_memory_critical,
+            "is_resource_related_issue": is_cpu_critical or is_memory_critical or sustained,
+            "anomaly_intervals": {
+                "cpu": cpu_intervals,
+                "memory": memory_intervals
+            }
+        }
+    }
+
+def matrix_value(stats, key):
+    return round(stats[key], 1) if stats.get(key) is not None else None
+
+@cached(result_cache)
+def get_resource_metrics_batch(services, env, from_ts, to_ts, group_by=None):
+    """
+    여러 서비스(와 환경)의 CPU/메모리를 한 번에 집계해 행렬 형태로 반환합니다.
+    group_by가 host 또는 pod이면 호스트(파드)별 행으로 나눕니다 (저장소의 호스트 열 사용).
+    """
+    if metric_store is None:
+        return store_unavailable_error(METRIC_STORE_DIR)
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    service_list = parse_list(services)
+    env_list = parse_list(env)
+    by_host = (group_by or '').strip().lower() in ('host', 'pod')
+    sync_from_datadog([(service, environment) for service in service_list for environment in env_list], from_ms, to_ms)
+    
+    columns = ["service", "environment"] + (["host"] if by_host else []) + [
+        "cpu_avg", "cpu_min", "cpu_max"] + ([] if by_host else ["cpu_p95"]) + [
+        "memory_avg", "memory_min", "memory_max"] + ([] if by_host else ["memory_p95"]) + ["samples"]
+    rows = []
+    missing = []
+    for service in service_list:
+        for environment in env_list:
+            if by_host:
+                cpu = metric_store.query_by_host(service, environment, 'cpu', from_ms, to_ms)
+                memory = metric_store.query_by_host(service, environment, 'memory', from_ms, to_ms)
+                hosts = sorted(set(cpu) | set(memory))
+                if not hosts:
+                    missing.append(f"{service}/{environment}")
+                for host in hosts:
+                    c, m = cpu.get(host, {}), memory.get(host, {})
+                    rows.append([service, environment, host,
+                                 matrix_value(c, 'avg'), matrix_value(c, 'min'), matrix_value(c, 'max'),
+                                 matrix_value(m, 'avg'), matrix_value(m, 'min'), matrix_value(m, 'max'),
+                                 c.get('count', 0)])
+            else:
+                c = metric_store.query(service, environment, 'cpu', from_ms, to_ms)
+                m = metric_store.query(service, environment, 'memory', from_ms, to_ms)
+                if not c['count'] and not m['count']:
+                    missing.append(f"{service}/{environment}")
+                    continue
+                cpu_p95 = metric_store.quantiles(service, environment, 'cpu', from_ms, to_ms, (0.95,))[0.95]
+                memory_p95 = metric_store.quantiles(service, environment, 'memory', from_ms, to_ms, (0.95,))[0.95]
+                rows.append([service, environment,
+                             matrix_value(c, 'avg'), matrix_value(c, 'min'), matrix_value(c, 'max'),
+                             round(cpu_p95, 1) if cpu_p95 is not None else None,
+                             matrix_value(m, 'avg'), matrix_value(m, 'min'), matrix_value(m, 'max'),
+                             round(memory_p95, 1) if memory_p95 is not None else None,
+                             c['count']])
+    
+    return {
+        "time_period": {
+            "from": format_ts(from_ms),
+            "to": format_ts(to_ms)
+        },
+        "group_by": "host" if by_host else None,
+        "columns": columns,
+        "rows": rows,
+        "missing": missing
+    }
+
+def error_counts(service, env, from_ms, to_ms, step):
+    """로그 저장소 요약 열의 오류 레코드 수를 step 격자 칸별로 셉니다 (metric_store.resample과 같은 격자)."""
+    start = from_ms // step * step
+    cells = max(0, -(-(to_ms + 1 - start) // step))
+    counts = np.zeros(cells, dtype=np.int64)
+    for columns in log_store.iter_columns(from_ms, to_ms, service, env):
+        ts = columns['ts'][columns['error']]
+        counts += np.bincount((ts - start) // step, minlength=cells)[:cells]
+    return counts
+
+def correlate_metric(errors, grid, step):
+    """오류 수 시계열과 메트릭 평균 시계열의 시차 상관과 가장 강하게 겹치는 구간."""
+    lagged = correlation.lagged_correlation(errors, grid['mean'])
+    lag = correlation.best_lag(lagged)
+    if lag is None:
+        return None
+    coefficient = float(lagged['correlation'][lagged['lags'] == lag][0])
+    aligned = correlation.shift(grid['mean'], -lag)
+    intervals = [{
+        "from": format_ts(int(grid['ts'][interval['start']])),
+        "to": format_ts(int(grid['ts'][interval['end'] - 1]) + step),
+        "error_count": int(errors[interval['start']:interval['end']].sum()),
+        "peak_usage_percent": round(float(np.nanmax(aligned[interval['start']:interval['end']])), 1),
+        "score": round(interval['score'], 1)
+    } for interval in correlation.aligned_intervals(errors, grid['mean'], lag, limit=ANALYSIS_MAX_INTERVALS)]
+    zero_lag = lagged['correlation'][lagged['lags'] == 0][0]
+    return {
+        "correlation": round(coefficient, 3),
+        # 양수면 리소스 급증이 오류 급증보다 먼저, 음수면 나중
+        "resource_leads_by_seconds": lag * step // 1000,
+        "zero_lag_correlation": None if np.isnan(zero_lag) else round(float(zero_lag), 3),
+        "aligned_intervals": intervals
+    }
+
+@cached(result_cache)
+def correlate_errors_with_resources(service, env, from_ts, to_ts):
+    """
+    오류 로그 수와 CPU/메모리 평균 사용률을 같은 시간 격자에 놓고 시차 상관을 계산해
+    가장 강한 시차와 두 급증이 함께 나타나는 구간을 반환합니다.
+    """
+    if metric_store is None or log_store is None:
+        return store_unavailable_error(METRIC_STORE_DIR if metric_store is None else LOG_STORE_DIR)
+    from_ms, to_ms = parse_int(from_ts), parse_int(to_ts)
+    if from_ms is None or to_ms is None:
+        return window_error(from_ts, to_ts)
+    sync_from_datadog([(service, env)], from_ms, to_ms)
+    step = analysis_step(from_ms, to_ms)
+    errors = error_counts(service, env, from_ms, to_ms, step)
+    metrics = {}
+    for metric in ('cpu', 'memory'):
+        grid = metric_store.resample(service, env, metric, from_ms, to_ms, step)
+        metrics[metric] = correlate_metric(errors, grid, step) if grid is not None and errors.any() else None
+    correlated = [metric for metric, result in metrics.items()
+                  if result and result['correlation'] >= CORRELATION_MIN_COEFFICIENT and result['aligned_intervals']]
+    
+    return {
+        "service": service,
+        "environment": env,
+        "time_period": {
+            "from": format_ts(from_ms),
+            "to": format_ts(to_ms)
+        },
+        "step_seconds": step // 1000,
+        "error_count": int(errors.sum()),
+        "cpu": metrics['cpu'],
+        "memory": metrics['memory'],
+        "analysis": {
+            "is_error_correlated_with_resources": bool(correlated),
+            "correlated_metrics": correlated
+        }
+    }
+
+# 함수 이름 → (구현 함수, 파라미터 이름 순서). 컨테이너당 한 번만 구성
+FUNCTIONS = {
+    'get_resource_metrics': (get_resource_metrics, ('service', 'env', 'from_ts', 'to_ts')),
+    'get_resource_metrics_batch': (get_resource_metrics_batch, ('services', 'env', 'from_ts', 'to_ts', 'group_by')),
+    'correlate_errors_with_resources': (correlate_errors_with_resources, ('service', 'env', 'from_ts', 'to_ts')),
+}
+
+# 컨테이너 단위로 유지되는 호출 횟수 (1이면 콜드 스타트)
+_invocations = 0
+
+def log_invocation_timing(started):
+    global _invocations
+    _invocations += 1
+    handler_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"[timing] cold_start={_invocations == 1} invocation={_invocations} init_ms={INIT_DURATION_MS} handler_ms={handler_ms}")
+
 def lambda_handler(event, context):
+    started = time.perf_counter()
     print(event)
     function = event['function']
     
-    if function == 'get_resource_metrics':
-        service = get_named_parameter(event, 'service')
-        env = get_named_parameter(event, 'env')
-        from_ts = get_named_parameter(event, 'from_ts')
-        to_ts = get_named_parameter(event, 'to_ts')
+    if function in FUNCTIONS:
+        func, param_names = FUNCTIONS[function]
+        parameters = get_named_parameters(event)
         
-        result = get_resource_metrics(service, env, from_ts, to_ts)
+        result = func(*(parameters.get(name) for name in param_names))
     else:
         result = f"오류: 함수 '{function}'를 인식할 수 없습니다"
 
     response = populate_function_response(event, result)
     print(response)
+    log_invocation_timing(started)
     return response
+
+# 모듈 로드(콜드 스타트 초기화)에 걸린 시간
+INIT_DURATION_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 1)
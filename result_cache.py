@@ -0,0 +1,182 @@
+"""
+액션 그룹 Lambda의 도구 함수 결과 캐시.
+컨테이너 안의 LRU + TTL 캐시를 먼저 보고, RESULT_CACHE_DB가 지정되면 같은 호스트의 프로세스들이
+공유하는 sqlite 캐시를 두 번째 계층으로 사용합니다.
+
+- 키는 함수 이름과 파라미터 값 그대로 만듭니다. 저장소는 service/env/trace_id를 대소문자와 공백까지 구분해
+  비교하므로, 키에서 이 값들을 정규화하면 실제 질의로는 나오지 않을 결과를 돌려주게 됩니다.
+- 키를 만들 때 from_ts/to_ts는 RESULT_CACHE_BUCKET_MS 경계로 넓히므로(시작은 내림, 끝은 올림)
+  몇 초 차이로 다시 묻는 요청도 같은 키가 됩니다.
+- 버킷 정렬은 키에만 적용하고 함수는 호출자가 넘긴 인자 그대로 실행합니다. 적중하면 같은 키를 처음 만든
+  호출의 결과를 돌려주므로, 결과의 조회 범위는 버킷 폭 이내에서 요청과 다를 수 있습니다.
+- 적중/미스/만료/제거 횟수는 stats()로 확인할 수 있고, 조회마다 한 줄씩 출력합니다.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import inspect
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Sequence
+
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 60))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 256))
+RESULT_CACHE_BUCKET_MS = int(os.environ.get('RESULT_CACHE_BUCKET_MS', 60 * 1000))
+# 공유 sqlite 계층 경로 (Lambda에서는 /tmp 아래). 비어 있으면 프로세스 내 캐시만 사용
+RESULT_CACHE_DB = os.environ.get('RESULT_CACHE_DB', '')
+
+
+class SqliteCacheTier:
+    """여러 프로세스가 공유하는 sqlite 캐시 계층. 값은 JSON으로 저장합니다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # 스레드마다 연결을 따로 둠
+        self.local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)')
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key: str, now: float):
+        row = self._connection().execute('SELECT expires_at, value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] <= now:
+            return None
+        return json.loads(row[1]), row[0]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO results (key, expires_at, value) VALUES (?, ?, ?)',
+                           (key, expires_at, json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)))
+        # 만료된 항목은 쓸 때 가끔 정리
+        if hash(key) % 64 == 0:
+            connection.execute('DELETE FROM results WHERE expires_at <= ?', (time.time(),))
+
+
+class ResultCache:
+    """프로세스 내 LRU + TTL 캐시 (선택적으로 sqlite 공유 계층)."""
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, shared_path: str = None):
+        self.max_entries = max_entries or RESULT_CACHE_MAX_ENTRIES
+        self.ttl_seconds = RESULT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.shared = SqliteCacheTier(shared_path) if shared_path else None
+        self.counters = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, key: str):
+        """(적중 여부, 값, 계층)을 반환합니다. 계층은 'memory', 'shared' 또는 None."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return True, value, 'memory'
+                del self.entries[key]
+                self.counters['expired'] += 1
+        if self.shared is not None:
+            found = self.shared.get(key, now)
+            if found is not None:
+                value, expires_at = found
+                self._store(key, value, expires_at)
+                with self.lock:
+                    self.counters['shared_hits'] += 1
+                return True, value, 'shared'
+        with self.lock:
+            self.counters['misses'] += 1
+        return False, None, None
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl_seconds
+        self._store(key, value, expires_at)
+        if self.shared is not None:
+            self.shared.set(key, value, expires_at)
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.counters, entries=len(self.entries))
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 3) if lookups else None
+        return stats
+
+
+def align_window(from_ts, to_ts, bucket_ms: int = None):
+    """from_ts는 버킷 시작으로 내리고 to_ts는 버킷 끝으로 올립니다. 숫자가 아니면 그대로 둡니다."""
+    bucket_ms = bucket_ms or RESULT_CACHE_BUCKET_MS
+    try:
+        start = int(from_ts) // bucket_ms * bucket_ms
+        end = -(-int(to_ts) // bucket_ms) * bucket_ms
+    except (TypeError, ValueError):
+        return from_ts, to_ts
+    return str(start), str(end)
+
+
+def cached(cache: Optional[ResultCache], name: str = None, window: Sequence[str] = ('from_ts', 'to_ts'),
+           normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+    """
+    도구 함수 결과를 캐시하는 데코레이터. cache가 None이면 원래 함수를 그대로 반환합니다.
+    window 파라미터 쌍의 버킷 정렬과 normalize는 캐시 키에만 쓰고, 원래 함수는 받은 인자 그대로 호출합니다.
+    normalize는 함수가 실제로 같은 값으로 취급하는 차이만 지워야 합니다 (기본은 정규화 없음).
+    """
+    def decorator(func):
+        if cache is None:
+            return func
+        signature = inspect.signature(func)
+        function_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            params = dict(arguments.arguments)
+            if window and all(params.get(p) is not None for p in window):
+                params[window[0]], params[window[1]] = align_window(params[window[0]], params[window[1]])
+            if normalize is not None:
+                params = normalize(params)
+            key = function_name + ':' + json.dumps(params, sort_keys=True, default=str)
+
+            hit, value, tier = cache.get(key)
+            if not hit:
+                value = func(*args, **kwargs)
+                # "오류: ..." 응답(외부 API 일시 장애 등)은 캐시하지 않아 다음 호출이 다시 시도하게 함
+                if not (isinstance(value, str) and value.startswith('오류:')):
+                    cache.set(key, value)
+            stats = cache.stats()
+            print(f"[cache] function={function_name} hit={hit} tier={tier} hits={stats['hits'] + stats['shared_hits']} "
+                  f"misses={stats['misses']} entries={stats['entries']}")
+            return value
+
+        return wrapper
+    return decorator
+
+
+def create_result_cache() -> Optional[ResultCache]:
+    """환경 변수 설정으로 캐시를 만듭니다. 비활성화되어 있으면 None."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(shared_path=RESULT_CACHE_DB or None)
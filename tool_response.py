@@ -0,0 +1,165 @@
+"""
+액션 그룹 Lambda(log_analysis_function, resource_analysis_function) 공용 응답 인코더.
+str(response_body) 대신 공백 없는 JSON을 만들고, fields 투영과 바이트 예산을 적용합니다.
+
+- fields: 남길 필드의 점(.) 경로 목록 (예: "logs.message,logs.count,search_metadata").
+  리스트는 경로에서 투명하게 취급되어 각 원소에 같은 경로가 적용됩니다.
+- 바이트 예산: 인코딩 결과가 예산을 넘으면 가장 큰 리스트부터 뒤쪽 원소를 통째로 덜어내고
+  {"_truncated": {"omitted": n, "total": m}} 표식을 남깁니다. 레코드 중간을 자르지 않습니다.
+- parse_list: 쉼표 구분 또는 JSON 배열 문자열로 들어오는 목록 파라미터(services, trace_ids 등) 파싱.
+- parse_int: 문자열로 들어오는 정수 파라미터(max_logs 등) 파싱. 해석할 수 없으면 None.
+- parse_options: 선택 파라미터를 묶은 options 파라미터("key=value;key=value" 또는 JSON 객체) 파싱.
+  Bedrock Agents의 함수당 파라미터 수 한도(5개) 안에 선택 파라미터를 담기 위해 사용합니다.
+"""
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bedrock 함수 응답 크기 제한(25KB)보다 여유를 둔 기본 예산
+TOOL_RESPONSE_MAX_BYTES = int(os.environ.get('TOOL_RESPONSE_MAX_BYTES', 20000))
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def encoded_size(value: Any) -> int:
+    return len(_encoder.encode(value).encode('utf-8'))
+
+
+def parse_fields(fields) -> Optional[List[List[str]]]:
+    """"a.b,c" 형식 문자열 또는 목록을 경로 목록으로 변환합니다. 비어 있으면 None(투영 안 함)."""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    paths = [field.strip().split('.') for field in fields if field and field.strip()]
+    return paths or None
+
+
+def parse_list(value) -> List[str]:
+    """쉼표 구분 문자열 또는 JSON 배열 문자열 파라미터를 목록으로 변환합니다."""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    value = (value or '').strip()
+    if value.startswith('['):
+        try:
+            return [str(item).strip() for item in json.loads(value) if str(item).strip()]
+        except ValueError:
+            value = value.strip('[]')
+    return [item.strip().strip('"\'') for item in value.split(',') if item.strip().strip('"\'')]
+
+
+def parse_int(value) -> Optional[int]:
+    """" 200 ", "200.0", "1,000", '"50"' 같은 정수 파라미터를 int로 변환합니다. 해석할 수 없으면 None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().strip('"\'').replace(',', '').replace('_', '')
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    if not number.is_integer():
+        return None
+    return int(number)
+
+
+def parse_options(value) -> Dict[str, str]:
+    """'max_logs=200;fields=logs.message,logs.count' 또는 JSON 객체 문자열 → 이름 → 값 dict. 비어 있으면 {}."""
+    if isinstance(value, dict):
+        return {str(key).strip(): str(item) for key, item in value.items() if item is not None}
+    value = (value or '').strip()
+    if value.startswith('{'):
+        try:
+            return {str(key).strip(): str(item) for key, item in json.loads(value).items() if item is not None}
+        except (ValueError, AttributeError):
+            value = value.strip('{}')
+    options = {}
+    for item in value.split(';'):
+        name, sep, option = item.partition('=')
+        if sep and name.strip():
+            options[name.strip().strip('"\'')] = option.strip().strip('"\'')
+    return options
+
+
+def project(value: Any, paths: List[List[str]]) -> Any:
+    """경로 목록에 해당하는 필드만 남깁니다. 경로가 끝난 값은 통째로 유지합니다."""
+    if any(not path for path in paths):
+        return value
+    if isinstance(value, list):
+        return [project(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, item in value.items():
+        sub_paths = [path[1:] for path in paths if path[0] == key]
+        if sub_paths:
+            projected[key] = project(item, sub_paths)
+    return projected
+
+
+def _collect_lists(value: Any, found: List[list]):
+    """리스트 바깥의 리스트들을 찾습니다 (레코드 목록 단위로만 덜어냄)."""
+    if isinstance(value, list):
+        found.append(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_lists(item, found)
+
+
+def truncate_to_budget(body: Any, max_bytes: int) -> Tuple[Any, bool]:
+    """
+    예산을 넘는 만큼 리스트 뒤쪽 원소를 덜어냅니다. 원소 크기를 한 번씩만 인코딩해 계산하므로
+    리스트 길이에 선형입니다. 리스트를 모두 비워도 넘으면 그대로 반환합니다.
+    """
+    size = encoded_size(body)
+    if size <= max_bytes:
+        return body, False
+    # 원본 리스트를 바꾸지 않도록 복사 (캐시된 결과를 공유할 수 있음)
+    body = json.loads(_encoder.encode(body))
+    lists: List[list] = []
+    _collect_lists(body, lists)
+    if not lists:
+        return body, False
+
+    # 원소별 인코딩 크기 (구분자 ',' 포함)
+    item_sizes = [[encoded_size(item) + 1 for item in items] for items in lists]
+    keep = [len(items) for items in lists]
+    remaining = [sum(sizes) for sizes in item_sizes]
+    # 표식 자체의 크기 여유
+    marker_size = encoded_size({'_truncated': {'omitted': 10 ** 9, 'total': 10 ** 9}}) + 1
+    over = size - max_bytes + marker_size * len(lists)
+    while over > 0:
+        i = max(range(len(lists)), key=lambda j: remaining[j])
+        if keep[i] == 0:
+            break
+        keep[i] -= 1
+        removed = item_sizes[i][keep[i]]
+        remaining[i] -= removed
+        over -= removed
+
+    truncated = False
+    for items, kept in zip(lists, keep):
+        total = len(items)
+        if kept < total:
+            del items[kept:]
+            items.append({'_truncated': {'omitted': total - kept, 'total': total}})
+            truncated = True
+    return body, truncated
+
+
+def encode_response(response_body: Any, fields=None, max_bytes: int = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    응답 본문을 인코딩해 (텍스트, 정보)를 반환합니다. 정보에는 bytes / truncated / projected가 있습니다.
+    문자열 본문(오류 메시지 등)은 그대로 사용합니다.
+    """
+    max_bytes = max_bytes or TOOL_RESPONSE_MAX_BYTES
+    if isinstance(response_body, str):
+        return response_body, {'bytes': len(response_body.encode('utf-8')), 'truncated': False, 'projected': False}
+    paths = parse_fields(fields)
+    if paths:
+        response_body = project(response_body, paths)
+    response_body, truncated = truncate_to_budget(response_body, max_bytes)
+    text = _encoder.encode(response_body)
+    return text, {'bytes': len(text.encode('utf-8')), 'truncated': truncated, 'projected': bool(paths)}